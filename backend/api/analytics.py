@@ -5,13 +5,19 @@ from fastapi import APIRouter, Query, HTTPException, BackgroundTasks
 from typing import Optional
 from datetime import datetime
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from analytics.kpi_calculator import KPICalculator
 from tasks import scrape_property_market
 from core.models import PropertyMarketSnapshot
 from services.property_analyzer import PropertyAnalyzer
+from services.research_cache import normalize_address
+from services.single_flight import SingleFlight
 
 router = APIRouter()
 
+# Concurrent analyses of one address share a single background job
+analysis_flights = SingleFlight('property_analysis')
+
 
 class PropertyAnalysisRequest(BaseModel):
     address: str
@@ -25,6 +31,7 @@ class PropertyAnalysisResponse(BaseModel):
     address: str
     status: str
     estimated_completion_time: int  # minutes
+    coalesced: bool = False  # attached to an analysis already running for this address
 
 
 @router.get("/dashboard")
@@ -222,26 +229,51 @@ async def get_properties_list():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _run_property_analysis(flight_key: str, analysis_id: str, request: PropertyAnalysisRequest):
+    """Background analysis that frees its address for new analyses when done"""
+    try:
+        await PropertyAnalyzer.analyze_property_comprehensive(
+            analysis_id,
+            request.address,
+            request.city,
+            request.state,
+            request.zip_code
+        )
+    finally:
+        await run_in_threadpool(analysis_flights.release, flight_key, analysis_id)
+
+
 @router.post("/analyze-property", response_model=PropertyAnalysisResponse)
 async def analyze_property(request: PropertyAnalysisRequest, background_tasks: BackgroundTasks):
     """
     Start comprehensive property analysis for any address
+
+    If the same address is already being analyzed, the running analysis
+    is returned instead of starting another one.
     """
     try:
         # Generate unique analysis ID
         import uuid
         analysis_id = str(uuid.uuid4())
-        
+
+        flight_key = normalize_address(", ".join(
+            part for part in (request.address, request.city, request.state, request.zip_code) if part
+        ))
+        owner_id = await run_in_threadpool(analysis_flights.acquire, flight_key, analysis_id)
+        if owner_id != analysis_id:
+            status = PropertyAnalyzer.get_analysis_status(owner_id) or {}
+            print(f"🔗 Attaching analysis request for {flight_key} to running analysis {owner_id}")
+            return PropertyAnalysisResponse(
+                analysis_id=owner_id,
+                address=request.address,
+                status=status.get("status", "analyzing"),
+                estimated_completion_time=5,  # minutes
+                coalesced=True
+            )
+
         # Start background analysis
-        background_tasks.add_task(
-            PropertyAnalyzer.analyze_property_comprehensive,
-            analysis_id,
-            request.address,
-            request.city,
-            request.state,
-            request.zip_code
-        )
-        
+        background_tasks.add_task(_run_property_analysis, flight_key, analysis_id, request)
+
         return PropertyAnalysisResponse(
             analysis_id=analysis_id,
             address=request.address,
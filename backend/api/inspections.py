@@ -1,31 +1,92 @@
 """
 FastAPI endpoints for property inspection and AI analysis
 """
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import StreamingResponse, FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+from asgiref.sync import sync_to_async
 from typing import List, Optional
 import os
+import json
+import asyncio
 import uuid
+import anyio
 from pathlib import Path
 from datetime import datetime
-from services.vision_service import VisionService
+from services.vision_service import VisionService, ConsolidatedAnalysis, VISION_MAX_CONCURRENCY
+from services.vision_cache import vision_cache
+from services.image_dedup import ImageDeduplicator, VISION_DEDUP_ENABLED
+from services.image_quality import ImageQualityScreen, IMAGE_QUALITY_MODE
+from services.upload_service import UploadRejected, UPLOAD_CHUNK_SIZE
+from services.image_store import ImageStore, StoredImage, IMAGE_RENDITIONS
 from core.models import PropertyInspection, Property
+from tasks.inspection_jobs import enqueue_inspection, apply_analysis_result
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 router = APIRouter()
 
-# Create uploads directory
-UPLOAD_DIR = Path("uploads/inspections")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# Served images never change under their hash
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 
-@router.post("/analyze")
+async def _save_uploads(images: List[UploadFile]) -> List[StoredImage]:
+    """Stream uploaded images into the content-addressed store, one chunk in memory at a time"""
+    stored_images = []
+    try:
+        for image in images:
+            stored_images.append(await ImageStore.save_upload(image))
+    except UploadRejected as e:
+        for stored in stored_images:
+            await run_in_threadpool(ImageStore.discard, stored)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    return stored_images
+
+
+async def _screen_uploads(stored_images: List[StoredImage]) -> List[dict]:
+    """
+    Quality-screen saved uploads before any vision spend
+    
+    In skip mode a batch with no usable photo is rejected outright (422)
+    with retake feedback per image, and the files it added are discarded.
+    """
+    reports = await ImageQualityScreen.screen_async([stored.path for stored in stored_images])
+    if IMAGE_QUALITY_MODE == 'skip' and reports and not any(r["usable"] for r in reports):
+        for stored in stored_images:
+            await run_in_threadpool(ImageStore.discard, stored)
+        raise HTTPException(status_code=422, detail={
+            "message": "None of the uploaded photos are usable for inspection",
+            "images": _quality_feedback(reports)
+        })
+    return reports
+
+
+def _quality_feedback(reports: List[dict]) -> List[dict]:
+    return [
+        {"image_index": index, "issues": report["issues"], "feedback": report["feedback"]}
+        for index, report in enumerate(reports)
+        if report["issues"]
+    ]
+
+
+def _sse(event: str, data) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@router.post("/analyze", status_code=202)
 async def analyze_property_images(
+    background_tasks: BackgroundTasks,
     property_id: int = Form(...),
     inspection_type: str = Form("routine"),
     images: List[UploadFile] = File(...)
 ):
     """
-    Upload and analyze property images using GPT-4V
+    Upload property images and queue them for GPT-4V analysis
     
     Args:
         property_id: Property ID to inspect
@@ -33,7 +94,7 @@ async def analyze_property_images(
         images: List of image files to analyze
         
     Returns:
-        Analysis results with damage detection and recommendations
+        Pending inspection id; follow progress via the status or events endpoints
     """
     try:
         # Verify property exists
@@ -42,84 +103,311 @@ async def analyze_property_images(
         except Property.DoesNotExist:
             raise HTTPException(status_code=404, detail="Property not found")
         
-        # Save uploaded images
-        saved_image_paths = []
-        for image in images:
-            # Generate unique filename
-            file_extension = image.filename.split('.')[-1]
-            unique_filename = f"{uuid.uuid4()}.{file_extension}"
-            file_path = UPLOAD_DIR / unique_filename
-            
-            # Save file
-            with open(file_path, "wb") as buffer:
-                content = await image.read()
-                buffer.write(content)
-            
-            saved_image_paths.append(str(file_path))
-        
-        # Analyze images based on inspection type
-        if inspection_type == "roof":
-            # Specialized roof analysis
-            analysis_result = VisionService.analyze_roof_condition(saved_image_paths[0])
-        else:
-            # General property inspection
-            analysis_result = VisionService.analyze_multiple_images(saved_image_paths)
+        stored_images = await _save_uploads(images)
+        quality_reports = await _screen_uploads(stored_images)
+        image_refs = [stored.digest for stored in stored_images]
         
-        # Create inspection record
+        # Create inspection record, analysis runs on the workers
         inspection = PropertyInspection.objects.create(
             property=property_obj,
             inspection_date=datetime.now(),
             inspection_type=inspection_type,
-            images=saved_image_paths,
-            ai_report=analysis_result
+            images=image_refs,
+            status='pending'
         )
-        
-        # Extract overall condition if available
-        if 'consolidated_analysis' in analysis_result:
-            inspection.overall_condition = analysis_result['consolidated_analysis'].get('overall_condition')
-            inspection.severity_score = int(analysis_result['consolidated_analysis'].get('average_severity', 0))
-        elif 'roof_analysis' in analysis_result:
-            inspection.severity_score = analysis_result['roof_analysis'].get('condition_score', 0)
-        
-        inspection.save()
+        background_tasks.add_task(enqueue_inspection, inspection.id, quality_reports)
+        background_tasks.add_task(ImageStore.generate_renditions, image_refs)
         
         return {
             "success": True,
             "inspection_id": inspection.id,
             "property_id": property_id,
-            "images_analyzed": len(saved_image_paths),
-            "analysis": analysis_result,
+            "status": inspection.status,
+            "images_total": len(image_refs),
+            "images": [ImageStore.urls(ref) for ref in image_refs],
+            "status_url": f"/api/inspections/{inspection.id}/status",
+            "events_url": f"/api/inspections/{inspection.id}/events",
+            "quality": {
+                "mode": IMAGE_QUALITY_MODE if ImageQualityScreen.enabled() else "off",
+                "images_flagged": sum(1 for r in quality_reports if r["issues"]),
+                "images": _quality_feedback(quality_reports)
+            },
             "created_at": inspection.created_at.isoformat()
         }
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _cost(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+# List fields: the model columns each needs and how to render it. Everything
+# but ai_report comes from summary columns stored when the analysis is saved.
+INSPECTION_LIST_FIELDS = {
+    "id": (["id"], lambda i: i.id),
+    "inspection_date": (["inspection_date"], lambda i: i.inspection_date.isoformat()),
+    "inspection_type": (["inspection_type"], lambda i: i.inspection_type),
+    "status": (["status"], lambda i: i.status),
+    "overall_condition": (["overall_condition"], lambda i: i.overall_condition),
+    "severity_score": (["severity_score"], lambda i: i.severity_score),
+    "damage_count": (["damage_count"], lambda i: i.damage_count),
+    "total_estimated_cost": (["total_estimated_cost"], lambda i: _cost(i.total_estimated_cost)),
+    "images_count": (["images"], lambda i: len(i.images) if i.images else 0),
+    "thumbnails": (["images"], lambda i: [ImageStore.urls(ref)["thumb"] for ref in i.images or []]),
+    "completed_at": (["completed_at"], lambda i: i.completed_at.isoformat() if i.completed_at else None),
+    "ai_report": (["ai_report"], lambda i: i.ai_report),
+}
+SUMMARY_LIST_FIELDS = [name for name in INSPECTION_LIST_FIELDS if name != "ai_report"]
+
+
+def _job_status(inspection: PropertyInspection) -> dict:
+    images_total = len(inspection.images) if inspection.images else 0
+    
+    status = {
+        "inspection_id": inspection.id,
+        "status": inspection.status,
+        "images_total": images_total,
+        "images_completed": inspection.images_completed,
+        "progress": round(100 * inspection.images_completed / images_total) if images_total else 0,
+        "error": inspection.error or None,
+        "completed_at": inspection.completed_at.isoformat() if inspection.completed_at else None
+    }
+    if inspection.status == 'completed':
+        status["overall_condition"] = inspection.overall_condition
+        status["severity_score"] = inspection.severity_score
+        status["damage_count"] = inspection.damage_count
+        status["total_estimated_cost"] = _cost(inspection.total_estimated_cost)
+    return status
+
+
+@router.get("/{inspection_id}/status")
+async def get_inspection_status(inspection_id: int):
+    """
+    Poll the progress of an inspection analysis job
+    """
+    try:
+        inspection = PropertyInspection.objects.defer('ai_report').get(id=inspection_id)
+        return _job_status(inspection)
+        
+    except PropertyInspection.DoesNotExist:
+        raise HTTPException(status_code=404, detail="Inspection not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{inspection_id}/events")
+async def stream_inspection_events(
+    inspection_id: int,
+    poll_interval: float = Query(1.0, ge=0.2, le=10, description="Seconds between progress checks")
+):
+    """
+    Server-sent events for an inspection job
+    
+    Emits a `progress` event whenever the status or image count changes and
+    a final `completed` or `failed` event, then closes the stream.
+    """
+    get_inspection = sync_to_async(PropertyInspection.objects.defer('ai_report').get)
+    try:
+        await get_inspection(id=inspection_id)
+    except PropertyInspection.DoesNotExist:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+    
+    async def events():
+        last = None
+        idle = 0.0
+        while True:
+            status = _job_status(await get_inspection(id=inspection_id))
+            if status["status"] in ('completed', 'failed'):
+                yield _sse(status['status'], status)
+                return
+            
+            snapshot = (status["status"], status["images_completed"])
+            if snapshot != last:
+                yield _sse("progress", status)
+                last = snapshot
+                idle = 0.0
+            elif idle >= 15:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            
+            await asyncio.sleep(poll_interval)
+            idle += poll_interval
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/analyze/stream")
+async def stream_property_analysis(
+    background_tasks: BackgroundTasks,
+    property_id: int = Form(...),
+    images: List[UploadFile] = File(...)
+):
+    """
+    Analyze property images and stream findings as server-sent events
+    
+    Each image is analyzed concurrently with a streaming completion. Events:
+        inspection  - {"inspection_id", "images_total", "images_to_analyze"}
+                      once uploads are saved, screened and near-duplicates
+                      clustered
+        damage_item - {"image_index", "item"} as soon as an item is complete
+        image       - per-image result when that image (or the frame it
+                      duplicates) finishes; photos rejected by the quality
+                      screen are reported first, with retake feedback
+        complete    - consolidated analysis (same as the job endpoint stores)
+    """
+    try:
+        property_obj = Property.objects.get(id=property_id)
+    except Property.DoesNotExist:
+        raise HTTPException(status_code=404, detail="Property not found")
+    
+    stored_images = await _save_uploads(images)
+    quality_reports = await _screen_uploads(stored_images)
+    saved_image_paths = [stored.path for stored in stored_images]
+    inspection = PropertyInspection.objects.create(
+        property=property_obj,
+        inspection_date=datetime.now(),
+        inspection_type="routine",
+        images=[stored.digest for stored in stored_images],
+        status='processing'
+    )
+    background_tasks.add_task(ImageStore.generate_renditions, inspection.images)
+    
+    async def events():
+        queue: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(VISION_MAX_CONCURRENCY)
+        consolidation = ConsolidatedAnalysis(saved_image_paths)
+        
+        rejected = []
+        candidates = []
+        for index, report in enumerate(quality_reports):
+            if not report["usable"] and IMAGE_QUALITY_MODE == 'skip':
+                rejected.append(index)
+            else:
+                candidates.append(index)
+        
+        if VISION_DEDUP_ENABLED:
+            clusters = [
+                [candidates[i] for i in cluster]
+                for cluster in await ImageDeduplicator.cluster_async([saved_image_paths[i] for i in candidates])
+            ]
+        else:
+            clusters = [[i] for i in candidates]
+        
+        async def stream_image(cluster: List[int]):
+            async with semaphore:
+                async for event in VisionService.stream_property_image(saved_image_paths[cluster[0]]):
+                    await queue.put((cluster, event))
+        
+        tasks = [asyncio.create_task(stream_image(cluster)) for cluster in clusters]
+        try:
+            yield _sse("inspection", {
+                "inspection_id": inspection.id,
+                "images_total": len(saved_image_paths),
+                "images_to_analyze": len(clusters)
+            })
+            
+            for index in rejected:
+                result = ImageQualityScreen.rejected_result(quality_reports[index])
+                consolidation.add(index, result)
+                yield _sse("image", {"image_index": index, **result})
+            
+            while consolidation.completed < len(saved_image_paths):
+                cluster, event = await queue.get()
+                representative = cluster[0]
+                if event["event"] == "damage_item":
+                    yield _sse("damage_item", {"image_index": representative, "item": event["data"]})
+                    continue
+                
+                for index in cluster:
+                    result = event["data"]
+                    if index != representative:
+                        result = VisionService.attach_duplicate(
+                            result, saved_image_paths[index], saved_image_paths[representative]
+                        )
+                    if quality_reports[index]["issues"]:
+                        result = dict(result, quality=quality_reports[index])
+                    consolidation.add(index, result)
+                    yield _sse("image", {"image_index": index, **result})
+            
+            analysis_result = consolidation.to_dict()
+            inspection.images_completed = consolidation.completed
+            apply_analysis_result(inspection, analysis_result)
+            inspection.status = 'completed' if any(
+                r.get('success') for r in analysis_result['individual_results']
+            ) else 'failed'
+            inspection.completed_at = timezone.now()
+            await sync_to_async(inspection.save)()
+            
+            yield _sse("complete", {"inspection_id": inspection.id, **analysis_result})
+        
+        finally:
+            for task in tasks:
+                task.cancel()
+            
+            if inspection.status == 'processing':
+                # Client disconnected (or the stream broke) mid-analysis: keep
+                # what finished instead of leaving the row processing forever
+                analysis_result = consolidation.to_dict()
+                inspection.images_completed = consolidation.completed
+                apply_analysis_result(inspection, analysis_result)
+                inspection.status = 'failed'
+                inspection.error = (
+                    f"Stream ended after {consolidation.completed} of {len(saved_image_paths)} images"
+                )
+                inspection.completed_at = timezone.now()
+                # The stream task may already be cancelled; let the save finish
+                with anyio.CancelScope(shield=True):
+                    await sync_to_async(inspection.save)()
+    
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers=SSE_HEADERS, background=background_tasks
+    )
+
+
 @router.get("/property/{property_id}")
 async def get_property_inspections(
     property_id: int,
-    limit: int = 10
+    limit: int = 10,
+    view: str = Query("full", description="summary leaves out ai_report; full includes it"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, overrides view")
 ):
     """
     Get inspection history for a property
+    
+    With view=summary (or a fields list without ai_report) the report JSON
+    is never loaded from the database; fetch it from the detail endpoint.
     """
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in INSPECTION_LIST_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(INSPECTION_LIST_FIELDS)})"
+            )
+        if "id" not in selected:
+            selected.insert(0, "id")
+    elif view == "summary":
+        selected = SUMMARY_LIST_FIELDS
+    elif view == "full":
+        selected = list(INSPECTION_LIST_FIELDS)
+    else:
+        raise HTTPException(status_code=400, detail="view must be summary or full")
+    
     try:
+        columns = {column for name in selected for column in INSPECTION_LIST_FIELDS[name][0]}
         inspections = PropertyInspection.objects.filter(
             property_id=property_id
-        ).order_by('-inspection_date')[:limit]
+        ).only(*columns).order_by('-inspection_date')[:limit]
         
         results = []
         for inspection in inspections:
-            results.append({
-                "id": inspection.id,
-                "inspection_date": inspection.inspection_date.isoformat(),
-                "inspection_type": inspection.inspection_type,
-                "overall_condition": inspection.overall_condition,
-                "severity_score": inspection.severity_score,
-                "images_count": len(inspection.images) if inspection.images else 0,
-                "ai_report": inspection.ai_report
-            })
+            results.append({name: INSPECTION_LIST_FIELDS[name][1](inspection) for name in selected})
         
         return {
             "property_id": property_id,
@@ -131,6 +419,112 @@ async def get_property_inspections(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters and size of the image analysis cache
+    """
+    try:
+        return {
+            "success": True,
+            "cache": vision_cache.stats()
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _parse_range(range_header: str, file_size: int) -> Optional[tuple]:
+    """(start, end) inclusive for a single "bytes=" range, None if unsatisfiable"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    
+    start, _, end = spec.strip().partition("-")
+    try:
+        if not start:
+            # Suffix range: the last N bytes
+            length = int(end)
+            if length <= 0:
+                return None
+            return max(0, file_size - length), file_size - 1
+        start = int(start)
+        end = min(int(end), file_size - 1) if end else file_size - 1
+    except ValueError:
+        return None
+    
+    if start >= file_size or start > end:
+        return None
+    return start, end
+
+
+def _iter_file_range(path: Path, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@router.get("/images/{digest}")
+async def get_inspection_image(
+    digest: str,
+    request: Request,
+    size: str = Query("original", description="original, thumb or medium")
+):
+    """
+    Serve a stored inspection image or one of its WebP renditions
+    
+    Content is addressed by hash, so responses are cacheable forever and
+    revalidate by ETag. Single byte ranges are honoured (206/416).
+    """
+    if not ImageStore.is_digest(digest):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if size != "original" and size not in IMAGE_RENDITIONS:
+        raise HTTPException(status_code=400, detail=f"size must be one of: original, {', '.join(IMAGE_RENDITIONS)}")
+    
+    if size == "original":
+        path = ImageStore.original_path(digest)
+        if not path.exists():
+            raise HTTPException(status_code=404, detail="Image not found")
+        content_type = await run_in_threadpool(ImageStore.content_type, path)
+    else:
+        path = await ImageStore.get_rendition(digest, size)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        content_type = "image/webp"
+    
+    etag = f'"{digest}-{size}"'
+    headers = {"Cache-Control": IMAGE_CACHE_CONTROL, "ETag": etag, "Accept-Ranges": "bytes"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    
+    file_size = path.stat().st_size
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = _parse_range(range_header, file_size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{file_size}"})
+        
+        start, end = byte_range
+        return StreamingResponse(
+            _iter_file_range(path, start, end),
+            status_code=206,
+            media_type=content_type,
+            headers={
+                **headers,
+                "Content-Range": f"bytes {start}-{end}/{file_size}",
+                "Content-Length": str(end - start + 1)
+            }
+        )
+    
+    return FileResponse(path, media_type=content_type, headers=headers)
+
+
 @router.get("/{inspection_id}")
 async def get_inspection_detail(inspection_id: int):
     """
@@ -148,9 +542,13 @@ async def get_inspection_detail(inspection_id: int):
             },
             "inspection_date": inspection.inspection_date.isoformat(),
             "inspection_type": inspection.inspection_type,
+            "status": inspection.status,
             "overall_condition": inspection.overall_condition,
             "severity_score": inspection.severity_score,
+            "damage_count": inspection.damage_count,
+            "total_estimated_cost": _cost(inspection.total_estimated_cost),
             "images": inspection.images,
+            "image_urls": [ImageStore.urls(ref) for ref in inspection.images or []],
             "ai_report": inspection.ai_report,
             "notes": inspection.notes,
             "created_at": inspection.created_at.isoformat()
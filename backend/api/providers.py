@@ -4,8 +4,13 @@ FastAPI endpoints for service provider management
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
 from datetime import datetime
+from django.utils import timezone
 from core.models import ServiceProvider, MaintenanceRequest
 from services.dispatch_service import DispatchService
+from services.provider_calendar import ProviderCalendar
+from services.fleet_router import FleetRouter
+from services.visit_consolidator import VisitConsolidator
+from services.duplicate_detector import DuplicateDetector
 
 router = APIRouter()
 
@@ -42,6 +47,9 @@ async def get_service_providers(
                 "total_jobs": provider.total_jobs,
                 "is_available": provider.is_available,
                 "hourly_rate": float(provider.hourly_rate) if provider.hourly_rate else None,
+                "work_start": provider.work_start.isoformat(),
+                "work_end": provider.work_end.isoformat(),
+                "max_jobs_per_day": provider.max_jobs_per_day,
                 "phone": provider.phone,
                 "email": provider.email
             })
@@ -72,6 +80,21 @@ async def auto_assign_provider(request_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/consolidate")
+async def consolidate_pending_requests(
+    dry_run: bool = Query(False, description="Report clusters and savings without booking")
+):
+    """
+    Cluster pending requests by category, proximity and time window and
+    assign each cluster to one provider as a single visit
+    """
+    try:
+        return VisitConsolidator.consolidate_pending(dry_run=dry_run)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/schedule/{provider_id}")
 async def get_provider_schedule(
     provider_id: int,
@@ -89,6 +112,39 @@ async def get_provider_schedule(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/availability/{provider_id}")
+async def get_provider_availability(
+    provider_id: int,
+    date: Optional[str] = None
+):
+    """
+    Get free time slots and remaining capacity for a provider's day
+    """
+    try:
+        provider = ServiceProvider.objects.get(id=provider_id)
+        day = datetime.fromisoformat(date).date() if date else datetime.now().date()
+        
+        calendar = ProviderCalendar(
+            [provider],
+            start=timezone.make_aware(datetime.combine(day, datetime.min.time())),
+            days=1
+        )
+        schedule = calendar.schedule_for(provider.id, day)
+        
+        return {
+            "provider_id": provider_id,
+            "date": day.isoformat(),
+            "jobs_booked": len(schedule),
+            "remaining_capacity": max(provider.max_jobs_per_day - len(schedule), 0),
+            "free_slots": calendar.free_slots(provider.id, day) if not schedule.is_full else []
+        }
+        
+    except ServiceProvider.DoesNotExist:
+        raise HTTPException(status_code=404, detail="Provider not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/route/{provider_id}")
 async def get_optimized_route(
     provider_id: int,
@@ -106,6 +162,39 @@ async def get_optimized_route(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/fleet-route")
+async def route_fleet(
+    provider_type: str = Query("snow_removal", description="Provider type to route (snow_removal, landscaping, ...)"),
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    capacity: Optional[int] = Query(None, ge=1, description="Stops per provider; defaults to each provider's daily capacity")
+):
+    """
+    Route every active property in a region across all available providers
+    of a type, one optimized route per provider (e.g. after a snowstorm)
+    """
+    try:
+        result = FleetRouter.route_region(provider_type, city=city, state=state, capacity=capacity)
+        
+        if not result.get('success'):
+            raise HTTPException(status_code=400, detail=result.get('error'))
+        
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/duplicates/stats")
+async def get_duplicate_index_stats():
+    """
+    Get near-duplicate request index size and settings for this worker
+    """
+    return DuplicateDetector.stats()
+
+
 @router.get("/types")
 async def get_provider_types():
     """
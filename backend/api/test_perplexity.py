@@ -4,9 +4,11 @@ Test endpoint for Perplexity API
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import os
-import requests
 import json
+import httpx
 from typing import Optional
+from services.http_clients import HTTPClients
+from services.llm_telemetry import llm_telemetry
 
 router = APIRouter()
 
@@ -48,7 +50,13 @@ async def test_perplexity_api(query: TestQuery):
         
         print(f"Testing Perplexity API with query: {query.query}")
         
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        with llm_telemetry.track('perplexity', payload["model"], 'test.perplexity') as call:
+            response = await HTTPClients.get('perplexity').post(url, headers=headers, json=payload, timeout=30)
+            if response.status_code == 200:
+                usage = response.json().get('usage', {})
+                call.usage(usage.get('prompt_tokens'), usage.get('completion_tokens'))
+            else:
+                call.fail(f"HTTP {response.status_code}")
         
         if response.status_code != 200:
             print(f"Perplexity API error: {response.status_code} - {response.text}")
@@ -71,7 +79,7 @@ async def test_perplexity_api(query: TestQuery):
             "usage": result.get('usage', {})
         }
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Request error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
     except json.JSONDecodeError as e:
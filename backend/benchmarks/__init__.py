@@ -0,0 +1,4 @@
+"""
+Benchmark and simulation entry points
+Run from the backend directory, e.g. `python -m benchmarks.dispatch_benchmark`
+"""
@@ -0,0 +1,70 @@
+"""
+Dispatch benchmark: compare dispatch strategies on the same synthetic workload
+
+Usage:
+    python -m benchmarks.dispatch_benchmark --providers 50 --requests 500
+    python -m benchmarks.dispatch_benchmark --sqlite /tmp/dispatch.sqlite3 --strategy default nearest
+"""
+import argparse
+import json
+import os
+import sys
+
+import django
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dispatch strategies on a synthetic workload")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--providers", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--properties", type=int, default=100)
+    parser.add_argument("--arrivals-per-hour", type=float, default=6.0)
+    parser.add_argument("--strategy", nargs="+", default=["default", "nearest"])
+    parser.add_argument("--sqlite", help="Run against a local SQLite file instead of PostgreSQL")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic rows instead of rolling back")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON reports")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        os.environ["SQLITE_PATH"] = args.sqlite
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+    django.setup()
+
+    if args.sqlite:
+        from django.core.management import call_command
+        call_command("migrate", verbosity=0)
+
+    from services.dispatch_simulator import DispatchSimulator, SimulationConfig
+
+    config = SimulationConfig(
+        seed=args.seed,
+        num_providers=args.providers,
+        num_requests=args.requests,
+        num_properties=args.properties,
+        arrivals_per_hour=args.arrivals_per_hour,
+    )
+    simulator = DispatchSimulator(config)
+
+    reports = [simulator.run(strategy, keep_data=args.keep) for strategy in args.strategy]
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return 0
+
+    print(f"🚚 Dispatch benchmark: {args.requests} requests, {args.providers} providers, seed {args.seed}")
+    header = f"{'strategy':<10} {'assigned':>8} {'dupes':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'route p99':>10} {'avg mi':>8} {'SLA miss':>9} {'triage':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in reports:
+        print(
+            f"{r['strategy']:<10} {r['assigned']:>8} {r['duplicates_linked']:>6} {r['throughput_per_second']:>8} "
+            f"{r['assign_latency_ms']['p50']:>8} {r['assign_latency_ms']['p99']:>8} "
+            f"{r['route_latency_ms']['p99']:>10} {r['avg_travel_miles']:>8} "
+            f"{r['sla_miss_rate']:>8}% {r['triage_accuracy']:>6}%"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,426 @@
+"""
+OpenAI-compatible stand-in server for offline vision benchmarks
+
+Serves /v1/chat/completions (plain and streaming) with configurable latency,
+injected errors and canned inspection/roof JSON, so VisionService and the
+inspection endpoints can be exercised without the OpenAI API. In record mode
+requests are forwarded to the real API and the responses saved; in replay
+mode saved responses are served back for identical requests (misses fall
+back to the canned responses). GET /stats reports request, image, token and
+in-flight counters; POST /stats/reset clears them.
+
+Latency specs (seconds):
+    fixed:1.5  uniform:0.8,3  normal:2,0.5  lognormal:2.5,0.35 (median, sigma)
+
+Usage:
+    python -m benchmarks.fake_openai --port 8765 --latency lognormal:2.5,0.35 --error-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 uvicorn main:app
+
+    OPENAI_API_KEY=sk-... python -m benchmarks.fake_openai --record recordings/vision
+    python -m benchmarks.fake_openai --replay recordings/vision
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_RESPONSES: Dict[str, List[Dict]] = {
+    "inspection": [
+        {
+            "damage_items": [
+                {
+                    "damage_type": "water damage",
+                    "location": "ceiling, northeast corner",
+                    "severity": 6,
+                    "confidence": 0.82,
+                    "description": "Brown staining about 40cm across with slight sagging of the drywall",
+                    "recommendations": "Trace and repair the roof or plumbing leak, then replace the affected drywall",
+                    "estimated_cost_range": "$800-$2,000"
+                },
+                {
+                    "damage_type": "paint deterioration",
+                    "location": "exterior trim",
+                    "severity": 3,
+                    "confidence": 0.9,
+                    "description": "Peeling paint along window trim exposing bare wood",
+                    "recommendations": "Scrape, prime and repaint trim",
+                    "estimated_cost_range": "$300-$600"
+                }
+            ],
+            "overall_condition": "fair",
+            "priority_items": ["Repair ceiling leak"],
+            "estimated_total_cost": "$1,100 - $2,600",
+            "summary": "Active water intrusion at the ceiling; cosmetic wear elsewhere"
+        },
+        {
+            "damage_items": [],
+            "overall_condition": "good",
+            "priority_items": [],
+            "estimated_total_cost": "$0",
+            "summary": "No visible damage"
+        }
+    ],
+    "roof": [
+        {
+            "roof_type": "shingle",
+            "estimated_age": "15-18",
+            "condition_score": 5,
+            "issues_found": [
+                {
+                    "issue": "Missing shingles",
+                    "severity": 6,
+                    "location": "south slope near ridge",
+                    "repair_urgency": "urgent"
+                },
+                {
+                    "issue": "Granule loss",
+                    "severity": 4,
+                    "location": "entire south slope",
+                    "repair_urgency": "monitor"
+                }
+            ],
+            "estimated_remaining_lifespan": "3-5",
+            "repair_recommendations": ["Replace missing shingles", "Plan for re-roof within 5 years"],
+            "estimated_repair_cost": "$600 - $1,500"
+        }
+    ],
+}
+
+_PACKED_PROMPT = re.compile(r"You are given (\d+) property images")
+
+
+@dataclass
+class LatencyDistribution:
+    kind: str = "fixed"
+    params: List[float] = field(default_factory=lambda: [0.0])
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, _, values = spec.partition(":")
+        params = [float(v) for v in values.split(",") if v] if values else []
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Bad latency spec {spec!r} (e.g. fixed:1.5, uniform:0.8,3, lognormal:2.5,0.35)")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.params))
+        median, sigma = self.params
+        return rng.lognormvariate(math.log(median), sigma)
+
+
+@dataclass
+class FakeOpenAIConfig:
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [429, 500])
+    responses: Dict[str, List[Dict]] = field(default_factory=lambda: CANNED_RESPONSES)
+    record_dir: Optional[Path] = None
+    replay_dir: Optional[Path] = None
+    upstream: str = "https://api.openai.com/v1"
+    stream_chunk_chars: int = 24
+    stream_chunk_delay: float = 0.02
+    seed: Optional[int] = None
+
+
+def request_key(body: Dict) -> str:
+    """Recording key: the parts of a request that determine the answer"""
+    canonical = json.dumps(
+        {k: body.get(k) for k in ("model", "messages", "max_tokens", "temperature")},
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _request_shape(body: Dict):
+    """(prompt text, image count) of the first user message"""
+    prompt, images = "", 0
+    for message in body.get("messages") or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            prompt = prompt or content
+            continue
+        for part in content or []:
+            if part.get("type") == "text" and not prompt:
+                prompt = part.get("text", "")
+            elif part.get("type") == "image_url":
+                images += 1
+    return prompt, images
+
+
+class FakeOpenAI:
+    """Request handling and counters behind the stand-in app"""
+
+    def __init__(self, config: FakeOpenAIConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.stats = {
+                "requests": 0,
+                "errors": 0,
+                "images": 0,
+                "in_flight": 0,
+                "max_in_flight": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "replay_hits": 0,
+                "replay_misses": 0,
+                "recorded": 0,
+            }
+
+    def _count(self, **deltas) -> None:
+        with self.lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def canned_content(self, prompt: str, images: int) -> str:
+        responses = self.config.responses
+        if "roof inspection" in prompt.lower():
+            return json.dumps(self.rng.choice(responses["roof"]))
+
+        packed = _PACKED_PROMPT.search(prompt)
+        if packed:
+            reports = [
+                dict(self.rng.choice(responses["inspection"]), image=label)
+                for label in range(1, int(packed.group(1)) + 1)
+            ]
+            return json.dumps({"images": reports})
+
+        return "```json\n" + json.dumps(self.rng.choice(responses["inspection"]), indent=2) + "\n```"
+
+    async def upstream_completion(self, body: Dict) -> Dict:
+        import httpx
+
+        forwarded = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        async with httpx.AsyncClient(timeout=300) as client:
+            response = await client.post(
+                f"{self.config.upstream.rstrip('/')}/chat/completions",
+                json=forwarded,
+                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}"}
+            )
+        response.raise_for_status()
+        return response.json()
+
+    async def completion(self, body: Dict):
+        prompt, images = _request_shape(body)
+        key = request_key(body)
+        self._count(requests=1, images=images, in_flight=1)
+        started = time.monotonic()
+
+        try:
+            if self.rng.random() < self.config.error_rate:
+                await asyncio.sleep(self.config.latency.sample(self.rng) / 4)
+                self._count(errors=1)
+                status = self.rng.choice(self.config.error_statuses)
+                return JSONResponse(
+                    status_code=status,
+                    headers={"retry-after": "1"} if status == 429 else None,
+                    content={"error": {
+                        "message": "Injected failure from fake_openai",
+                        "type": "rate_limit_error" if status == 429 else "server_error",
+                        "code": None
+                    }}
+                )
+
+            recorded = self._load_recording(key)
+            if recorded is not None:
+                content, usage = recorded["choices"][0]["message"]["content"], recorded.get("usage")
+            elif self.config.record_dir:
+                upstream = await self.upstream_completion(body)
+                self._save_recording(key, upstream)
+                content, usage = upstream["choices"][0]["message"]["content"], upstream.get("usage")
+            else:
+                content, usage = self.canned_content(prompt, images), None
+
+            usage = usage or {
+                "prompt_tokens": len(prompt) // 4 + images * 765,
+                "completion_tokens": len(content) // 4,
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            self._count(prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"])
+
+            # Recorded and proxied calls already spent real time upstream
+            if recorded is None and not self.config.record_dir:
+                delay = self.config.latency.sample(self.rng) - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            model = body.get("model", "gpt-4o")
+            if body.get("stream"):
+                return StreamingResponse(self._stream(content, model), media_type="text/event-stream")
+            return JSONResponse({
+                "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        finally:
+            self._count(in_flight=-1)
+
+    async def _stream(self, content: str, model: str):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        size = max(1, self.config.stream_chunk_chars)
+        for start in range(0, len(content), size):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(self.config.stream_chunk_delay)
+
+        done = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    def _load_recording(self, key: str) -> Optional[Dict]:
+        if not self.config.replay_dir:
+            return None
+        path = self.config.replay_dir / f"{key}.json"
+        if not path.exists():
+            self._count(replay_misses=1)
+            return None
+        self._count(replay_hits=1)
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_recording(self, key: str, response: Dict) -> None:
+        self.config.record_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.config.record_dir / f".{key}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(response, f)
+        os.replace(tmp_path, self.config.record_dir / f"{key}.json")
+        self._count(recorded=1)
+
+
+def create_app(config: FakeOpenAIConfig) -> FastAPI:
+    fake = FakeOpenAI(config)
+    app = FastAPI(title="Fake OpenAI")
+    app.state.fake = fake
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await fake.completion(await request.json())
+
+    @app.get("/stats")
+    async def get_stats():
+        return fake.stats
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        fake.reset_stats()
+        return fake.stats
+
+    return app
+
+
+def serve_in_thread(config: FakeOpenAIConfig, host: str = "127.0.0.1", port: int = 0):
+    """
+    Start the stand-in on a background thread; returns (server, base_url)
+
+    Port 0 picks a free port. Call server.should_exit = True to stop it.
+    """
+    import socket
+    import uvicorn
+
+    if not port:
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://{host}:{port}"
+
+
+def config_from_args(args) -> FakeOpenAIConfig:
+    responses = CANNED_RESPONSES
+    if getattr(args, "responses", None):
+        with open(args.responses) as f:
+            responses = {**CANNED_RESPONSES, **json.load(f)}
+
+    return FakeOpenAIConfig(
+        latency=LatencyDistribution.parse(args.latency),
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",")],
+        responses=responses,
+        record_dir=Path(args.record) if getattr(args, "record", None) else None,
+        replay_dir=Path(args.replay) if getattr(args, "replay", None) else None,
+        upstream=getattr(args, "upstream", "https://api.openai.com/v1"),
+        seed=args.seed
+    )
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="lognormal:2.5,0.35", help="Response latency distribution (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-statuses", default="429,500", help="Statuses used for injected failures")
+    parser.add_argument("--responses", help='JSON file of canned reports: {"inspection": [...], "roof": [...]}')
+    parser.add_argument("--replay", help="Serve recorded responses from this directory")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    parser.add_argument("--record", help="Forward to the real API and save responses in this directory")
+    parser.add_argument("--upstream", default="https://api.openai.com/v1")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    config = config_from_args(args)
+    mode = "record" if config.record_dir else "replay" if config.replay_dir else "canned"
+    print(f"🧪 Fake OpenAI on http://{args.host}:{args.port}/v1 ({mode}, latency {args.latency}, "
+          f"error rate {args.error_rate:.0%})")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
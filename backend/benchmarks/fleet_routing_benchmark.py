@@ -0,0 +1,63 @@
+"""
+Fleet routing benchmark: solve time and route quality for region-wide events
+
+Runs FleetRouter.solve on synthetic stops and providers (no database needed).
+
+Usage:
+    python -m benchmarks.fleet_routing_benchmark --stops 500 --providers 25 --capacity 25
+"""
+import argparse
+import random
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark multi-vehicle routing")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stops", type=int, nargs="+", default=[100, 250, 500])
+    parser.add_argument("--providers", type=int, default=25)
+    parser.add_argument("--capacity", type=int, default=25)
+    parser.add_argument("--spread-miles", type=float, default=8.0)
+    parser.add_argument("--time-limit", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    import os
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+    django.setup()
+
+    from services.fleet_router import FleetRouter, Stop, Vehicle
+
+    city_lat, city_lng = 43.5446, -96.7311
+    spread = args.spread_miles / 69.0
+
+    print(f"❄️  Fleet routing benchmark: {args.providers} providers x {args.capacity} stops capacity")
+    header = f"{'stops':>6} {'routes':>7} {'unassigned':>11} {'built mi':>10} {'final mi':>10} {'improved':>9} {'seconds':>8}"
+    print(header)
+    print("-" * len(header))
+
+    for count in args.stops:
+        rng = random.Random(args.seed)
+        stops = [
+            Stop(i, f"Property {i}", "", city_lat + rng.gauss(0, spread), city_lng + rng.gauss(0, spread * 1.4))
+            for i in range(count)
+        ]
+        vehicles = [
+            Vehicle(i, f"Provider {i}", city_lat + rng.gauss(0, spread * 2), city_lng + rng.gauss(0, spread * 2.8), args.capacity)
+            for i in range(args.providers)
+        ]
+
+        result = FleetRouter.solve(stops, vehicles, time_limit_seconds=args.time_limit)
+        built = result["construction_distance_miles"]
+        final = result["total_distance_miles"]
+        improved = (built - final) / built * 100 if built else 0
+        print(
+            f"{count:>6} {result['providers_used']:>7} {len(result['unassigned_property_ids']):>11} "
+            f"{built:>10} {final:>10} {improved:>8.1f}% {result['solve_seconds']:>8}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Image preprocessing benchmark: payload size and latency before and after
+
+Uses real photos when given, otherwise synthetic camera-sized JPEGs with
+EXIF orientation. Reports bytes on the wire (base64), estimated GPT-4o
+image tokens and preprocessing latency, serially and through the process
+pool.
+
+Usage:
+    python -m benchmarks.image_preprocess_benchmark --images uploads/inspections/*.jpg
+    python -m benchmarks.image_preprocess_benchmark --synthetic 16 --max-dimension 1536 --quality 80
+"""
+import argparse
+import io
+import math
+import random
+import sys
+import time
+
+
+def synthetic_photo(rng: random.Random, width: int = 4032, height: int = 3024) -> bytes:
+    """Noisy gradient 12MP JPEG with an EXIF orientation tag, like a phone photo"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    base = Image.effect_noise((width // 4, height // 4), rng.uniform(40, 90)).convert('RGB')
+    base = base.resize((width, height), Image.BICUBIC)
+    draw = ImageDraw.Draw(base)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.rectangle(
+            [x, y, x + rng.randrange(100, 900), y + rng.randrange(100, 600)],
+            fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        )
+    base = base.filter(ImageFilter.GaussianBlur(1))
+
+    exif = Image.Exif()
+    exif[0x0112] = rng.choice([1, 6, 8])
+    out = io.BytesIO()
+    base.save(out, 'JPEG', quality=95, exif=exif)
+    return out.getvalue()
+
+
+def vision_tokens(width: int, height: int) -> int:
+    """GPT-4o high-detail token estimate: fit 2048, short side 768, 512px tiles"""
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def b64_size(n: int) -> int:
+    return 4 * math.ceil(n / 3)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark inspection image preprocessing")
+    parser.add_argument("--images", nargs="*", default=[])
+    parser.add_argument("--synthetic", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-dimension", type=int, default=None)
+    parser.add_argument("--quality", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    import os
+    if args.max_dimension:
+        os.environ['VISION_MAX_DIMENSION'] = str(args.max_dimension)
+    if args.quality:
+        os.environ['VISION_JPEG_QUALITY'] = str(args.quality)
+
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+    django.setup()
+
+    from services import image_preprocessor
+    from services.image_preprocessor import ImagePreprocessor, preprocess_image_bytes
+
+    if not image_preprocessor.PIL_AVAILABLE:
+        print("Pillow is not installed; preprocessing is a no-op (pip install Pillow)")
+        return 1
+
+    from PIL import Image
+
+    if args.images:
+        originals = []
+        for path in args.images:
+            with open(path, "rb") as f:
+                originals.append(f.read())
+    else:
+        rng = random.Random(args.seed)
+        print(f"Generating {args.synthetic} synthetic 12MP photos...")
+        originals = [synthetic_photo(rng) for _ in range(args.synthetic)]
+
+    processed = []
+    serial_ms = []
+    for data in originals:
+        started = time.perf_counter()
+        processed.append(preprocess_image_bytes(data))
+        serial_ms.append((time.perf_counter() - started) * 1000)
+
+    ImagePreprocessor.preprocess(originals[0])  # warm the pool
+    started = time.perf_counter()
+    futures = [ImagePreprocessor.pool().submit(preprocess_image_bytes, data) for data in originals]
+    for future in futures:
+        future.result()
+    pool_seconds = time.perf_counter() - started
+    ImagePreprocessor.shutdown()
+
+    def dims(data):
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size
+
+    before_bytes = sum(len(d) for d in originals)
+    after_bytes = sum(len(d) for d in processed)
+    before_tokens = sum(vision_tokens(*dims(d)) for d in originals)
+    after_tokens = sum(vision_tokens(*dims(d)) for d in processed)
+
+    print(f"\n📷 Preprocessing {len(originals)} images ({image_preprocessor.PREPROCESS_SIGNATURE}, "
+          f"{image_preprocessor.VISION_PREPROCESS_WORKERS} pool workers)")
+    print(f"{'':<24} {'before':>12} {'after':>12} {'change':>8}")
+    print("-" * 60)
+    print(f"{'avg file size (KB)':<24} {before_bytes / len(originals) / 1024:>12.0f} "
+          f"{after_bytes / len(processed) / 1024:>12.0f} {after_bytes / before_bytes - 1:>8.0%}")
+    print(f"{'avg base64 payload (KB)':<24} {b64_size(before_bytes) / len(originals) / 1024:>12.0f} "
+          f"{b64_size(after_bytes) / len(processed) / 1024:>12.0f} {after_bytes / before_bytes - 1:>8.0%}")
+    print(f"{'est. image tokens':<24} {before_tokens:>12} {after_tokens:>12} "
+          f"{after_tokens / before_tokens - 1:>8.0%}")
+    print(f"\nLatency per image: p50 {percentile(serial_ms, 50):.0f} ms, p90 {percentile(serial_ms, 90):.0f} ms (serial)")
+    print(f"Pool throughput: {len(originals) / pool_seconds:.1f} images/s ({pool_seconds:.2f} s total)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Inspection pipeline benchmark against the offline OpenAI stand-in
+
+Runs whole inspections (quality screen, dedup, preprocessing, GPT-4o calls,
+consolidation) through VisionService with the API replaced by
+benchmarks.fake_openai, at several per-inspection concurrency levels.
+Reports inspection throughput and latency, requests sent, and traced Python
+memory per in-flight request. The analysis cache is bypassed unless --cache
+is given, so every run pays for every call.
+
+Usage:
+    python -m benchmarks.inspection_pipeline --inspections 20 --images 6 --concurrency 1 2 5 10
+    python -m benchmarks.inspection_pipeline --latency fixed:1 --error-rate 0.05 --pack
+    python -m benchmarks.inspection_pipeline --base-url http://127.0.0.1:8765/v1   # running fake_openai / replay
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+from benchmarks.fake_openai import add_server_arguments, config_from_args, serve_in_thread
+
+
+def synthetic_inspection_photos(directory: str, count: int, seed: int, size=(1600, 1200)):
+    """Distinct, sharp, well-exposed photos so none are screened out or deduplicated"""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        noise = rng.integers(60, 200, (size[1] // 8, size[0] // 8, 3), dtype=np.uint8)
+        img = Image.fromarray(noise).resize(size, Image.NEAREST)
+        draw = ImageDraw.Draw(img)
+        for _ in range(30):
+            x, y = int(rng.integers(0, size[0])), int(rng.integers(0, size[1]))
+            draw.rectangle(
+                [x, y, x + int(rng.integers(40, 400)), y + int(rng.integers(40, 300))],
+                fill=tuple(int(c) for c in rng.integers(0, 256, 3))
+            )
+        path = os.path.join(directory, f"photo_{i:04d}.jpg")
+        img.save(path, "JPEG", quality=88)
+        paths.append(path)
+    return paths
+
+
+def _server_call(base_url: str, path: str, method: str = "GET"):
+    root = base_url.rsplit("/v1", 1)[0]
+    request = urllib.request.Request(f"{root}{path}", method=method, data=b"" if method == "POST" else None)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return json.loads(response.read())
+    except Exception:
+        # A real API (or a server without /stats) just has no counters
+        return None
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_level(VisionService, inspections, concurrency, parallel, pack, base_url):
+    _server_call(base_url, "/stats/reset", "POST")
+    semaphore = asyncio.Semaphore(parallel)
+    latencies, failed_images = [], 0
+
+    async def run_inspection(paths):
+        nonlocal failed_images
+        async with semaphore:
+            started = time.perf_counter()
+            result = await VisionService.analyze_multiple_images_async(
+                paths, max_concurrency=concurrency, pack=pack
+            )
+            latencies.append(time.perf_counter() - started)
+            failed_images += sum(1 for r in result["individual_results"] if not r.get("success"))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(run_inspection(paths) for paths in inspections))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = _server_call(base_url, "/stats") or {}
+    images = sum(len(paths) for paths in inspections)
+    in_flight = stats.get("max_in_flight") or min(concurrency * parallel, images)
+    return {
+        "concurrency": concurrency,
+        "inspections_per_min": len(inspections) / elapsed * 60,
+        "images_per_sec": images / elapsed,
+        "p50_s": statistics.median(latencies),
+        "p95_s": percentile(latencies, 95),
+        "requests": stats.get("requests"),
+        "max_in_flight": stats.get("max_in_flight"),
+        "failed_images": failed_images,
+        "peak_traced_mb": peak / 1024 / 1024,
+        "kb_per_request": peak / 1024 / max(1, in_flight),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the inspection pipeline offline")
+    parser.add_argument("--inspections", type=int, default=12)
+    parser.add_argument("--images", type=int, default=6, help="Photos per inspection")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 5, 10],
+                        help="Vision calls in flight per inspection")
+    parser.add_argument("--parallel", type=int, default=4, help="Inspections analyzed at once")
+    parser.add_argument("--pack", action="store_true", help="Pack several photos per request")
+    parser.add_argument("--cache", action="store_true", help="Use the analysis cache")
+    parser.add_argument("--base-url", help="Use an already running OpenAI-compatible server")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON reports")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.seed is None:
+        args.seed = 42
+
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server, root = serve_in_thread(config_from_args(args))
+        base_url = f"{root}/v1"
+
+    # The OpenAI clients are created at import time from these
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+    import django
+    django.setup()
+
+    from services import vision_service
+    from services.image_preprocessor import ImagePreprocessor
+    from services.vision_cache import VisionCache
+    from services.vision_service import VisionService
+
+    class NoCache(VisionCache):
+        def get(self, key):
+            return None
+
+        def set(self, key, value):
+            pass
+
+    if not args.cache:
+        vision_service.vision_cache = NoCache()
+
+    with tempfile.TemporaryDirectory(prefix="inspection-bench-") as directory:
+        print(f"Generating {args.inspections * args.images} synthetic photos...")
+        photos = synthetic_inspection_photos(directory, args.inspections * args.images, args.seed)
+        inspections = [photos[i:i + args.images] for i in range(0, len(photos), args.images)]
+
+        async def run_all():
+            return [
+                await run_level(VisionService, inspections, level, args.parallel, args.pack, base_url)
+                for level in args.concurrency
+            ]
+
+        reports = asyncio.run(run_all())
+
+    ImagePreprocessor.shutdown()
+    if server:
+        server.should_exit = True
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return 0
+
+    print(f"\n🔬 {args.inspections} inspections x {args.images} photos, {args.parallel} inspections at once"
+          f"{', packed' if args.pack else ''} ({'embedded fake, latency ' + args.latency if server else base_url})")
+    print(f"{'concurrency':>11} {'insp/min':>9} {'img/s':>7} {'p50 s':>7} {'p95 s':>7} "
+          f"{'requests':>9} {'in flight':>9} {'failed':>7} {'peak MB':>8} {'KB/req':>7}")
+    print("-" * 92)
+    for r in reports:
+        print(f"{r['concurrency']:>11} {r['inspections_per_min']:>9.1f} {r['images_per_sec']:>7.2f} "
+              f"{r['p50_s']:>7.2f} {r['p95_s']:>7.2f} {r['requests'] if r['requests'] is not None else '-':>9} "
+              f"{r['max_in_flight'] if r['max_in_flight'] is not None else '-':>9} {r['failed_images']:>7} "
+              f"{r['peak_traced_mb']:>8.1f} {r['kb_per_request']:>7.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,8 @@ Django admin configuration for Happy Everyday models
 from django.contrib import admin
 from .models import (
     Property, Tenant, FinancialRecord, ServiceProvider,
-    MaintenanceRequest, PropertyInspection, MarketResearch, AuditLog
+    MaintenanceRequest, PropertyInspection, MarketResearch, AuditLog,
+    ProviderBooking, LLMCallRecord
 )
 
 
@@ -34,7 +35,7 @@ class FinancialRecordAdmin(admin.ModelAdmin):
 
 @admin.register(ServiceProvider)
 class ServiceProviderAdmin(admin.ModelAdmin):
-    list_display = ['company_name', 'provider_type', 'rating', 'total_jobs', 'is_available']
+    list_display = ['company_name', 'provider_type', 'rating', 'total_jobs', 'max_jobs_per_day', 'is_available']
     list_filter = ['provider_type', 'is_available']
     search_fields = ['name', 'company_name', 'email']
     ordering = ['-rating']
@@ -42,16 +43,24 @@ class ServiceProviderAdmin(admin.ModelAdmin):
 
 @admin.register(MaintenanceRequest)
 class MaintenanceRequestAdmin(admin.ModelAdmin):
-    list_display = ['title', 'property', 'tenant', 'status', 'priority', 'service_provider', 'requested_at']
+    list_display = ['title', 'property', 'tenant', 'status', 'priority', 'service_provider', 'duplicate_of', 'requested_at']
     list_filter = ['status', 'priority', 'requested_at']
     search_fields = ['title', 'description', 'property__name']
     ordering = ['-requested_at']
 
 
+@admin.register(ProviderBooking)
+class ProviderBookingAdmin(admin.ModelAdmin):
+    list_display = ['provider', 'maintenance_request', 'start_time', 'end_time']
+    list_filter = ['provider__provider_type', 'start_time']
+    search_fields = ['provider__company_name', 'maintenance_request__title']
+    ordering = ['-start_time']
+
+
 @admin.register(PropertyInspection)
 class PropertyInspectionAdmin(admin.ModelAdmin):
-    list_display = ['property', 'inspection_date', 'inspector', 'overall_condition', 'severity_score']
-    list_filter = ['inspection_date', 'overall_condition']
+    list_display = ['property', 'inspection_date', 'inspector', 'status', 'overall_condition', 'severity_score']
+    list_filter = ['status', 'inspection_date', 'overall_condition']
     search_fields = ['property__name', 'notes']
     ordering = ['-inspection_date']
 
@@ -71,3 +80,10 @@ class AuditLogAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'action']
     ordering = ['-timestamp']
 
+
+@admin.register(LLMCallRecord)
+class LLMCallRecordAdmin(admin.ModelAdmin):
+    list_display = ['provider', 'model', 'call_site', 'outcome', 'latency_ms', 'prompt_tokens', 'completion_tokens', 'estimated_cost', 'created_at']
+    list_filter = ['provider', 'call_site', 'outcome']
+    search_fields = ['call_site', 'error']
+    ordering = ['-created_at']
@@ -0,0 +1,58 @@
+"""
+Re-inspect the portfolio's latest photo sets under OpenAI rate limits
+
+Usage:
+    python manage.py inspection_sweep --dry-run
+    python manage.py inspection_sweep --rpm 500 --tpm 30000
+    python manage.py inspection_sweep --reset --property-ids 12 15 19
+"""
+from django.core.management.base import BaseCommand
+from services.inspection_sweep import InspectionSweep, SWEEP_CHECKPOINT, SWEEP_PROPERTY_CONCURRENCY
+from services.rate_limiter import OPENAI_RPM, OPENAI_TPM
+
+
+class Command(BaseCommand):
+    help = "Portfolio-wide inspection sweep with token-bucket rate limiting and resumable checkpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rpm", type=int, default=OPENAI_RPM, help="OpenAI requests per minute quota")
+        parser.add_argument("--tpm", type=int, default=OPENAI_TPM, help="OpenAI tokens per minute quota")
+        parser.add_argument("--concurrency", type=int, default=SWEEP_PROPERTY_CONCURRENCY,
+                            help="Properties analyzed at once")
+        parser.add_argument("--checkpoint", default=str(SWEEP_CHECKPOINT), help="Checkpoint file path")
+        parser.add_argument("--property-ids", type=int, nargs="+", help="Only sweep these properties")
+        parser.add_argument("--limit", type=int, help="Stop after this many properties")
+        parser.add_argument("--sweep-id", help="Sweep to run or resume (default: current quarter, e.g. 2026Q4)")
+        parser.add_argument("--reset", action="store_true", help="Ignore the checkpoint and start over")
+        parser.add_argument("--report-every", type=float, default=30.0, help="Seconds between progress lines")
+        parser.add_argument("--dry-run", action="store_true", help="Show the plan and time estimate only")
+
+    def handle(self, *args, **options):
+        sweep = InspectionSweep(
+            checkpoint_path=options["checkpoint"],
+            requests_per_minute=options["rpm"],
+            tokens_per_minute=options["tpm"],
+            property_concurrency=options["concurrency"],
+            property_ids=options["property_ids"],
+            limit=options["limit"],
+            reset=options["reset"],
+            report_every=options["report_every"],
+            sweep_id=options["sweep_id"]
+        )
+
+        if options["dry_run"]:
+            estimate = sweep.estimate(sweep.plan())
+            self.stdout.write(
+                f"{estimate['properties']} properties, {estimate['images']} images, "
+                f"~{estimate['estimated_tokens_per_call']} tokens per call; "
+                f"at least {estimate['estimated_minutes']} min ({estimate['limited_by']} bound)"
+            )
+            return
+
+        result = sweep.run()
+        checkpoint = result["checkpoint"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Swept {result['properties_swept']} properties / {result['images_analyzed']} images in "
+            f"{result['elapsed_seconds']}s ({result['images_per_minute']} images/min); "
+            f"{checkpoint['properties_failed']} failed so far, checkpoint {options['checkpoint']}"
+        ))
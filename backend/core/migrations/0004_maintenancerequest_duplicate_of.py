@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-19 11:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_provider_capacity_bookings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='core.maintenancerequest'),
+        ),
+        migrations.AlterField(
+            model_name='maintenancerequest',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('assigned', 'Assigned'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('duplicate', 'Duplicate')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_maintenancerequest_duplicate_of'),
+    ]
+
+    operations = [
+        # Inspections created before jobs existed were analyzed synchronously
+        migrations.AddField(
+            model_name='propertyinspection',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='propertyinspection',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='propertyinspection',
+            name='images_completed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='propertyinspection',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='propertyinspection',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:20
+
+import re
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def _cost_high(value):
+    """Upper bound of a "$2,500 - $4k" style estimate (frozen copy of the service parser)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    amounts = [
+        float(number.replace(',', '')) * (1000 if suffix.lower() == 'k' else 1)
+        for number, suffix in re.findall(r"(\d[\d,]*(?:\.\d+)?)\s*([kK]?)", str(value or ""))
+    ]
+    return max(amounts[:2]) if amounts else None
+
+
+def backfill_summary_columns(apps, schema_editor):
+    PropertyInspection = apps.get_model('core', 'PropertyInspection')
+
+    for inspection in PropertyInspection.objects.exclude(ai_report=None).only('id', 'ai_report').iterator():
+        report = inspection.ai_report if isinstance(inspection.ai_report, dict) else {}
+        damage_count, cost = 0, None
+
+        if isinstance(report.get('consolidated_analysis'), dict):
+            damage_count = report['consolidated_analysis'].get('total_damage_items', 0)
+            highs = [
+                _cost_high(result['analysis'].get('estimated_total_cost'))
+                for result in report.get('individual_results') or []
+                if result.get('success') and isinstance(result.get('analysis'), dict) and not result.get('duplicate_of')
+            ]
+            highs = [high for high in highs if high is not None]
+            cost = sum(highs) if highs else None
+        elif isinstance(report.get('roof_analysis'), dict):
+            damage_count = len(report['roof_analysis'].get('issues_found') or [])
+            cost_range = report['roof_analysis'].get('estimated_repair_cost_range')
+            cost = cost_range['high'] if cost_range else _cost_high(report['roof_analysis'].get('estimated_repair_cost'))
+
+        PropertyInspection.objects.filter(id=inspection.id).update(
+            damage_count=damage_count,
+            total_estimated_cost=round(Decimal(str(cost)), 2) if cost is not None else None
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_propertyinspection_job_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyinspection',
+            name='damage_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='propertyinspection',
+            name='total_estimated_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(backfill_summary_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_propertyinspection_summary_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCallRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=100)),
+                ('call_site', models.CharField(max_length=100)),
+                ('outcome', models.CharField(choices=[('success', 'Success'), ('error', 'Error'), ('timeout', 'Timeout'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('latency_ms', models.IntegerField()),
+                ('prompt_tokens', models.IntegerField(blank=True, null=True)),
+                ('completion_tokens', models.IntegerField(blank=True, null=True)),
+                ('estimated_cost', models.DecimalField(blank=True, decimal_places=6, max_digits=10, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['call_site', '-created_at'], name='core_llmcal_call_si_2e9405_idx')],
+            },
+        ),
+    ]
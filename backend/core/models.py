@@ -1,6 +1,7 @@
 """
 Django models for Happy Everyday Property Management Platform
 """
+from datetime import time
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -119,6 +120,11 @@ class ServiceProvider(models.Model):
     total_jobs = models.IntegerField(default=0)
     is_available = models.BooleanField(default=True)
     hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    work_start = models.TimeField(default=time(8, 0))
+    work_end = models.TimeField(default=time(17, 0))
+    max_jobs_per_day = models.IntegerField(default=8, validators=[MinValueValidator(1)])
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -134,6 +140,7 @@ class MaintenanceRequest(models.Model):
         ('in_progress', 'In Progress'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
+        ('duplicate', 'Duplicate'),
     ]
     
     PRIORITY_CHOICES = [
@@ -146,6 +153,7 @@ class MaintenanceRequest(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='maintenance_requests')
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='maintenance_requests')
     service_provider = models.ForeignKey(ServiceProvider, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_requests')
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
     title = models.CharField(max_length=255)
     description = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -164,17 +172,47 @@ class MaintenanceRequest(models.Model):
         return f"{self.title} - {self.property.name} ({self.status})"
 
 
+class ProviderBooking(models.Model):
+    """Booked time slot on a service provider's calendar"""
+    provider = models.ForeignKey(ServiceProvider, on_delete=models.CASCADE, related_name='bookings')
+    maintenance_request = models.ForeignKey(MaintenanceRequest, on_delete=models.CASCADE, null=True, blank=True, related_name='bookings')
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['start_time']
+        indexes = [models.Index(fields=['provider', 'start_time'])]
+    
+    def __str__(self):
+        return f"{self.provider.company_name} @ {self.start_time:%Y-%m-%d %H:%M}-{self.end_time:%H:%M}"
+
+
 class PropertyInspection(models.Model):
     """Property inspection records with AI analysis"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='inspections')
     inspector = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='inspections')
     inspection_date = models.DateTimeField()
     inspection_type = models.CharField(max_length=50, default='routine')
-    images = models.JSONField(default=list)  # Store image paths
+    images = models.JSONField(default=list)  # Image content hashes (older rows hold file paths)
     ai_report = models.JSONField(null=True, blank=True)
     overall_condition = models.CharField(max_length=20, null=True, blank=True)
     severity_score = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(10)], null=True, blank=True)
+    # Summary of ai_report kept in columns so lists need not load the report
+    damage_count = models.IntegerField(default=0)
+    total_estimated_cost = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)  # Upper bound, USD
     notes = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    images_completed = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -264,3 +302,31 @@ class ComparableListing(models.Model):
 
     def __str__(self):
         return f"Comparable: {self.title} ({self.price})"
+
+
+class LLMCallRecord(models.Model):
+    """One call to an external LLM API, flushed in batches by services.llm_telemetry"""
+    OUTCOME_CHOICES = [
+        ('success', 'Success'),
+        ('error', 'Error'),
+        ('timeout', 'Timeout'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    provider = models.CharField(max_length=50)
+    model = models.CharField(max_length=100)
+    call_site = models.CharField(max_length=100)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    latency_ms = models.IntegerField()
+    prompt_tokens = models.IntegerField(null=True, blank=True)
+    completion_tokens = models.IntegerField(null=True, blank=True)
+    estimated_cost = models.DecimalField(max_digits=10, decimal_places=6, null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['call_site', '-created_at'])]
+
+    def __str__(self):
+        return f"{self.provider}/{self.model} {self.call_site} {self.outcome} ({self.latency_ms} ms)"
@@ -3,10 +3,11 @@ FastAPI + Django integration for Happy Everyday Property Management Platform
 Scenario D: FastAPI encapsulating Django in single ASGI process
 """
 import os
+import asyncio
 import django
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
 # Setup Django
@@ -15,14 +16,21 @@ django.setup()
 
 from api import analytics, inspections, providers, privacy, test_perplexity
 from middleware.auth import get_current_user
+from services.image_preprocessor import ImagePreprocessor
+from services.http_clients import HTTPClients
+from services.llm_telemetry import llm_telemetry
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle management for FastAPI app"""
     print("🚀 Happy Everyday Property Management API starting...")
+    await HTTPClients.startup()
     yield
     print("👋 Shutting down...")
+    await HTTPClients.shutdown()
+    await asyncio.to_thread(llm_telemetry.shutdown)
+    ImagePreprocessor.shutdown()
 
 
 app = FastAPI(
@@ -58,6 +66,14 @@ async def health_check():
     return {"status": "healthy", "version": "0.0.2"}
 
 
+@app.get("/metrics")
+async def metrics(format: str = Query("prometheus", pattern="^(prometheus|json)$")):
+    """LLM call latency, token and cost metrics (Prometheus text, or JSON totals per call site)"""
+    if format == "json":
+        return llm_telemetry.summary()
+    return PlainTextResponse(llm_telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 # Include routers
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(inspections.router, prefix="/api/inspections", tags=["Inspections"])
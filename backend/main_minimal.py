@@ -2,15 +2,33 @@
 Minimal FastAPI backend for testing Perplexity API
 """
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import requests
+import httpx
+
+# Standalone on purpose (importing services pulls in Django), so this app
+# keeps its own pooled client instead of services.http_clients
+http_client: httpx.AsyncClient = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(30, connect=5),
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+    )
+    yield
+    await http_client.aclose()
+
 
 app = FastAPI(
     title="Happy Everyday Property Management API",
     description="AI-Powered Property Management System",
     version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -72,7 +90,7 @@ async def test_perplexity_api(request: TestQuery):
             "frequency_penalty": 1
         }
         
-        response = requests.post(
+        response = await http_client.post(
             "https://api.perplexity.ai/chat/completions",
             headers=headers,
             json=payload,
@@ -3,6 +3,7 @@ Simple FastAPI backend for Happy Everyday Property Management
 Focused on Perplexity AI integration without Django dependencies
 """
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -12,11 +13,21 @@ import uuid
 # Import services
 from services.perplexity_service import PerplexityService
 from services.property_analyzer import PropertyAnalyzer
+from services.http_clients import HTTPClients
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await HTTPClients.startup()
+    yield
+    await HTTPClients.shutdown()
+
 
 app = FastAPI(
     title="Happy Everyday Property Management API",
     description="AI-Powered Property Management System",
     version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -56,7 +67,7 @@ async def test_perplexity_api(request: TestQuery):
             raise HTTPException(status_code=500, detail="PERPLEXITY_API_KEY not configured")
         
         service = PerplexityService()
-        result = service._make_request([{"role": "user", "content": request.query}])
+        result = await service._make_request_async([{"role": "user", "content": request.query}], call_site="test.perplexity")
         
         if result["success"]:
             return {"result": result["content"]}
@@ -84,7 +95,7 @@ async def analyze_property(request: AnalyzeRequest):
         })
 
         PropertyAnalyzer._update_progress(analysis_id, 10, "Researching property with Perplexity AI...")
-        raw_data = service.research_comprehensive_property(request.address)
+        raw_data = await service.research_comprehensive_property_async(request.address)
 
         PropertyAnalyzer._update_progress(analysis_id, 60, "Transforming data for frontend...")
         transformed = PropertyAnalyzer.transform_comprehensive_report(raw_data, request.address, analysis_id)
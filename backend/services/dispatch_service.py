@@ -4,11 +4,19 @@ AI-powered triage, route optimization, and automated assignment
 """
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from django.db import transaction
 from django.db.models import Q
-from core.models import MaintenanceRequest, ServiceProvider, Property
+from django.utils import timezone
+from core.models import MaintenanceRequest, ServiceProvider, Property, ProviderBooking
+from services.provider_calendar import ProviderCalendar
+from services.duplicate_detector import DuplicateDetector
 import math
 
 
+# Average driving speed used to turn distance into travel time
+TRAVEL_SPEED_MPH = 30
+
+
 class DispatchService:
     """Automated service provider dispatch and scheduling"""
     
@@ -22,6 +30,30 @@ class DispatchService:
         'general': []
     }
     
+    # Target time from request to provider on site, by priority
+    PRIORITY_SLA_HOURS = {
+        'urgent': 4,
+        'high': 24,
+        'medium': 72,
+        'low': 168,
+    }
+    
+    # Expected on-site time per job, by category
+    JOB_DURATION_HOURS = {
+        'plumbing': 2,
+        'electrical': 2,
+        'hvac': 3,
+        'landscaping': 2,
+        'snow_removal': 1,
+        'general': 2,
+    }
+    
+    # How far ahead to look for a free slot
+    SCHEDULING_HORIZON_DAYS = 7
+    
+    # Attempts to book a slot before giving up on concurrent conflicts
+    BOOKING_ATTEMPTS = 3
+    
     @staticmethod
     def categorize_request(description: str) -> str:
         """
@@ -75,76 +107,227 @@ class DispatchService:
         
         return R * c
     
+    @classmethod
+    def job_duration(cls, category: str) -> timedelta:
+        """Expected on-site time for a job category"""
+        return timedelta(hours=cls.JOB_DURATION_HOURS.get(category, 2))
+    
+    @staticmethod
+    def get_candidate_providers(category: str) -> List[ServiceProvider]:
+        """Available providers for a category, falling back to general repairs"""
+        providers = list(ServiceProvider.objects.filter(
+            provider_type=category,
+            is_available=True
+        ).order_by('-rating'))
+        
+        if not providers and category != 'general':
+            providers = list(ServiceProvider.objects.filter(
+                provider_type='general',
+                is_available=True
+            ).order_by('-rating'))
+        
+        return providers
+    
+    @classmethod
+    def find_best_slot(
+        cls,
+        request: MaintenanceRequest,
+        earliest: Optional[datetime] = None,
+        duration: Optional[timedelta] = None,
+        jobs: int = 1,
+        calendar: Optional[ProviderCalendar] = None
+    ) -> Optional[Dict]:
+        """
+        Find the provider who can take the job soonest
+        
+        Ranks candidates by:
+        - Arrival time: earliest free slot within working hours and daily
+          capacity, plus travel time from the provider's base (if property
+          and provider have coordinates), so a provider next door beats a
+          distant one whose slot is only minutes earlier
+        - Rating
+        
+        Returns {"provider", "start", "end"} or None if nobody has room
+        within the scheduling horizon. duration and jobs size the slot for
+        a multi-request visit; by default it fits this one request. Pass the
+        dispatch pass's calendar to avoid reloading bookings.
+        """
+        category = cls.categorize_request(request.description)
+        providers = cls.get_candidate_providers(category)
+        
+        if not providers:
+            return None
+        
+        duration = duration or cls.job_duration(category)
+        if calendar is None:
+            calendar = ProviderCalendar(providers, start=earliest, days=cls.SCHEDULING_HORIZON_DAYS)
+        else:
+            calendar.add_providers(providers)
+        earliest = earliest or timezone.now()
+        prop = request.property
+        
+        best = None
+        best_key = None
+        for provider in providers:
+            slot = calendar.earliest_slot(provider.id, duration, earliest=earliest, jobs=jobs)
+            if not slot:
+                continue
+            
+            distance = 0.0
+            if prop.latitude and prop.longitude and provider.latitude and provider.longitude:
+                distance = cls.calculate_distance(
+                    float(prop.latitude), float(prop.longitude),
+                    float(provider.latitude), float(provider.longitude)
+                )
+            
+            arrival = slot[0] + timedelta(hours=distance / TRAVEL_SPEED_MPH)
+            key = (arrival, -provider.rating)
+            if best_key is None or key < best_key:
+                best_key = key
+                best = {"provider": provider, "start": slot[0], "end": slot[1]}
+        
+        return best
+    
     @classmethod
     def find_best_provider(cls, request: MaintenanceRequest) -> Optional[ServiceProvider]:
         """
         Find the best service provider based on:
-        - Availability
+        - Availability (working hours and remaining daily capacity)
         - Provider type match
         - Rating
         - Location proximity (if property has coordinates)
         """
-        category = cls.categorize_request(request.description)
+        slot = cls.find_best_slot(request)
+        return slot["provider"] if slot else None
+    
+    @staticmethod
+    def _slot_is_free(provider: ServiceProvider, start: datetime, end: datetime, jobs: int = 1) -> bool:
+        """Re-check a slot against the database (caller holds the provider row lock)"""
+        overlapping = ProviderBooking.objects.filter(
+            provider=provider,
+            start_time__lt=end,
+            end_time__gt=start
+        ).exists()
+        if overlapping:
+            return False
         
-        # Find available providers of the right type
-        providers = ServiceProvider.objects.filter(
-            provider_type=category,
-            is_available=True
-        ).order_by('-rating')
+        day_start = timezone.localtime(start).replace(hour=0, minute=0, second=0, microsecond=0)
+        booked_today = ProviderBooking.objects.filter(
+            provider=provider,
+            start_time__gte=day_start,
+            start_time__lt=day_start + timedelta(days=1)
+        ).count()
+        return booked_today + jobs <= provider.max_jobs_per_day
+    
+    @classmethod
+    def book_best_slot(
+        cls,
+        request: MaintenanceRequest,
+        visit_requests: Optional[List[MaintenanceRequest]] = None,
+        calendar: Optional[ProviderCalendar] = None
+    ) -> Optional[Dict]:
+        """
+        Find and book the soonest slot for a request
         
-        if not providers.exists():
-            # Fallback to general providers
-            providers = ServiceProvider.objects.filter(
-                provider_type='general',
-                is_available=True
-            ).order_by('-rating')
+        With visit_requests, every request in the list is booked back to back
+        in one contiguous block with the same provider (a single visit).
         
-        if not providers.exists():
-            return None
+        The chosen provider's row is locked while the slot is re-checked, so
+        two concurrent assignments cannot overbook the same provider. New
+        bookings are recorded in `calendar` so the rest of the pass sees them;
+        callers that wrap this in a larger transaction should do so inside
+        calendar.tentative() so a rollback also drops them from the calendar.
+        """
+        requests = visit_requests or [request]
+        durations = [cls.job_duration(cls.categorize_request(r.description)) for r in requests]
+        total = sum(durations, timedelta())
+        calendar = calendar or ProviderCalendar(days=cls.SCHEDULING_HORIZON_DAYS)
         
-        # If property has coordinates, sort by distance
-        if request.property.latitude and request.property.longitude:
-            # Calculate distances (simplified - in production, would use proper geocoding)
-            best_provider = providers.first()
-        else:
-            # Just use highest rated available provider
-            best_provider = providers.first()
+        for _ in range(cls.BOOKING_ATTEMPTS):
+            slot = cls.find_best_slot(request, duration=total, jobs=len(requests), calendar=calendar)
+            if not slot:
+                return None
+            
+            with transaction.atomic():
+                provider = ServiceProvider.objects.select_for_update().get(id=slot["provider"].id)
+                if not cls._slot_is_free(provider, slot["start"], slot["end"], jobs=len(requests)):
+                    # Booked elsewhere since the calendar was loaded
+                    calendar.reload(provider.id)
+                    continue
+                
+                bookings = []
+                start = slot["start"]
+                for req, duration in zip(requests, durations):
+                    bookings.append(ProviderBooking.objects.create(
+                        provider=provider,
+                        maintenance_request=req,
+                        start_time=start,
+                        end_time=start + duration
+                    ))
+                    calendar.book(provider.id, start, start + duration)
+                    start += duration
+                
+                return {"provider": provider, "booking": bookings[0], "bookings": bookings}
         
-        return best_provider
+        return None
     
     @classmethod
-    def auto_assign_request(cls, request_id: int) -> Dict:
+    def auto_assign_request(cls, request_id: int, calendar: Optional[ProviderCalendar] = None) -> Dict:
         """
         Automatically assign a maintenance request to best available provider
+        
+        When assigning many requests in one pass, build a ProviderCalendar
+        once and pass it to every call.
         """
         try:
             request = MaintenanceRequest.objects.get(id=request_id)
             
             # Categorize and assess priority
             category = cls.categorize_request(request.description)
-            if not request.priority or request.priority == 'medium':
-                priority = cls.assess_priority(request.description)
-                request.priority = priority
             
-            # Find best provider
-            provider = cls.find_best_provider(request)
-            
-            if not provider:
+            # Repeat report of an open request: link it instead of dispatching
+            duplicate = DuplicateDetector.find_duplicate(request)
+            if duplicate:
+                request.duplicate_of_id = duplicate["request_id"]
+                request.status = 'duplicate'
+                request.save()
+                
                 return {
-                    "success": False,
-                    "error": "No available providers found",
+                    "success": True,
+                    "request_id": request.id,
+                    "linked": True,
+                    "duplicate_of": duplicate["request_id"],
+                    "similarity": duplicate["similarity"],
                     "category": category
                 }
+            if not request.priority or request.priority == 'medium':
+                priority = cls.assess_priority(request.description)
+                request.priority = priority
             
-            # Assign provider
-            request.service_provider = provider
-            request.status = 'assigned'
-            request.assigned_at = datetime.now()
-            request.save()
-            
-            # Update provider stats
-            provider.total_jobs += 1
-            provider.save()
+            calendar = calendar or ProviderCalendar(days=cls.SCHEDULING_HORIZON_DAYS)
+            with calendar.tentative(), transaction.atomic():
+                # Find best provider and book their soonest slot
+                booked = cls.book_best_slot(request, calendar=calendar)
+                
+                if not booked:
+                    return {
+                        "success": False,
+                        "error": "No available providers found",
+                        "category": category
+                    }
+                
+                provider = booked["provider"]
+                booking = booked["booking"]
+                
+                # Assign provider
+                request.service_provider = provider
+                request.status = 'assigned'
+                request.assigned_at = datetime.now()
+                request.save()
+                
+                # Update provider stats
+                provider.total_jobs += 1
+                provider.save()
             
             return {
                 "success": True,
@@ -156,7 +339,9 @@ class DispatchService:
                     "rating": float(provider.rating)
                 },
                 "category": category,
-                "priority": request.priority
+                "priority": request.priority,
+                "scheduled_start": booking.start_time.isoformat(),
+                "scheduled_end": booking.end_time.isoformat()
             }
             
         except MaintenanceRequest.DoesNotExist:
@@ -181,15 +366,17 @@ class DispatchService:
         start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
         end_of_day = start_of_day + timedelta(days=1)
         
+        # Booked jobs on this day, plus legacy assignments made without a booking
         requests = MaintenanceRequest.objects.filter(
+            Q(bookings__start_time__gte=start_of_day, bookings__start_time__lt=end_of_day) |
+            Q(bookings__isnull=True, assigned_at__gte=start_of_day, assigned_at__lt=end_of_day),
             service_provider_id=provider_id,
-            status__in=['assigned', 'in_progress'],
-            assigned_at__gte=start_of_day,
-            assigned_at__lt=end_of_day
-        ).order_by('priority', 'requested_at')
+            status__in=['assigned', 'in_progress']
+        ).distinct().select_related('property').prefetch_related('bookings').order_by('priority', 'requested_at')
         
         schedule = []
         for req in requests:
+            booking = next(iter(req.bookings.all()), None)
             schedule.append({
                 "request_id": req.id,
                 "property": {
@@ -200,7 +387,9 @@ class DispatchService:
                 "title": req.title,
                 "priority": req.priority,
                 "status": req.status,
-                "assigned_at": req.assigned_at.isoformat() if req.assigned_at else None
+                "assigned_at": req.assigned_at.isoformat() if req.assigned_at else None,
+                "scheduled_start": booking.start_time.isoformat() if booking else None,
+                "scheduled_end": booking.end_time.isoformat() if booking else None
             })
         
         return {
@@ -0,0 +1,365 @@
+"""
+Synthetic dispatch simulator for benchmarking provider assignment at scale
+Deterministic and seedable: the same seed always produces the same workload
+"""
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.db import transaction
+from core.models import Property, Tenant, ServiceProvider, MaintenanceRequest
+from services.dispatch_service import DispatchService
+from services.provider_calendar import ProviderCalendar
+
+
+# Metro areas the synthetic portfolio is spread across: (city, state, lat, lng)
+METRO_AREAS = [
+    ("Sioux Falls", "SD", 43.5446, -96.7311),
+    ("Yankton", "SD", 42.8711, -97.3973),
+    ("Omaha", "NE", 41.2565, -95.9345),
+    ("Des Moines", "IA", 41.5868, -93.6250),
+    ("Minneapolis", "MN", 44.9778, -93.2650),
+]
+
+# Share of incoming requests per category
+CATEGORY_WEIGHTS = {
+    'plumbing': 0.30,
+    'hvac': 0.20,
+    'general': 0.20,
+    'electrical': 0.15,
+    'landscaping': 0.10,
+    'snow_removal': 0.05,
+}
+
+# Tenant-style descriptions; each one triages to its category
+REQUEST_TEMPLATES = {
+    'plumbing': [
+        "Kitchen faucet dripping constantly",
+        "Toilet keeps running after flushing",
+        "Bathroom sink drain is slow",
+        "Leak under the bathtub",
+        "Burst pipe in the basement",
+    ],
+    'electrical': [
+        "Outlet in the bedroom stopped working",
+        "Breaker trips when the microwave runs",
+        "Hallway light fixture flickering",
+        "Exposed wiring near the garage door",
+    ],
+    'hvac': [
+        "Furnace making a loud banging noise",
+        "Thermostat not responding",
+        "AC unit blowing warm air",
+        "Heat not coming on in the living room",
+    ],
+    'landscaping': [
+        "Overgrown lawn needs mowing",
+        "Fallen tree branch blocking the path",
+        "Garden beds need weeding",
+    ],
+    'snow_removal': [
+        "Snow piled up in the parking lot",
+        "Ice on the front steps",
+        "Driveway needs to be plowed",
+    ],
+    'general': [
+        "Cabinet door hinge broken",
+        "Squeaky bedroom door",
+        "Loose handrail on the stairs",
+        "Hole in the hallway drywall",
+    ],
+}
+
+URGENT_PREFIX = "Emergency: "
+URGENT_RATE = 0.05
+
+# Field assumption for the simulated clock
+TRAVEL_SPEED_MPH = 30
+
+SIMULATION_TAG = "[sim]"
+
+
+@dataclass
+class SimulationConfig:
+    """Workload shape for one simulation run"""
+    seed: int = 42
+    num_providers: int = 50
+    num_requests: int = 500
+    num_properties: int = 100
+    arrivals_per_hour: float = 6.0
+    property_spread_miles: float = 5.0
+    provider_spread_miles: float = 15.0
+    start_time: datetime = field(default_factory=lambda: datetime(2025, 1, 6, 8, 0))
+
+
+@dataclass
+class SimulatedRequest:
+    request_id: int
+    property_id: int
+    category: str
+    arrival: datetime
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _jitter(rng: random.Random, lat: float, lng: float, spread_miles: float):
+    """Scatter a point around a center with a normal spread in miles"""
+    d_lat = rng.gauss(0, spread_miles) / 69.0
+    d_lng = rng.gauss(0, spread_miles) / (69.0 * math.cos(math.radians(lat)))
+    return round(lat + d_lat, 6), round(lng + d_lng, 6)
+
+
+def nearest_provider_strategy(request_id: int, calendar: Optional[ProviderCalendar] = None) -> Dict:
+    """
+    Baseline strategy: closest available provider of the triaged category,
+    ignoring rating
+    """
+    request = MaintenanceRequest.objects.select_related('property').get(id=request_id)
+    category = DispatchService.categorize_request(request.description)
+    providers = ServiceProvider.objects.filter(
+        provider_type=category,
+        is_available=True,
+        latitude__isnull=False
+    )
+
+    prop = request.property
+    best = min(
+        providers,
+        key=lambda p: DispatchService.calculate_distance(
+            float(prop.latitude), float(prop.longitude), float(p.latitude), float(p.longitude)
+        ),
+        default=None
+    )
+    if not best:
+        return {"success": False, "error": "No available providers found", "category": category}
+
+    request.service_provider = best
+    request.status = 'assigned'
+    request.assigned_at = datetime.now()
+    request.priority = DispatchService.assess_priority(request.description)
+    request.save()
+
+    best.total_jobs += 1
+    best.save()
+
+    return {"success": True, "request_id": request.id, "provider": {"id": best.id}, "category": category}
+
+
+# Dispatch strategies the simulator can compare; each takes a request id and
+# the pass's ProviderCalendar and returns an auto_assign_request-style result dict
+STRATEGIES: Dict[str, Callable[..., Dict]] = {
+    'default': DispatchService.auto_assign_request,
+    'nearest': nearest_provider_strategy,
+}
+
+
+class DispatchSimulator:
+    """Generate a synthetic workload and drive the dispatch service end to end"""
+
+    def __init__(self, config: Optional[SimulationConfig] = None):
+        self.config = config or SimulationConfig()
+
+    def run(self, strategy: str = 'default', keep_data: bool = False) -> Dict:
+        """
+        Run one simulation against the configured database
+
+        All synthetic rows are created inside a transaction that is rolled
+        back at the end unless keep_data is set, so runs never leak into
+        real data.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'. Available: {', '.join(STRATEGIES)}")
+
+        with transaction.atomic():
+            report = self._run(STRATEGIES[strategy])
+            report["strategy"] = strategy
+            if not keep_data:
+                transaction.set_rollback(True)
+
+        return report
+
+    def _run(self, assign: Callable[..., Dict]) -> Dict:
+        rng = random.Random(self.config.seed)
+        properties = self._create_properties(rng)
+        providers = self._create_providers(rng)
+        tenants = self._create_tenants(properties)
+        workload = self._create_requests(rng, properties, tenants)
+
+        property_coords = {p.id: (float(p.latitude), float(p.longitude)) for p in properties}
+        provider_position = {p.id: (float(p.latitude), float(p.longitude)) for p in providers}
+        provider_free_at: Dict[int, datetime] = {}
+
+        assign_latencies = []
+        travel_distances = []
+        sla_misses = 0
+        assigned = 0
+        linked = 0
+        triage_hits = 0
+
+        wall_start = time.perf_counter()
+        calendar = ProviderCalendar(days=DispatchService.SCHEDULING_HORIZON_DAYS)
+        for item in workload:
+            started = time.perf_counter()
+            result = assign(item.request_id, calendar=calendar)
+            assign_latencies.append((time.perf_counter() - started) * 1000)
+
+            if not result.get("success"):
+                continue
+            if result.get("linked"):
+                linked += 1
+                continue
+
+            assigned += 1
+            if result.get("category") == item.category:
+                triage_hits += 1
+
+            # Advance the simulated clock for the assigned provider
+            provider_id = result["provider"]["id"]
+            here = provider_position[provider_id]
+            there = property_coords[item.property_id]
+            distance = DispatchService.calculate_distance(here[0], here[1], there[0], there[1])
+            travel_distances.append(distance)
+
+            ready = max(item.arrival, provider_free_at.get(provider_id, self.config.start_time))
+            on_site = ready + timedelta(hours=distance / TRAVEL_SPEED_MPH)
+            service_hours = DispatchService.JOB_DURATION_HOURS.get(item.category, 2)
+            provider_free_at[provider_id] = on_site + timedelta(hours=service_hours)
+            provider_position[provider_id] = there
+
+            priority = MaintenanceRequest.objects.values_list('priority', flat=True).get(id=item.request_id)
+            sla = timedelta(hours=DispatchService.PRIORITY_SLA_HOURS.get(priority, 72))
+            if on_site - item.arrival > sla:
+                sla_misses += 1
+        wall_seconds = time.perf_counter() - wall_start
+
+        route_latencies = []
+        for provider_id in provider_free_at:
+            started = time.perf_counter()
+            DispatchService.optimize_route(provider_id)
+            route_latencies.append((time.perf_counter() - started) * 1000)
+
+        return {
+            "seed": self.config.seed,
+            "providers": len(providers),
+            "requests": len(workload),
+            "assigned": assigned,
+            "duplicates_linked": linked,
+            "unassigned": len(workload) - assigned - linked,
+            "throughput_per_second": round(assigned / wall_seconds, 2) if wall_seconds else 0,
+            "assign_latency_ms": {
+                "p50": round(_percentile(assign_latencies, 50), 2),
+                "p90": round(_percentile(assign_latencies, 90), 2),
+                "p99": round(_percentile(assign_latencies, 99), 2),
+            },
+            "route_latency_ms": {
+                "p50": round(_percentile(route_latencies, 50), 2),
+                "p90": round(_percentile(route_latencies, 90), 2),
+                "p99": round(_percentile(route_latencies, 99), 2),
+            },
+            "avg_travel_miles": round(sum(travel_distances) / len(travel_distances), 2) if travel_distances else 0,
+            "sla_misses": sla_misses,
+            "sla_miss_rate": round(sla_misses / assigned * 100, 2) if assigned else 0,
+            "triage_accuracy": round(triage_hits / assigned * 100, 2) if assigned else 0,
+        }
+
+    def _create_properties(self, rng: random.Random) -> List[Property]:
+        properties = []
+        for i in range(self.config.num_properties):
+            city, state, lat, lng = rng.choice(METRO_AREAS)
+            p_lat, p_lng = _jitter(rng, lat, lng, self.config.property_spread_miles)
+            properties.append(Property(
+                name=f"{SIMULATION_TAG} Property {i + 1}",
+                address=f"{100 + i} Simulated Ave",
+                city=city,
+                state=state,
+                zip_code="00000",
+                property_type='residential',
+                total_units=rng.randint(1, 24),
+                latitude=p_lat,
+                longitude=p_lng,
+            ))
+        return Property.objects.bulk_create(properties)
+
+    def _create_providers(self, rng: random.Random) -> List[ServiceProvider]:
+        categories = list(CATEGORY_WEIGHTS)
+        providers = []
+        for i in range(self.config.num_providers):
+            # Round-robin guarantees every category is covered at least once
+            category = categories[i % len(categories)] if i < len(categories) else rng.choices(
+                categories, weights=list(CATEGORY_WEIGHTS.values())
+            )[0]
+            city, state, lat, lng = rng.choice(METRO_AREAS)
+            p_lat, p_lng = _jitter(rng, lat, lng, self.config.provider_spread_miles)
+            providers.append(ServiceProvider(
+                name=f"Provider {i + 1}",
+                company_name=f"{SIMULATION_TAG} {category.replace('_', ' ').title()} Co {i + 1}",
+                provider_type=category,
+                email=f"provider{i + 1}@example.com",
+                phone="555-0100",
+                address=f"{city}, {state}",
+                rating=round(rng.uniform(3.0, 5.0), 2),
+                latitude=p_lat,
+                longitude=p_lng,
+            ))
+        return ServiceProvider.objects.bulk_create(providers)
+
+    def _create_tenants(self, properties: List[Property]) -> Dict[int, Tenant]:
+        today = date.today()
+        tenants = [
+            Tenant(
+                property=prop,
+                first_name="Sim",
+                last_name=f"Tenant {i + 1}",
+                email=f"tenant{i + 1}@example.com",
+                phone="555-0101",
+                unit_number="1",
+                lease_start=today - timedelta(days=180),
+                lease_end=today + timedelta(days=185),
+                rent_amount=1200,
+                security_deposit=1200,
+            )
+            for i, prop in enumerate(properties)
+        ]
+        return {t.property_id: t for t in Tenant.objects.bulk_create(tenants)}
+
+    def _create_requests(
+        self,
+        rng: random.Random,
+        properties: List[Property],
+        tenants: Dict[int, Tenant]
+    ) -> List[SimulatedRequest]:
+        categories = list(CATEGORY_WEIGHTS)
+        weights = list(CATEGORY_WEIGHTS.values())
+        clock = self.config.start_time
+
+        pending = []
+        for _ in range(self.config.num_requests):
+            # Poisson arrivals: exponential gaps between requests
+            clock += timedelta(hours=rng.expovariate(self.config.arrivals_per_hour))
+            category = rng.choices(categories, weights=weights)[0]
+            description = rng.choice(REQUEST_TEMPLATES[category])
+            if rng.random() < URGENT_RATE:
+                description = URGENT_PREFIX + description
+            prop = rng.choice(properties)
+            pending.append((clock, category, prop, MaintenanceRequest(
+                property=prop,
+                tenant=tenants[prop.id],
+                title=description[:60],
+                description=description,
+            )))
+
+        created = MaintenanceRequest.objects.bulk_create([row for _, _, _, row in pending])
+        return [
+            SimulatedRequest(request_id=row.id, property_id=prop.id, category=category, arrival=arrival)
+            for (arrival, category, prop, _), row in zip(pending, created)
+        ]
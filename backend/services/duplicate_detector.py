@@ -0,0 +1,282 @@
+"""
+Near-duplicate maintenance request detection
+MinHash signatures with LSH banding over recent request descriptions,
+partitioned by property
+"""
+import hashlib
+import os
+import random
+import re
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.utils import timezone
+from core.models import MaintenanceRequest
+
+
+# How far back a new request is compared against open requests
+DUPLICATE_WINDOW_HOURS = int(os.getenv('DUPLICATE_WINDOW_HOURS', '72'))
+
+# Estimated Jaccard similarity needed to link two requests
+DUPLICATE_SIMILARITY_THRESHOLD = float(os.getenv('DUPLICATE_SIMILARITY_THRESHOLD', '0.45'))
+
+# Requests that can still absorb a duplicate
+OPEN_STATUSES = ['pending', 'assigned', 'in_progress']
+
+STOPWORDS = {
+    'a', 'an', 'the', 'in', 'on', 'at', 'of', 'to', 'is', 'it', 'and', 'or', 'my', 'our',
+    'from', 'with', 'there', 'this', 'that', 'please', 'again', 'unit', 'apt', 'room',
+}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHasher:
+    """MinHash signatures over character shingles of normalized text"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 4, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        return " ".join(w for w in words if w not in STOPWORDS)
+
+    def shingles(self, text: str) -> Set[int]:
+        normalized = self.normalize(text)
+        k = self.shingle_size
+        if len(normalized) <= k:
+            grams = {normalized} if normalized else set()
+        else:
+            grams = {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+        return {
+            int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), 'big')
+            for g in grams
+        }
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        shingles = self.shingles(text)
+        if not shingles:
+            return tuple([_MAX_HASH] * self.num_perm)
+        return tuple(
+            min(((a * s + b) % _MERSENNE_PRIME) & _MAX_HASH for s in shingles)
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity: share of matching signature slots"""
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+@dataclass
+class _Entry:
+    request_id: int
+    category: str
+    signature: Tuple[int, ...]
+    requested_at: datetime
+
+
+class _PropertyPartition:
+    """Recent requests for one property, bucketed by LSH band"""
+
+    def __init__(self, bands: int, rows: int, max_entries: int):
+        self.bands = bands
+        self.rows = rows
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], Set[int]] = defaultdict(set)
+        self.last_synced_id = 0
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, entry: _Entry) -> None:
+        if entry.request_id in self.entries:
+            return
+        self.entries[entry.request_id] = entry
+        for key in self._band_keys(entry.signature):
+            self.buckets[key].add(entry.request_id)
+        while len(self.entries) > self.max_entries:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, request_id: int) -> None:
+        entry = self.entries.pop(request_id, None)
+        if not entry:
+            return
+        for key in self._band_keys(entry.signature):
+            bucket = self.buckets.get(key)
+            if bucket:
+                bucket.discard(request_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def expire(self, cutoff: datetime) -> None:
+        """Drop entries older than the window (entries are in arrival order)"""
+        while self.entries:
+            oldest = next(iter(self.entries.values()))
+            if oldest.requested_at >= cutoff:
+                break
+            self.remove(oldest.request_id)
+
+    def candidates(self, signature: Tuple[int, ...]) -> Set[int]:
+        found = set()
+        for key in self._band_keys(signature):
+            found.update(self.buckets.get(key, ()))
+        return found
+
+
+class DuplicateIndex:
+    """
+    Bounded in-memory LSH index, one partition per property
+
+    Memory is capped by entries per property and by the number of
+    properties kept (least recently used partitions are dropped). A
+    lookup touches a fixed number of band buckets, and each partition's
+    bounded size caps the candidate verification.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 32,
+        max_entries_per_property: int = 200,
+        max_properties: int = 5000
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries_per_property = max_entries_per_property
+        self.max_properties = max_properties
+        self.partitions: "OrderedDict[int, _PropertyPartition]" = OrderedDict()
+        self.lock = Lock()
+
+    def partition(self, property_id: int) -> _PropertyPartition:
+        partition = self.partitions.get(property_id)
+        if partition is None:
+            partition = _PropertyPartition(self.bands, self.rows, self.max_entries_per_property)
+            self.partitions[property_id] = partition
+            while len(self.partitions) > self.max_properties:
+                self.partitions.popitem(last=False)
+        else:
+            self.partitions.move_to_end(property_id)
+        return partition
+
+    def find_matches(
+        self,
+        property_id: int,
+        category: str,
+        signature: Tuple[int, ...],
+        threshold: float
+    ) -> List[Tuple[int, float]]:
+        """Indexed requests at the property above the threshold, best first"""
+        partition = self.partition(property_id)
+        matches = []
+        for request_id in partition.candidates(signature):
+            entry = partition.entries[request_id]
+            if entry.category != category:
+                continue
+            score = MinHasher.similarity(signature, entry.signature)
+            if score >= threshold:
+                matches.append((request_id, score))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+
+_index = DuplicateIndex()
+
+
+class DuplicateDetector:
+    """Link repeat reports of the same problem instead of dispatching them"""
+
+    @staticmethod
+    def _sync_partition(property_id: int, cutoff: datetime) -> None:
+        """
+        Pull requests raised at this property since the last sync
+
+        Keeps each worker's index consistent with requests created by other
+        workers; the query is bounded by the window and the last seen id.
+        """
+        from services.dispatch_service import DispatchService
+
+        partition = _index.partition(property_id)
+        rows = MaintenanceRequest.objects.filter(
+            property_id=property_id,
+            id__gt=partition.last_synced_id,
+            requested_at__gte=cutoff
+        ).exclude(status='duplicate').order_by('id').values_list('id', 'description', 'requested_at')
+
+        for request_id, description, requested_at in rows:
+            partition.add(_Entry(
+                request_id=request_id,
+                category=DispatchService.categorize_request(description),
+                signature=_index.hasher.signature(description),
+                requested_at=requested_at
+            ))
+            partition.last_synced_id = max(partition.last_synced_id, request_id)
+
+        partition.expire(cutoff)
+
+    @staticmethod
+    def find_duplicate(request: MaintenanceRequest) -> Optional[Dict]:
+        """
+        Find an open request at the same property that this one repeats
+
+        Returns {"request_id", "similarity"} for the best open match within
+        the window, or None. The request itself is indexed either way.
+        """
+        from services.dispatch_service import DispatchService
+
+        now = timezone.now()
+        cutoff = now - timedelta(hours=DUPLICATE_WINDOW_HOURS)
+        category = DispatchService.categorize_request(request.description)
+        signature = _index.hasher.signature(request.description)
+
+        with _index.lock:
+            DuplicateDetector._sync_partition(request.property_id, cutoff)
+            partition = _index.partition(request.property_id)
+            partition.remove(request.id)
+            matches = _index.find_matches(
+                request.property_id, category, signature, DUPLICATE_SIMILARITY_THRESHOLD
+            )
+
+        matches = [(rid, score) for rid, score in matches if rid < request.id]
+        if not matches:
+            with _index.lock:
+                partition.add(_Entry(request.id, category, signature, request.requested_at or now))
+            return None
+
+        open_ids = set(MaintenanceRequest.objects.filter(
+            id__in=[rid for rid, _ in matches],
+            status__in=OPEN_STATUSES
+        ).values_list('id', flat=True))
+
+        for request_id, score in matches:
+            if request_id in open_ids:
+                return {"request_id": request_id, "similarity": round(score, 3)}
+
+        with _index.lock:
+            partition.add(_Entry(request.id, category, signature, request.requested_at or now))
+        return None
+
+    @staticmethod
+    def stats() -> Dict:
+        with _index.lock:
+            return {
+                "properties_indexed": len(_index.partitions),
+                "requests_indexed": sum(len(p.entries) for p in _index.partitions.values()),
+                "window_hours": DUPLICATE_WINDOW_HOURS,
+                "similarity_threshold": DUPLICATE_SIMILARITY_THRESHOLD,
+            }
@@ -0,0 +1,414 @@
+"""
+Multi-vehicle routing for region-wide events (snow storms, landscaping runs)
+Partitions every affected property across the available provider fleet and
+builds one optimized route per provider
+"""
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from core.models import Property, ServiceProvider
+from services.dispatch_service import DispatchService
+
+
+EARTH_RADIUS_MILES = 3959
+TRAVEL_SPEED_MPH = 30
+
+
+@dataclass
+class Stop:
+    property_id: int
+    name: str
+    address: str
+    lat: float
+    lng: float
+
+
+@dataclass
+class Vehicle:
+    provider_id: int
+    name: str
+    lat: float
+    lng: float
+    capacity: int
+
+
+def _distance_matrix(points: List[Tuple[float, float]]) -> List[List[float]]:
+    """Haversine distances in miles between every pair of points"""
+    rads = [(math.radians(lat), math.radians(lng)) for lat, lng in points]
+    cos_lat = [math.cos(lat) for lat, _ in rads]
+    n = len(points)
+    matrix = [[0.0] * n for _ in range(n)]
+
+    for i in range(n):
+        lat_i, lng_i = rads[i]
+        row = matrix[i]
+        for j in range(i + 1, n):
+            lat_j, lng_j = rads[j]
+            a = math.sin((lat_j - lat_i) / 2) ** 2 + cos_lat[i] * cos_lat[j] * math.sin((lng_j - lng_i) / 2) ** 2
+            d = 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+            row[j] = d
+            matrix[j][i] = d
+
+    return matrix
+
+
+class FleetRouter:
+    """
+    Capacitated multi-depot routing: each provider is a vehicle that starts
+    and ends at its own base
+
+    1. Partition: stops go to their nearest provider with remaining capacity,
+       hardest-to-place stops (largest regret) first
+    2. Construct: Clarke-Wright savings builds each provider's tour
+    3. Improve: relocate / swap between providers and 2-opt within a route,
+       restricted to each stop's nearest neighbours
+    """
+
+    NEIGHBOR_COUNT = 12
+    DEPOT_CANDIDATES = 3
+    DEFAULT_TIME_LIMIT_SECONDS = 5.0
+    EPSILON = 1e-9
+
+    @classmethod
+    def route_region(
+        cls,
+        provider_type: str,
+        city: Optional[str] = None,
+        state: Optional[str] = None,
+        capacity: Optional[int] = None,
+        time_limit_seconds: float = DEFAULT_TIME_LIMIT_SECONDS
+    ) -> Dict:
+        """
+        Route every active property in a region across all available
+        providers of a type (e.g. snow_removal, landscaping)
+
+        capacity overrides each provider's max_jobs_per_day.
+        """
+        properties = Property.objects.filter(status='active')
+        if city:
+            properties = properties.filter(city__iexact=city)
+        if state:
+            properties = properties.filter(state__iexact=state)
+
+        stops = []
+        skipped = []
+        for prop in properties.only('id', 'name', 'address', 'latitude', 'longitude'):
+            if prop.latitude is None or prop.longitude is None:
+                skipped.append(prop.id)
+                continue
+            stops.append(Stop(prop.id, prop.name, prop.address, float(prop.latitude), float(prop.longitude)))
+
+        vehicles = [
+            Vehicle(
+                provider_id=p.id,
+                name=p.company_name,
+                lat=float(p.latitude),
+                lng=float(p.longitude),
+                capacity=capacity or p.max_jobs_per_day
+            )
+            for p in ServiceProvider.objects.filter(
+                provider_type=provider_type,
+                is_available=True,
+                latitude__isnull=False,
+                longitude__isnull=False
+            )
+        ]
+
+        if not vehicles:
+            return {
+                "success": False,
+                "error": f"No available {provider_type} providers with a known location",
+                "properties": len(stops)
+            }
+
+        service_hours = DispatchService.JOB_DURATION_HOURS.get(provider_type, 2)
+        result = cls.solve(stops, vehicles, service_hours=service_hours, time_limit_seconds=time_limit_seconds)
+        result["provider_type"] = provider_type
+        result["region"] = {"city": city, "state": state}
+        result["skipped_without_coordinates"] = skipped
+        return result
+
+    @classmethod
+    def solve(
+        cls,
+        stops: List[Stop],
+        vehicles: List[Vehicle],
+        service_hours: float = 1,
+        time_limit_seconds: float = DEFAULT_TIME_LIMIT_SECONDS
+    ) -> Dict:
+        """Route stops across vehicles; pure computation, no database access"""
+        started = time.perf_counter()
+        deadline = started + time_limit_seconds
+
+        # Node ids: depots first (one per vehicle), then stops
+        v_count = len(vehicles)
+        points = [(v.lat, v.lng) for v in vehicles] + [(s.lat, s.lng) for s in stops]
+        dist = _distance_matrix(points)
+        stop_nodes = list(range(v_count, v_count + len(stops)))
+
+        routes, unassigned = cls._partition(dist, vehicles, stop_nodes)
+        routes = [cls._savings_tour(dist, depot, route) for depot, route in enumerate(routes)]
+        construction_miles = sum(cls._route_length(dist, d, r) for d, r in enumerate(routes))
+
+        cls._local_search(dist, vehicles, routes, stop_nodes, deadline)
+
+        total_miles = 0.0
+        provider_routes = []
+        for depot, route in enumerate(routes):
+            if not route:
+                continue
+            vehicle = vehicles[depot]
+            miles = cls._route_length(dist, depot, route)
+            total_miles += miles
+
+            sequence = []
+            cumulative = 0.0
+            prev = depot
+            for order, node in enumerate(route, start=1):
+                cumulative += dist[prev][node]
+                stop = stops[node - v_count]
+                sequence.append({
+                    "order": order,
+                    "property_id": stop.property_id,
+                    "name": stop.name,
+                    "address": stop.address,
+                    "miles_from_start": round(cumulative, 2),
+                })
+                prev = node
+
+            provider_routes.append({
+                "provider_id": vehicle.provider_id,
+                "provider_name": vehicle.name,
+                "stops": sequence,
+                "total_stops": len(route),
+                "capacity": vehicle.capacity,
+                "total_distance_miles": round(miles, 2),
+                "estimated_total_time": round(miles / TRAVEL_SPEED_MPH + len(route) * service_hours, 2),
+            })
+
+        return {
+            "success": True,
+            "total_properties": len(stops),
+            "total_providers": len(vehicles),
+            "providers_used": len(provider_routes),
+            "routes": provider_routes,
+            "unassigned_property_ids": [stops[n - v_count].property_id for n in unassigned],
+            "total_distance_miles": round(total_miles, 2),
+            "construction_distance_miles": round(construction_miles, 2),
+            "solve_seconds": round(time.perf_counter() - started, 3),
+        }
+
+    @staticmethod
+    def _route_length(dist: List[List[float]], depot: int, route: List[int]) -> float:
+        if not route:
+            return 0.0
+        total = dist[depot][route[0]] + dist[route[-1]][depot]
+        for a, b in zip(route, route[1:]):
+            total += dist[a][b]
+        return total
+
+    @staticmethod
+    def _partition(
+        dist: List[List[float]],
+        vehicles: List[Vehicle],
+        stop_nodes: List[int]
+    ) -> Tuple[List[List[int]], List[int]]:
+        """Capacitated nearest-depot assignment, largest regret first"""
+        depots = range(len(vehicles))
+        ranked = {node: sorted(depots, key=lambda d: dist[d][node]) for node in stop_nodes}
+
+        def regret(node):
+            order = ranked[node]
+            if len(order) < 2:
+                return 0.0
+            return dist[order[1]][node] - dist[order[0]][node]
+
+        remaining = [v.capacity for v in vehicles]
+        routes: List[List[int]] = [[] for _ in vehicles]
+        unassigned = []
+
+        for node in sorted(stop_nodes, key=regret, reverse=True):
+            for depot in ranked[node]:
+                if remaining[depot] > 0:
+                    routes[depot].append(node)
+                    remaining[depot] -= 1
+                    break
+            else:
+                unassigned.append(node)
+
+        return routes, unassigned
+
+    @staticmethod
+    def _savings_tour(dist: List[List[float]], depot: int, nodes: List[int]) -> List[int]:
+        """Clarke-Wright savings: merge single-stop tours by endpoint savings"""
+        if len(nodes) < 3:
+            return list(nodes)
+
+        savings = []
+        for a_idx, i in enumerate(nodes):
+            d_i = dist[depot][i]
+            row = dist[i]
+            for j in nodes[a_idx + 1:]:
+                savings.append((d_i + dist[depot][j] - row[j], i, j))
+        savings.sort(reverse=True)
+
+        chains = {node: [node] for node in nodes}
+        owner = {node: node for node in nodes}
+
+        for _, i, j in savings:
+            ci, cj = owner[i], owner[j]
+            if ci == cj:
+                continue
+            a, b = chains[ci], chains[cj]
+            # Only chain endpoints can be joined
+            if a[0] != i and a[-1] != i:
+                continue
+            if b[0] != j and b[-1] != j:
+                continue
+
+            if a[-1] != i:
+                a.reverse()
+            if b[0] != j:
+                b.reverse()
+            a.extend(b)
+            for node in b:
+                owner[node] = ci
+            del chains[cj]
+
+            if len(chains) == 1:
+                break
+
+        return next(iter(chains.values()))
+
+    @classmethod
+    def _local_search(
+        cls,
+        dist: List[List[float]],
+        vehicles: List[Vehicle],
+        routes: List[List[int]],
+        stop_nodes: List[int],
+        deadline: float
+    ) -> None:
+        """Improve routes in place until no move helps or time runs out"""
+        v_count = len(vehicles)
+        eps = cls.EPSILON
+        neighbors = {
+            node: sorted((o for o in stop_nodes if o != node), key=lambda o: dist[node][o])[:cls.NEIGHBOR_COUNT]
+            for node in stop_nodes
+        }
+        near_depots = {
+            node: sorted(range(v_count), key=lambda d: dist[d][node])[:cls.DEPOT_CANDIDATES]
+            for node in stop_nodes
+        }
+
+        where: Dict[int, Tuple[int, int]] = {}
+
+        def index_route(r):
+            for idx, node in enumerate(routes[r]):
+                where[node] = (r, idx)
+
+        for r in range(v_count):
+            index_route(r)
+
+        def prev_of(r, idx):
+            return routes[r][idx - 1] if idx > 0 else r
+
+        def next_of(r, idx):
+            return routes[r][idx + 1] if idx + 1 < len(routes[r]) else r
+
+        def removal_gain(r, idx):
+            node = routes[r][idx]
+            p, n = prev_of(r, idx), next_of(r, idx)
+            return dist[p][node] + dist[node][n] - dist[p][n]
+
+        def best_insertion(r, node):
+            """Cheapest position to insert node into route r: (cost, position)"""
+            route = routes[r]
+            if not route:
+                return 2 * dist[r][node], 0
+            best = (dist[r][node] + dist[node][route[0]] - dist[r][route[0]], 0)
+            for pos in range(1, len(route) + 1):
+                p = route[pos - 1]
+                n = route[pos] if pos < len(route) else r
+                cost = dist[p][node] + dist[node][n] - dist[p][n]
+                if cost < best[0]:
+                    best = (cost, pos)
+            return best
+
+        def two_opt(r):
+            route = routes[r]
+            improved = True
+            while improved and time.perf_counter() < deadline:
+                improved = False
+                tour = [r] + route + [r]
+                for i in range(1, len(tour) - 2):
+                    for j in range(i + 1, len(tour) - 1):
+                        delta = (dist[tour[i - 1]][tour[j]] + dist[tour[i]][tour[j + 1]]
+                                 - dist[tour[i - 1]][tour[i]] - dist[tour[j]][tour[j + 1]])
+                        if delta < -eps:
+                            tour[i:j + 1] = reversed(tour[i:j + 1])
+                            improved = True
+                route[:] = tour[1:-1]
+            index_route(r)
+
+        for r in range(v_count):
+            two_opt(r)
+
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            touched = set()
+
+            for node in stop_nodes:
+                if node not in where:
+                    continue
+                r_a, idx_a = where[node]
+                gain = removal_gain(r_a, idx_a)
+
+                # Relocate into a neighbour's route or a nearby provider's route
+                targets = {where[o][0] for o in neighbors[node] if o in where} | set(near_depots[node])
+                targets.discard(r_a)
+                best_move = None
+                for r_b in targets:
+                    if len(routes[r_b]) >= vehicles[r_b].capacity:
+                        continue
+                    cost, pos = best_insertion(r_b, node)
+                    delta = cost - gain
+                    if delta < -eps and (best_move is None or delta < best_move[0]):
+                        best_move = (delta, r_b, pos)
+
+                if best_move:
+                    _, r_b, pos = best_move
+                    routes[r_a].pop(idx_a)
+                    routes[r_b].insert(pos, node)
+                    index_route(r_a)
+                    index_route(r_b)
+                    touched.update((r_a, r_b))
+                    improved = True
+                    continue
+
+                # Swap with a neighbour in another route (capacity unchanged)
+                for other in neighbors[node]:
+                    if other not in where:
+                        continue
+                    r_b, idx_b = where[other]
+                    if r_b == r_a:
+                        continue
+                    pa, na = prev_of(r_a, idx_a), next_of(r_a, idx_a)
+                    pb, nb = prev_of(r_b, idx_b), next_of(r_b, idx_b)
+                    delta = (dist[pa][other] + dist[other][na] - dist[pa][node] - dist[node][na]
+                             + dist[pb][node] + dist[node][nb] - dist[pb][other] - dist[other][nb])
+                    if delta < -eps:
+                        routes[r_a][idx_a], routes[r_b][idx_b] = other, node
+                        where[node], where[other] = (r_b, idx_b), (r_a, idx_a)
+                        touched.update((r_a, r_b))
+                        improved = True
+                        break
+
+                if time.perf_counter() >= deadline:
+                    break
+
+            for r in touched:
+                two_opt(r)
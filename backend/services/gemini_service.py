@@ -3,10 +3,190 @@ Gemini AI service for comprehensive property research and analysis
 """
 import os
 import json
-import requests
-from typing import Dict, Any, Optional, List
+import time
+import asyncio
+from typing import Dict, Any, Optional, List, Tuple
 import google.generativeai as genai
 from datetime import datetime
+from services.http_clients import HTTPClients
+from services.research_cache import ResearchCache
+from services.hedging import hedged_call
+from services.perplexity_service import PerplexityService
+from services.llm_telemetry import llm_telemetry
+
+GEMINI_MODEL = 'gemini-2.0-flash-exp'
+
+# Top-level sections of the comprehensive research report; the shapes
+# PropertyAnalyzer.transform_comprehensive_report reads
+SECTION_SCHEMAS: Dict[str, str] = {
+    "location": """{
+  "address": string,
+  "gps_coordinates": {"lat": number, "lng": number},
+  "primary_city": string,
+  "county": string,
+  "nearest_airports": [
+    {"name": string, "distance_miles": number, "drive_time_minutes": number, "type": "major"|"regional"}
+  ],
+  "transportation": {
+    "public_transit": string,
+    "highway_access": [string]
+  }
+}""",
+    "property_profile": """{
+  "property_name": string,
+  "property_type": string,
+  "units": number | null,
+  "year_built": number | null,
+  "lot_size_sqft": number | null
+}""",
+    "education": """{
+  "summary": string,
+  "schools_within_5_miles": [
+    {"name": string, "level": "elementary"|"middle"|"high", "distance_miles": number, "rating": number, "district": string}
+  ],
+  "higher_education": [
+    {"name": string, "distance_miles": number, "drive_time_minutes": number}
+  ]
+}""",
+    "risk_assessment": """{
+  "summary": string,
+  "flood_zone": string,
+  "historical_flood_events": string,
+  "climate_risks": [string],
+  "earthquake_risk": string
+}""",
+    "insurance": """{
+  "average_hoi_cost": number | null,
+  "tax_rate": number | null,
+  "annual_property_tax": number | null,
+  "hoa_fees": number | null,
+  "risk_factors": [string]
+}""",
+    "crime_data": """{
+  "summary": string,
+  "risk_level": "LOW"|"MODERATE"|"HIGH",
+  "statistics": {
+    "total_per_1000": number,
+    "violent_per_1000": number,
+    "property_per_1000": number,
+    "theft_per_1000": number
+  },
+  "comparison_chart": [
+    {"category": "Total Crime"|"Violent Crime"|"Property Crime"|"Theft", "subject": number, "national_avg": number, "state_avg": number}
+  ],
+  "type_breakdown": [
+    {"name": string, "value": number, "percentage": number}
+  ],
+  "trend_chart": [
+    {"year": number, "incidents": number, "rate": number}
+  ],
+  "violent_breakdown": [
+    {"type": string, "incidents": number, "rate_vs_national": string, "risk": string}
+  ],
+  "safety_recommendations": [string]
+}""",
+    "amenities": """{
+  "summary": string,
+  "restaurants": {
+    "total": number,
+    "by_type": [{"type": string, "count": number, "percentage": number}]
+  },
+  "healthcare": {"hospitals": number, "clinics": number, "urgent_care": number},
+  "shopping": {"major_centers": number, "notable_centers": [string]},
+  "recreation": [string]
+}""",
+    "market_data": """{
+  "summary": string,
+  "listing_price": number | null,
+  "rent_estimate": number | null,
+  "price_per_sqft": number | null,
+  "confidence_score": number | null,
+  "rental_rates": [{"type": string, "rent": number, "sqft": number}],
+  "rental_price_distribution": [{"range": string, "percentage": number}],
+  "regional_rent_comparison": [{"market": string, "rent": number}],
+  "price_trend": [{"year": number, "median_price": number}]
+}""",
+    "demographics": """{
+  "summary": string,
+  "population": {"current": number, "growth_rate_percent": number},
+  "median_household_income": number,
+  "median_age": number,
+  "unemployment_rate_percent": number,
+  "education_attainment": {
+    "bachelor_plus_percent": number,
+    "high_school_grad_percent": number
+  }
+}""",
+    "investment_summary": """{
+  "overall_rating": number,
+  "rating_breakdown": {
+    "market_fundamentals": number,
+    "location_quality": number,
+    "growth_potential": number,
+    "risk_assessment": number,
+    "cash_flow_potential": number
+  },
+  "recommendation": string,
+  "key_strengths": [string],
+  "key_risks": [string],
+  "roi_projection": {
+    "year_1_cash_flow_percent": number,
+    "five_year_roi_percent": number,
+    "cap_rate_percent": number,
+    "total_return_projection": string
+  },
+  "due_diligence": [string]
+}""",
+}
+
+# Sections researched together in parallel mode, one Gemini call per group
+RESEARCH_SECTION_GROUPS: List[Tuple[str, ...]] = [
+    ("location", "property_profile"),
+    ("education",),
+    ("risk_assessment", "insurance"),
+    ("crime_data",),
+    ("amenities",),
+    ("market_data",),
+    ("demographics",),
+    ("investment_summary",),
+]
+
+RESEARCH_GUIDELINES = (
+    "Use only real, current data sources where possible. Provide numerical values as numbers, "
+    "not strings with symbols. If a value is unknown, set it to null instead of inventing data. "
+    "Keep analysis concise and factual."
+)
+
+# parallel: one call per section group; single: one call for the whole report
+GEMINI_RESEARCH_MODE = os.getenv('GEMINI_RESEARCH_MODE', 'parallel').lower()
+GEMINI_SECTION_CONCURRENCY = int(os.getenv('GEMINI_SECTION_CONCURRENCY', str(len(RESEARCH_SECTION_GROUPS))))
+GEMINI_SECTION_MAX_TOKENS = int(os.getenv('GEMINI_SECTION_MAX_TOKENS', '1500'))
+# Let slow or failing Gemini research calls be hedged with Perplexity when it is configured
+GEMINI_HEDGE_WITH_PERPLEXITY = os.getenv('GEMINI_HEDGE_WITH_PERPLEXITY', 'true').lower() == 'true'
+
+
+def _schema_block(sections: List[str]) -> str:
+    """JSON structure listing for the given sections, indented for a prompt"""
+    entries = []
+    for section in sections:
+        schema = SECTION_SCHEMAS[section].replace("\n", "\n  ")
+        entries.append(f'  "{section}": {schema}')
+    return ("{\n" + ",\n".join(entries) + "\n}").replace("\n", "\n        ")
+
+
+def _extract_json(content: str) -> Any:
+    """Parse the JSON object in a model response (fenced or bare)"""
+    if "```json" in content:
+        json_start = content.find("```json") + 7
+        json_end = content.find("```", json_start)
+        json_str = content[json_start:json_end].strip()
+    elif "{" in content and "}" in content:
+        json_start = content.find("{")
+        json_end = content.rfind("}") + 1
+        json_str = content[json_start:json_end]
+    else:
+        json_str = content
+    return json.loads(json_str)
 
 
 class GeminiService:
@@ -17,15 +197,19 @@ class GeminiService:
         
         # Configure Gemini
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.model = genai.GenerativeModel(GEMINI_MODEL)
         
         # Alternative API endpoint for direct HTTP calls
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent"
+        self.base_url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+
+        # Last-resort backend for research prompts
+        self.perplexity = (
+            PerplexityService() if GEMINI_HEDGE_WITH_PERPLEXITY and os.getenv("PERPLEXITY_API_KEY") else None
+        )
         
-    def _make_http_request(self, prompt: str, max_tokens: int = 4000) -> Dict[str, Any]:
+    def _make_http_request(self, prompt: str, max_tokens: int = 4000, call_site: str = "gemini") -> Dict[str, Any]:
         """Make direct HTTP request to Gemini API"""
         try:
-            url = f"{self.base_url}?key={self.api_key}"
             headers = {
                 "Content-Type": "application/json"
             }
@@ -44,21 +228,11 @@ class GeminiService:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["candidates"][0]["content"]["parts"][0]["text"]
-                return {
-                    "success": True,
-                    "content": content,
-                    "usage": result.get("usageMetadata", {})
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"API request failed: {response.status_code} - {response.text}"
-                }
+            with llm_telemetry.track('gemini', GEMINI_MODEL, call_site) as call:
+                response = HTTPClients.get_sync('gemini').post(
+                    self.base_url, params={"key": self.api_key}, headers=headers, json=payload
+                )
+                return self._http_result(response, call)
                 
         except Exception as e:
             return {
@@ -66,10 +240,33 @@ class GeminiService:
                 "error": f"Request failed: {str(e)}"
             }
     
-    def _make_sdk_request(self, prompt: str) -> Dict[str, Any]:
+    @staticmethod
+    def _http_result(response, call) -> Dict[str, Any]:
+        """Result dict for a generateContent response, with usage recorded on the telemetry call"""
+        if response.status_code == 200:
+            result = response.json()
+            usage = result.get("usageMetadata", {})
+            call.usage(usage.get("promptTokenCount"), usage.get("candidatesTokenCount"))
+            content = result["candidates"][0]["content"]["parts"][0]["text"]
+            return {
+                "success": True,
+                "content": content,
+                "usage": usage
+            }
+        call.fail(f"HTTP {response.status_code}")
+        return {
+            "success": False,
+            "error": f"API request failed: {response.status_code} - {response.text}"
+        }
+
+    def _make_sdk_request(self, prompt: str, call_site: str = "gemini") -> Dict[str, Any]:
         """Make request using Gemini SDK"""
         try:
-            response = self.model.generate_content(prompt)
+            with llm_telemetry.track('gemini_sdk', GEMINI_MODEL, call_site) as call:
+                response = self.model.generate_content(prompt)
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None:
+                    call.usage(getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None))
             return {
                 "success": True,
                 "content": response.text
@@ -80,142 +277,27 @@ class GeminiService:
                 "error": f"SDK request failed: {str(e)}"
             }
     
-    def research_comprehensive_property(self, address: str) -> Dict[str, Any]:
-        """Conduct comprehensive property research using Gemini AI"""
-        prompt = f"""
+    @staticmethod
+    def _comprehensive_prompt(address: str) -> str:
+        return f"""
         Conduct a comprehensive deep research analysis for {address}. Return JSON with the following exact top-level keys:
-        location, property_profile, education, risk_assessment, insurance, crime_data, amenities, market_data, demographics, investment_summary.
+        {', '.join(SECTION_SCHEMAS)}.
 
         Required structure:
-        {{
-          "location": {{
-            "address": string,
-            "gps_coordinates": {{"lat": number, "lng": number}},
-            "primary_city": string,
-            "county": string,
-            "nearest_airports": [
-              {{"name": string, "distance_miles": number, "drive_time_minutes": number, "type": "major"|"regional"}}
-            ],
-            "transportation": {{
-              "public_transit": string,
-              "highway_access": [string]
-            }}
-          }},
-          "property_profile": {{
-            "property_name": string,
-            "property_type": string,
-            "units": number | null,
-            "year_built": number | null,
-            "lot_size_sqft": number | null
-          }},
-          "education": {{
-            "summary": string,
-            "schools_within_5_miles": [
-              {{"name": string, "level": "elementary"|"middle"|"high", "distance_miles": number, "rating": number, "district": string}}
-            ],
-            "higher_education": [
-              {{"name": string, "distance_miles": number, "drive_time_minutes": number}}
-            ]
-          }},
-          "risk_assessment": {{
-            "summary": string,
-            "flood_zone": string,
-            "historical_flood_events": string,
-            "climate_risks": [string],
-            "earthquake_risk": string
-          }},
-          "insurance": {{
-            "average_hoi_cost": number | null,
-            "tax_rate": number | null,
-            "annual_property_tax": number | null,
-            "hoa_fees": number | null,
-            "risk_factors": [string]
-          }},
-          "crime_data": {{
-            "summary": string,
-            "risk_level": "LOW"|"MODERATE"|"HIGH",
-            "statistics": {{
-              "total_per_1000": number,
-              "violent_per_1000": number,
-              "property_per_1000": number,
-              "theft_per_1000": number
-            }},
-            "comparison_chart": [
-              {{"category": "Total Crime"|"Violent Crime"|"Property Crime"|"Theft", "subject": number, "national_avg": number, "state_avg": number}}
-            ],
-            "type_breakdown": [
-              {{"name": string, "value": number, "percentage": number}}
-            ],
-            "trend_chart": [
-              {{"year": number, "incidents": number, "rate": number}}
-            ],
-            "violent_breakdown": [
-              {{"type": string, "incidents": number, "rate_vs_national": string, "risk": string}}
-            ],
-            "safety_recommendations": [string]
-          }},
-          "amenities": {{
-            "summary": string,
-            "restaurants": {{
-              "total": number,
-              "by_type": [{{"type": string, "count": number, "percentage": number}}]
-            }},
-            "healthcare": {{"hospitals": number, "clinics": number, "urgent_care": number}},
-            "shopping": {{"major_centers": number, "notable_centers": [string]}},
-            "recreation": [string]
-          }},
-          "market_data": {{
-            "summary": string,
-            "listing_price": number | null,
-            "rent_estimate": number | null,
-            "price_per_sqft": number | null,
-            "confidence_score": number | null,
-            "rental_rates": [{{"type": string, "rent": number, "sqft": number}}],
-            "rental_price_distribution": [{{"range": string, "percentage": number}}],
-            "regional_rent_comparison": [{{"market": string, "rent": number}}],
-            "price_trend": [{{"year": number, "median_price": number}}]
-          }},
-          "demographics": {{
-            "summary": string,
-            "population": {{"current": number, "growth_rate_percent": number}},
-            "median_household_income": number,
-            "median_age": number,
-            "unemployment_rate_percent": number,
-            "education_attainment": {{
-              "bachelor_plus_percent": number,
-              "high_school_grad_percent": number
-            }}
-          }},
-          "investment_summary": {{
-            "overall_rating": number,
-            "rating_breakdown": {{
-              "market_fundamentals": number,
-              "location_quality": number,
-              "growth_potential": number,
-              "risk_assessment": number,
-              "cash_flow_potential": number
-            }},
-            "recommendation": string,
-            "key_strengths": [string],
-            "key_risks": [string],
-            "roi_projection": {{
-              "year_1_cash_flow_percent": number,
-              "five_year_roi_percent": number,
-              "cap_rate_percent": number,
-              "total_return_projection": string
-            }},
-            "due_diligence": [string]
-          }}
-        }}
-
-        Use only real, current data sources where possible. Provide numerical values as numbers, not strings with symbols. If a value is unknown, set it to null instead of inventing data. Keep analysis concise and factual.
+        {_schema_block(list(SECTION_SCHEMAS))}
+
+        {RESEARCH_GUIDELINES}
         """
 
+    def research_comprehensive_property(self, address: str) -> Dict[str, Any]:
+        """Conduct comprehensive property research using Gemini AI"""
+        prompt = self._comprehensive_prompt(address)
+
         # Try HTTP request first, fallback to SDK
-        result = self._make_http_request(prompt, max_tokens=4000)
+        result = self._make_http_request(prompt, max_tokens=4000, call_site="research.comprehensive")
         
         if not result["success"]:
-            result = self._make_sdk_request(prompt)
+            result = self._make_sdk_request(prompt, call_site="research.comprehensive")
         
         if not result["success"]:
             return {"error": result.get("error", "Unknown error")}
@@ -223,25 +305,175 @@ class GeminiService:
         content = result.get("content", "")
 
         try:
-            # Extract JSON from response
-            if "```json" in content:
-                json_start = content.find("```json") + 7
-                json_end = content.find("```", json_start)
-                json_str = content[json_start:json_end].strip()
-            elif "{" in content and "}" in content:
-                json_start = content.find("{")
-                json_end = content.rfind("}") + 1
-                json_str = content[json_start:json_end]
-            else:
-                json_str = content
+            return _extract_json(content)
+        except json.JSONDecodeError:
+            return {
+                "raw_content": content,
+                "error": "JSON parsing failed"
+            }
 
-            return json.loads(json_str)
+    async def _make_http_request_async(self, prompt: str, max_tokens: int = 4000, call_site: str = "gemini") -> Dict[str, Any]:
+        """Make direct HTTP request to Gemini API without blocking the event loop"""
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }],
+            "generationConfig": {
+                "temperature": 0.3,
+                "maxOutputTokens": max_tokens,
+                "topP": 0.8,
+                "topK": 40
+            }
+        }
+
+        try:
+            with llm_telemetry.track('gemini', GEMINI_MODEL, call_site) as call:
+                response = await HTTPClients.get('gemini').post(
+                    self.base_url,
+                    params={"key": self.api_key},
+                    headers={"Content-Type": "application/json"},
+                    json=payload
+                )
+                return self._http_result(response, call)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Request failed: {str(e)}"
+            }
+
+    async def _generate(self, prompt: str, max_tokens: int, operation: str) -> Dict[str, Any]:
+        """
+        Research completion, hedged across backends
+
+        Gemini HTTP is the primary. The Gemini SDK, then Perplexity with
+        the same prompt, are started if it runs past its p95 latency for
+        this operation or fails.
+        """
+        call_site = f"research.{operation}"
+        secondaries = [("gemini_sdk", lambda: asyncio.to_thread(self._make_sdk_request, prompt, call_site))]
+        if self.perplexity:
+            messages = [{"role": "user", "content": prompt.strip()}]
+            secondaries.append(("perplexity", lambda: self.perplexity._make_request_async(messages, call_site=call_site)))
+
+        return await hedged_call(
+            ("gemini_http", lambda: self._make_http_request_async(prompt, max_tokens=max_tokens, call_site=call_site)),
+            secondaries,
+            operation=operation
+        )
+
+    async def _research_sections(self, address: str, sections: Tuple[str, ...]) -> Dict[str, Any]:
+        """Research one group of report sections; returns {section: data}"""
+        prompt = f"""
+        Conduct a deep research analysis for {address}, covering only the sections below. Return JSON with the following exact top-level keys:
+        {', '.join(sections)}.
+
+        Required structure:
+        {_schema_block(list(sections))}
+
+        {RESEARCH_GUIDELINES}
+        """
+        max_tokens = GEMINI_SECTION_MAX_TOKENS * len(sections)
+        if "crime_data" in sections:
+            # The crime section carries four chart series
+            max_tokens += GEMINI_SECTION_MAX_TOKENS // 3
+
+        result = await self._generate(prompt, max_tokens, operation="section")
+        if not result["success"]:
+            raise RuntimeError(result.get("error", "Unknown error"))
+
+        data = _extract_json(result.get("content", ""))
+        if not isinstance(data, dict):
+            raise ValueError("Response is not a JSON object")
+        # A single section sometimes comes back unwrapped
+        if len(sections) == 1 and sections[0] not in data:
+            data = {sections[0]: data}
+
+        missing = [section for section in sections if not isinstance(data.get(section), dict)]
+        if len(missing) == len(sections):
+            raise ValueError(f"Response is missing {', '.join(missing)}")
+        return {section: data[section] for section in sections if section not in missing}
+
+    async def research_comprehensive_property_async(self, address: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Comprehensive property research with the sections fanned out
+
+        Each section group is a separate, smaller Gemini call run concurrently,
+        so the report takes about as long as the slowest section instead of one
+        4,000-token generation. The merged result has the same top-level keys
+        as research_comprehensive_property; sections that failed are left out
+        and listed under "_section_errors". Set GEMINI_RESEARCH_MODE=single to
+        use the one-call prompt instead. Every call is hedged (see _generate).
+
+        Results go through the research cache, which only sends the
+        sections that are missing or out of date.
+        """
+        if use_cache and ResearchCache.enabled():
+            return await ResearchCache('gemini').research(
+                address, lambda sections: self._research_uncached(address, sections)
+            )
+        return await self._research_uncached(address)
+
+    async def _research_single(self, address: str) -> Dict[str, Any]:
+        """Whole report from one prompt, hedged like the section calls"""
+        result = await self._generate(self._comprehensive_prompt(address), 4000, operation="comprehensive")
+        if not result["success"]:
+            return {"error": result.get("error", "Unknown error")}
+
+        content = result.get("content", "")
+        try:
+            return _extract_json(content)
         except json.JSONDecodeError:
             return {
                 "raw_content": content,
                 "error": "JSON parsing failed"
             }
-    
+
+    async def _research_uncached(self, address: str, sections: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Research every section group, or just the groups covering the given sections"""
+        if GEMINI_RESEARCH_MODE == 'single':
+            return await self._research_single(address)
+
+        groups = [
+            group for group in RESEARCH_SECTION_GROUPS
+            if sections is None or any(section in sections for section in group)
+        ]
+
+        semaphore = asyncio.Semaphore(max(1, GEMINI_SECTION_CONCURRENCY))
+
+        async def run_group(sections: Tuple[str, ...]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._research_sections(address, sections)
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(
+            *(run_group(group) for group in groups),
+            return_exceptions=True
+        )
+
+        merged: Dict[str, Any] = {}
+        section_errors: Dict[str, str] = {}
+        for group, outcome in zip(groups, outcomes):
+            if isinstance(outcome, BaseException):
+                section_errors.update({section: str(outcome) for section in group})
+                continue
+            merged.update(outcome)
+            section_errors.update({
+                section: "Section missing from response" for section in group if section not in outcome
+            })
+
+        print(
+            f"🔎 Gemini research for {address}: {len(merged)}/{sum(len(group) for group in groups)} sections "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        if not merged:
+            return {"error": "; ".join(sorted(set(section_errors.values()))) or "Unknown error"}
+        if section_errors:
+            merged["_section_errors"] = section_errors
+        return merged
+
     def analyze_property_market(self, address: str) -> Dict[str, Any]:
         """Analyze property market data using Gemini"""
         prompt = f"""
@@ -257,7 +489,7 @@ class GeminiService:
         Focus on recent data (2023-2024) and provide specific numbers where possible.
         """
         
-        result = self._make_http_request(prompt, max_tokens=2000)
+        result = self._make_http_request(prompt, max_tokens=2000, call_site="property.market")
         
         if not result["success"]:
             return {"error": result.get("error", "Market analysis failed")}
@@ -293,7 +525,7 @@ class GeminiService:
         Use recent data (2022-2024) and provide specific numbers.
         """
         
-        result = self._make_http_request(prompt, max_tokens=2000)
+        result = self._make_http_request(prompt, max_tokens=2000, call_site="property.crime")
         
         if not result["success"]:
             return {"error": result.get("error", "Crime analysis failed")}
@@ -330,7 +562,7 @@ class GeminiService:
         Focus on proximity and accessibility to the property address.
         """
         
-        result = self._make_http_request(prompt, max_tokens=2000)
+        result = self._make_http_request(prompt, max_tokens=2000, call_site="property.amenities")
         
         if not result["success"]:
             return {"error": result.get("error", "Amenities analysis failed")}
@@ -371,7 +603,7 @@ class GeminiService:
         Return structured JSON with specific ratings and recommendations.
         """
         
-        result = self._make_http_request(prompt, max_tokens=2000)
+        result = self._make_http_request(prompt, max_tokens=2000, call_site="property.investment")
         
         if not result["success"]:
             return {"error": result.get("error", "Investment analysis failed")}
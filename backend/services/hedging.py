@@ -0,0 +1,188 @@
+"""
+Hedged requests across interchangeable LLM backends
+The primary is sent first; if it has not answered by its observed p95
+latency, the next backend is started as well and the first good answer
+wins, with the slower call cancelled. A failed call fails over to the next
+backend immediately. Hedges are capped by a token-bucket budget so a slow
+provider cannot double the traffic (and the bill) of every request.
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from threading import Lock
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'true').lower() == 'true'
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))
+# Until a backend has this many samples its hedge delay is HEDGE_DEFAULT_DELAY
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_DEFAULT_DELAY = float(os.getenv('HEDGE_DEFAULT_DELAY', '20'))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '1'))
+# Each primary call earns this fraction of a hedge; at most HEDGE_BUDGET_BURST saved up
+HEDGE_BUDGET_RATIO = float(os.getenv('HEDGE_BUDGET_RATIO', '0.1'))
+HEDGE_BUDGET_BURST = float(os.getenv('HEDGE_BUDGET_BURST', '5'))
+
+LATENCY_WINDOW = 200
+
+# (name, zero-argument coroutine factory) for one backend
+Backend = Tuple[str, Callable[[], Awaitable[Dict[str, Any]]]]
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per backend and operation"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Dict[str, Deque[float]] = {}
+        self._window = window
+        self._lock = Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, key: str, pct: float = HEDGE_PERCENTILE) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key) or [])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    def hedge_delay(self, key: str) -> float:
+        observed = self.percentile(key)
+        return max(HEDGE_MIN_DELAY, observed if observed is not None else HEDGE_DEFAULT_DELAY)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            key: {
+                "samples": len(self._samples[key]),
+                "p50": self.percentile(key, 50),
+                "p95": self.percentile(key, 95),
+                "hedge_delay": round(self.hedge_delay(key), 2),
+            }
+            for key in keys
+        }
+
+
+class HedgeBudget:
+    """Token bucket limiting hedges to a fraction of primary calls"""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = Lock()
+        self.granted = 0
+        self.denied = 0
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.granted += 1
+                return True
+            self.denied += 1
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"tokens": round(self._tokens, 2), "granted": self.granted, "denied": self.denied}
+
+
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget()
+
+
+def _succeeded(result: Any) -> bool:
+    return isinstance(result, dict) and bool(result.get("success"))
+
+
+async def hedged_call(primary: Backend, secondaries: List[Backend], operation: str = "default") -> Dict[str, Any]:
+    """
+    Run primary, hedging or failing over to secondaries in order
+
+    Each backend returns a {"success": bool, ...} dict. The winning result
+    gets "provider" (backend name) and "hedged" (whether a hedge was
+    started) added. Backends that lose the race record their elapsed time
+    as a (censored) latency sample. Cancelling a loser that runs in a worker thread only
+    stops waiting for it; the thread finishes in the background.
+    """
+    backends = [primary, *secondaries]
+    if not HEDGE_ENABLED:
+        return await _failover(backends, operation)
+
+    hedge_budget.deposit()
+    running: Dict[asyncio.Task, str] = {}
+    started: Dict[str, float] = {}
+    queue = list(backends)
+    hedge_armed, hedged = True, False
+    last_result: Dict[str, Any] = {"success": False, "error": "No backend available"}
+
+    def launch() -> None:
+        name, factory = queue.pop(0)
+        started[name] = time.perf_counter()
+        running[asyncio.ensure_future(factory())] = name
+
+    launch()
+    try:
+        while running:
+            # Only the primary is hedged on a timer; later backends are plain failover
+            delay = latency_tracker.hedge_delay(f"{primary[0]}:{operation}") if queue and hedge_armed else None
+            done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                hedge_armed = False
+                if hedge_budget.try_spend():
+                    print(f"⏱️ {primary[0]} slower than {delay:.1f}s, hedging with {queue[0][0]}")
+                    hedged = True
+                    launch()
+                # Out of budget: keep waiting on the primary and only fail over if it errors
+                continue
+
+            for task in done:
+                name = running.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    result = {"success": False, "error": f"{name} failed: {str(e)}"}
+
+                if _succeeded(result):
+                    now = time.perf_counter()
+                    latency_tracker.record(f"{name}:{operation}", now - started[name])
+                    # Backends still running lost the race and are cancelled below; their
+                    # elapsed time is a lower bound on their latency. Dropping it would
+                    # leave only the fast samples and drag the p95 (and hedge delay) down.
+                    for other in running.values():
+                        latency_tracker.record(f"{other}:{operation}", now - started[other])
+                    return {**result, "provider": name, "hedged": hedged}
+                last_result = result
+
+            if not running and queue:
+                hedge_armed = False
+                print(f"⚠️ {', '.join(started)} failed, failing over to {queue[0][0]}")
+                launch()
+    finally:
+        for task in running:
+            task.cancel()
+
+    return last_result
+
+
+async def _failover(backends: List[Backend], operation: str) -> Dict[str, Any]:
+    """Plain sequential fallback, used when hedging is disabled"""
+    result: Dict[str, Any] = {"success": False, "error": "No backend available"}
+    for name, factory in backends:
+        started = time.perf_counter()
+        try:
+            result = await factory()
+        except Exception as e:
+            result = {"success": False, "error": f"{name} failed: {str(e)}"}
+        if _succeeded(result):
+            latency_tracker.record(f"{name}:{operation}", time.perf_counter() - started)
+            return {**result, "provider": name, "hedged": False}
+    return result
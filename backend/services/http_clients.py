@@ -0,0 +1,99 @@
+"""
+Shared HTTP clients for the external AI providers
+One pooled httpx client per provider, so calls reuse keep-alive (and, when
+h2 is installed, HTTP/2) connections instead of paying a TCP+TLS handshake
+every time. The async clients are opened and closed by the app lifespan.
+"""
+import os
+import asyncio
+import threading
+from typing import Dict, Tuple
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP_CLIENT_HTTP2 = os.getenv('HTTP_CLIENT_HTTP2', 'true').lower() == 'true'
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+
+# Connection limits and read timeout (seconds) per provider
+PROVIDERS: Dict[str, Dict[str, float]] = {
+    'gemini': {
+        'max_connections': int(os.getenv('GEMINI_HTTP_MAX_CONNECTIONS', '20')),
+        'max_keepalive': int(os.getenv('GEMINI_HTTP_MAX_KEEPALIVE', '10')),
+        'timeout': float(os.getenv('GEMINI_REQUEST_TIMEOUT', '60')),
+    },
+    'perplexity': {
+        'max_connections': int(os.getenv('PERPLEXITY_HTTP_MAX_CONNECTIONS', '10')),
+        'max_keepalive': int(os.getenv('PERPLEXITY_HTTP_MAX_KEEPALIVE', '5')),
+        'timeout': float(os.getenv('PERPLEXITY_REQUEST_TIMEOUT', '90')),
+    },
+}
+
+
+def _client_options(provider: str) -> Dict:
+    config = PROVIDERS[provider]
+    return {
+        "http2": HTTP2_AVAILABLE and HTTP_CLIENT_HTTP2,
+        "timeout": httpx.Timeout(config['timeout'], connect=HTTP_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=int(config['max_connections']),
+            max_keepalive_connections=int(config['max_keepalive']),
+            keepalive_expiry=30
+        ),
+    }
+
+
+class HTTPClients:
+    """Per-provider pooled clients"""
+
+    _async: Dict[str, Tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+    _sync: Dict[str, httpx.Client] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, provider: str) -> httpx.AsyncClient:
+        """
+        Async client for a provider on the running event loop
+
+        Created on first use outside the app lifespan (scripts, Celery
+        tasks). A client left over from an event loop that has since gone
+        away is replaced, since its connections cannot be reused.
+        """
+        loop = asyncio.get_running_loop()
+        entry = cls._async.get(provider)
+        if entry is None or entry[1] is not loop or entry[0].is_closed:
+            entry = (httpx.AsyncClient(**_client_options(provider)), loop)
+            cls._async[provider] = entry
+        return entry[0]
+
+    @classmethod
+    def get_sync(cls, provider: str) -> httpx.Client:
+        """Thread-safe blocking client for code that cannot await"""
+        client = cls._sync.get(provider)
+        if client is None or client.is_closed:
+            with cls._lock:
+                client = cls._sync.get(provider)
+                if client is None or client.is_closed:
+                    client = httpx.Client(**_client_options(provider))
+                    cls._sync[provider] = client
+        return client
+
+    @classmethod
+    async def startup(cls) -> None:
+        for provider in PROVIDERS:
+            cls.get(provider)
+        print(f"🌐 HTTP clients ready for {', '.join(PROVIDERS)} (HTTP/2 {'on' if HTTP2_AVAILABLE and HTTP_CLIENT_HTTP2 else 'off'})")
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        async_clients, cls._async = cls._async, {}
+        sync_clients, cls._sync = cls._sync, {}
+        for client, loop in async_clients.values():
+            if loop is asyncio.get_running_loop():
+                await client.aclose()
+        for client in sync_clients.values():
+            client.close()
@@ -0,0 +1,133 @@
+"""
+Perceptual-hash deduplication of inspection photos
+Burst shots of the same spot hash to nearby dHash/pHash values; only one
+frame per cluster needs a vision call
+"""
+import os
+import asyncio
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+    from PIL import Image, ImageOps
+    DEDUP_AVAILABLE = True
+except ImportError:
+    DEDUP_AVAILABLE = False
+
+VISION_DEDUP_ENABLED = os.getenv('VISION_DEDUP_ENABLED', 'true').lower() == 'true'
+
+# Maximum Hamming distance (of 64 bits) for two frames to count as the same
+# shot; both hashes must agree
+DHASH_MAX_DISTANCE = int(os.getenv('DHASH_MAX_DISTANCE', '6'))
+PHASH_MAX_DISTANCE = int(os.getenv('PHASH_MAX_DISTANCE', '8'))
+
+_DCT_SIZE = 32
+_HASH_SIZE = 8
+
+
+def _dct_matrix(n: int):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def _bits_to_int(bits) -> int:
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), 'big')
+
+
+def perceptual_hashes(image_path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    (dhash, phash, file size) for one image, or None if it cannot be read
+
+    Module-level so it can run in the preprocessing process pool.
+    dHash compares horizontally adjacent pixels of a 9x8 thumbnail; pHash
+    thresholds the low-frequency 8x8 block of a 32x32 DCT at its median.
+    """
+    try:
+        with Image.open(image_path) as img:
+            img.draft('L', (_DCT_SIZE * 4, _DCT_SIZE * 4))
+            gray = ImageOps.exif_transpose(img).convert('L')
+
+            small = np.asarray(gray.resize((_HASH_SIZE + 1, _HASH_SIZE), Image.BILINEAR), dtype=np.int16)
+            dhash = _bits_to_int(small[:, 1:] > small[:, :-1])
+
+            pixels = np.asarray(gray.resize((_DCT_SIZE, _DCT_SIZE), Image.BILINEAR), dtype=np.float64)
+            dct = _dct_matrix(_DCT_SIZE)
+            low = (dct @ pixels @ dct.T)[:_HASH_SIZE, :_HASH_SIZE]
+            phash = _bits_to_int(low > np.median(low.ravel()[1:]))
+
+        return dhash, phash, os.path.getsize(image_path)
+
+    except Exception as e:
+        print(f"⚠️ Could not hash {image_path}: {e}")
+        return None
+
+
+def hamming_matrix(hashes: List[int]):
+    """Pairwise Hamming distances between 64-bit hashes"""
+    values = np.array(hashes, dtype=np.uint64)
+    xor = values[:, None] ^ values[None, :]
+    return np.unpackbits(xor.view(np.uint8).reshape(len(values), len(values), 8), axis=2).sum(axis=2)
+
+
+def cluster_hashes(hashes: List[Optional[Tuple[int, int, int]]]) -> List[List[int]]:
+    """
+    Group image indexes whose dHash and pHash are both within threshold
+
+    Single-link via union-find, so a slow pan can chain frames together.
+    The representative (first index of each cluster) is the largest file,
+    i.e. usually the sharpest frame. Unhashable images stay on their own.
+    """
+    parent = list(range(len(hashes)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    hashed = [i for i, h in enumerate(hashes) if h is not None]
+    if len(hashed) > 1:
+        d_dist = hamming_matrix([hashes[i][0] for i in hashed])
+        p_dist = hamming_matrix([hashes[i][1] for i in hashed])
+        close = (d_dist <= DHASH_MAX_DISTANCE) & (p_dist <= PHASH_MAX_DISTANCE)
+        for a, b in zip(*np.nonzero(np.triu(close, k=1))):
+            parent[find(hashed[a])] = find(hashed[b])
+
+    clusters = {}
+    for i in range(len(hashes)):
+        clusters.setdefault(find(i), []).append(i)
+
+    return [
+        sorted(members, key=lambda i: (-(hashes[i][2] if hashes[i] else 0), i))
+        for members in sorted(clusters.values(), key=min)
+    ]
+
+
+class ImageDeduplicator:
+    """Cluster an inspection's photos before analysis"""
+
+    @staticmethod
+    async def cluster_async(image_paths: List[str]) -> List[List[int]]:
+        """
+        Clusters of image indexes, representative first
+
+        Every image is its own cluster when NumPy/Pillow are missing or the
+        images are remote URLs.
+        """
+        if not DEDUP_AVAILABLE or len(image_paths) < 2:
+            return [[i] for i in range(len(image_paths))]
+
+        from services.image_preprocessor import ImagePreprocessor
+
+        loop = asyncio.get_running_loop()
+        pool = ImagePreprocessor.pool()
+        hashes = await asyncio.gather(*(
+            loop.run_in_executor(pool, perceptual_hashes, path) if not path.startswith('http')
+            else asyncio.sleep(0, result=None)
+            for path in image_paths
+        ))
+
+        return cluster_hashes(list(hashes))
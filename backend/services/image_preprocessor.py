@@ -0,0 +1,144 @@
+"""
+Image preprocessing before vision analysis
+Auto-orients, downsizes, strips metadata and re-encodes photos so GPT-4o
+receives a few hundred KB instead of a 6-12 MB camera original
+"""
+import io
+import os
+import math
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+from typing import Optional
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# GPT-4o high-detail mode scales images to fit 2048px before tiling
+VISION_MAX_DIMENSION = int(os.getenv('VISION_MAX_DIMENSION', '2048'))
+VISION_JPEG_QUALITY = int(os.getenv('VISION_JPEG_QUALITY', '82'))
+VISION_PREPROCESS_WORKERS = int(os.getenv('VISION_PREPROCESS_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Part of the analysis cache key: changing the settings invalidates old results
+PREPROCESS_SIGNATURE = (
+    f"max{VISION_MAX_DIMENSION}-q{VISION_JPEG_QUALITY}" if PIL_AVAILABLE else "raw"
+)
+
+
+def preprocess_image_bytes(
+    data: bytes,
+    max_dimension: int = VISION_MAX_DIMENSION,
+    quality: int = VISION_JPEG_QUALITY
+) -> bytes:
+    """
+    Orient, shrink and re-encode one image as a metadata-free JPEG
+
+    Module-level so it can be pickled into pool workers. Returns the input
+    unchanged when Pillow is missing or cannot decode the file (e.g. HEIC
+    without a plugin).
+    """
+    if not PIL_AVAILABLE:
+        return data
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft('RGB', (max_dimension, max_dimension))
+            img = ImageOps.exif_transpose(img)
+
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel('A'))
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+
+            img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+            # Saving without exif/icc/xmp drops GPS, camera and other metadata
+            out = io.BytesIO()
+            img.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+            return out.getvalue()
+
+    except Exception as e:
+        print(f"⚠️ Image preprocessing failed, sending original: {e}")
+        return data
+
+
+def estimate_vision_tokens(image_path: str, max_dimension: int = VISION_MAX_DIMENSION) -> Optional[int]:
+    """
+    GPT-4o high-detail input tokens for one image once preprocessed
+
+    Only the header is read. The API fits the image within 2048x2048,
+    scales the short side down to 768px and charges 85 tokens plus 170 per
+    512px tile. Returns None when the size cannot be read.
+    """
+    if not PIL_AVAILABLE:
+        return None
+
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+    except Exception:
+        return None
+
+    scale = min(1.0, max_dimension / max(width, height), 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+class ImagePreprocessor:
+    """Runs preprocessing in a shared process pool off the API workers"""
+
+    _pool: Optional[Executor] = None
+    _pool_lock = Lock()
+
+    @classmethod
+    def pool(cls) -> Executor:
+        """
+        Shared executor for CPU-bound image work
+
+        A process pool normally; a thread pool inside daemonic processes
+        (Celery prefork workers), which are not allowed to start children.
+        Pillow and NumPy release the GIL for most of their work, so threads
+        still run in parallel there.
+        """
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = cls._create_pool()
+            return cls._pool
+
+    @staticmethod
+    def _create_pool() -> Executor:
+        if not multiprocessing.current_process().daemon:
+            try:
+                return ProcessPoolExecutor(max_workers=VISION_PREPROCESS_WORKERS)
+            except (OSError, NotImplementedError, AssertionError) as e:
+                print(f"⚠️ Process pool unavailable ({e}), preprocessing images in threads")
+        return ThreadPoolExecutor(max_workers=VISION_PREPROCESS_WORKERS, thread_name_prefix="image-preprocess")
+
+    @classmethod
+    def shutdown(cls) -> None:
+        with cls._pool_lock:
+            if cls._pool is not None:
+                cls._pool.shutdown(cancel_futures=True)
+                cls._pool = None
+
+    @classmethod
+    def preprocess(cls, data: bytes) -> bytes:
+        if not PIL_AVAILABLE:
+            return data
+        return cls.pool().submit(preprocess_image_bytes, data).result()
+
+    @classmethod
+    async def preprocess_async(cls, data: bytes) -> bytes:
+        if not PIL_AVAILABLE:
+            return data
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls.pool(), preprocess_image_bytes, data)
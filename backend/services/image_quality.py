@@ -0,0 +1,124 @@
+"""
+Local photo quality pre-screen
+Catches blurry, dark, overexposed and low-resolution photos before they are
+sent to GPT-4o, where they would only come back as "unknown" analyses
+"""
+import os
+import asyncio
+from typing import Dict, List
+
+try:
+    import numpy as np
+    from PIL import Image
+    QUALITY_SCREEN_AVAILABLE = True
+except ImportError:
+    QUALITY_SCREEN_AVAILABLE = False
+
+# off: no screening, flag: analyze anyway but attach feedback,
+# skip: do not send unusable photos to the vision API
+IMAGE_QUALITY_MODE = os.getenv('IMAGE_QUALITY_MODE', 'skip').lower()
+
+IMAGE_MIN_SHORT_SIDE = int(os.getenv('IMAGE_MIN_SHORT_SIDE', '480'))
+IMAGE_MIN_SHARPNESS = float(os.getenv('IMAGE_MIN_SHARPNESS', '40'))
+IMAGE_DARK_MEAN = float(os.getenv('IMAGE_DARK_MEAN', '45'))
+IMAGE_BRIGHT_MEAN = float(os.getenv('IMAGE_BRIGHT_MEAN', '225'))
+IMAGE_CLIPPED_FRACTION = float(os.getenv('IMAGE_CLIPPED_FRACTION', '0.5'))
+
+# Sharpness is measured at a fixed working size so scores are comparable
+_WORKING_SIZE = 1024
+
+FEEDBACK = {
+    'low_resolution': "Photo is too small ({width}x{height}); shoot at full camera resolution, not a screenshot or thumbnail.",
+    'blurry': "Photo is blurry (sharpness {sharpness:.0f}); hold the camera steady, tap to focus and retake.",
+    'too_dark': "Photo is too dark (brightness {mean_brightness:.0f}/255); turn on lights or use the flash and retake.",
+    'overexposed': "Photo is overexposed (brightness {mean_brightness:.0f}/255); avoid shooting into the sun or a bright window and retake.",
+    'unreadable': "Photo could not be read; upload a JPEG, PNG or WebP file.",
+}
+
+
+def assess_image_quality(image_path: str) -> Dict:
+    """
+    Blur, exposure and resolution checks for one image
+
+    Module-level so it can run in the preprocessing process pool.
+    Sharpness is the variance of a 4-neighbour Laplacian over the grayscale
+    image at a fixed working size; exposure uses the luminance histogram.
+    """
+    report = {"image_path": image_path, "usable": True, "issues": [], "feedback": []}
+
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+            img.draft('L', (_WORKING_SIZE, _WORKING_SIZE))
+            gray = img.convert('L')
+            gray.thumbnail((_WORKING_SIZE, _WORKING_SIZE))
+            pixels = np.asarray(gray, dtype=np.float32)
+    except Exception:
+        report.update(usable=False, issues=['unreadable'], feedback=[FEEDBACK['unreadable']])
+        return report
+
+    laplacian = (
+        4 * pixels[1:-1, 1:-1]
+        - pixels[:-2, 1:-1] - pixels[2:, 1:-1]
+        - pixels[1:-1, :-2] - pixels[1:-1, 2:]
+    )
+    histogram = np.bincount(pixels.astype(np.uint8).ravel(), minlength=256) / pixels.size
+
+    metrics = {
+        "width": width,
+        "height": height,
+        "sharpness": round(float(laplacian.var()), 1),
+        "mean_brightness": round(float(pixels.mean()), 1),
+        "dark_fraction": round(float(histogram[:16].sum()), 3),
+        "bright_fraction": round(float(histogram[240:].sum()), 3),
+    }
+    report.update(metrics)
+
+    if min(width, height) < IMAGE_MIN_SHORT_SIDE:
+        report["issues"].append('low_resolution')
+    if metrics["mean_brightness"] < IMAGE_DARK_MEAN or metrics["dark_fraction"] > IMAGE_CLIPPED_FRACTION:
+        report["issues"].append('too_dark')
+    elif metrics["mean_brightness"] > IMAGE_BRIGHT_MEAN or metrics["bright_fraction"] > IMAGE_CLIPPED_FRACTION:
+        report["issues"].append('overexposed')
+    # Dark frames have little contrast, so only call a well-exposed frame blurry
+    elif metrics["sharpness"] < IMAGE_MIN_SHARPNESS:
+        report["issues"].append('blurry')
+
+    report["usable"] = not report["issues"]
+    report["feedback"] = [FEEDBACK[issue].format(**metrics) for issue in report["issues"]]
+    return report
+
+
+class ImageQualityScreen:
+    """Pre-screen inspection photos off the event loop"""
+
+    @staticmethod
+    def enabled() -> bool:
+        return QUALITY_SCREEN_AVAILABLE and IMAGE_QUALITY_MODE in ('flag', 'skip')
+
+    @staticmethod
+    async def screen_async(image_paths: List[str]) -> List[Dict]:
+        """Quality report per image (remote URLs and a disabled screen pass as usable)"""
+        if not ImageQualityScreen.enabled():
+            return [{"image_path": path, "usable": True, "issues": [], "feedback": []} for path in image_paths]
+
+        from services.image_preprocessor import ImagePreprocessor
+
+        loop = asyncio.get_running_loop()
+        pool = ImagePreprocessor.pool()
+        return list(await asyncio.gather(*(
+            loop.run_in_executor(pool, assess_image_quality, path) if not path.startswith('http')
+            else asyncio.sleep(0, result={"image_path": path, "usable": True, "issues": [], "feedback": []})
+            for path in image_paths
+        )))
+
+    @staticmethod
+    def rejected_result(report: Dict) -> Dict:
+        """Per-image result for a photo that was not sent for analysis"""
+        return {
+            "success": False,
+            "skipped": True,
+            "error": " ".join(report["feedback"]),
+            "quality": report,
+            "image_path": report["image_path"]
+        }
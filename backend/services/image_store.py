@@ -0,0 +1,242 @@
+"""
+Content-addressed storage for inspection images
+Originals live under their SHA-256 in a sharded ab/cd/<sha256> layout, so a
+photo uploaded twice is stored once; WebP thumbnail and medium renditions
+are generated next to them for list and detail previews
+"""
+import os
+import re
+import time
+import fcntl
+import asyncio
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from services.upload_service import UploadService, SavedUpload, IMAGE_SIGNATURES, detect_image_type
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+IMAGE_STORE_DIR = Path(os.getenv('IMAGE_STORE_DIR', 'uploads/store'))
+
+# Longest side in pixels for each generated rendition
+IMAGE_RENDITIONS: Dict[str, int] = {
+    'thumb': int(os.getenv('IMAGE_THUMB_SIZE', '256')),
+    'medium': int(os.getenv('IMAGE_MEDIUM_SIZE', '1024')),
+}
+IMAGE_RENDITION_QUALITY = int(os.getenv('IMAGE_RENDITION_QUALITY', '80'))
+
+_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+
+def render_renditions(original_path: str, targets: List[Tuple[str, int]], quality: int = IMAGE_RENDITION_QUALITY) -> List[str]:
+    """
+    Write WebP renditions of one image; targets are (output path, longest side)
+
+    Module-level so it can run in the preprocessing process pool. Each file
+    is written under a unique temporary name and renamed into place, so
+    readers never see a partial rendition and concurrent renders of the same
+    image do not clobber each other. Returns the paths written.
+    """
+    written = []
+    try:
+        with Image.open(original_path) as img:
+            img.draft('RGB', (max(size for _, size in targets),) * 2)
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'A' in img.getbands() or img.mode == 'P' else 'RGB')
+
+            for path, size in targets:
+                rendition = img.copy()
+                rendition.thumbnail((size, size), Image.LANCZOS)
+                with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as tmp:
+                    tmp_path = tmp.name
+                try:
+                    rendition.save(tmp_path, 'WEBP', quality=quality, method=4)
+                    os.replace(tmp_path, path)
+                except Exception:
+                    os.unlink(tmp_path)
+                    raise
+                written.append(path)
+
+    except Exception as e:
+        print(f"⚠️ Could not render previews for {original_path}: {e}")
+
+    return written
+
+
+@dataclass
+class StoredImage:
+    digest: str
+    path: str
+    size: int
+    content_type: str
+    created: bool
+    # mtime of the original when this request adopted it; see ImageStore.discard
+    claimed_ns: int = 0
+
+
+class ImageStore:
+    """Sharded, deduplicating image store"""
+
+    root = IMAGE_STORE_DIR
+
+    @classmethod
+    @contextmanager
+    def _locked(cls) -> Iterator[None]:
+        """Store-wide lock, shared by every worker process, around adopt and discard"""
+        cls.root.mkdir(parents=True, exist_ok=True)
+        with open(cls.root / '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def is_digest(ref: str) -> bool:
+        return bool(_DIGEST.match(ref or ''))
+
+    @classmethod
+    def original_path(cls, digest: str) -> Path:
+        return cls.root / digest[:2] / digest[2:4] / digest
+
+    @classmethod
+    def rendition_path(cls, digest: str, rendition: str) -> Path:
+        return cls.root / digest[:2] / digest[2:4] / f"{digest}.{rendition}.webp"
+
+    @classmethod
+    def resolve(cls, ref: str) -> str:
+        """
+        Readable location for a PropertyInspection.images entry
+
+        Content hashes map into the store; legacy entries (file paths from
+        before the store existed, or remote URLs) are returned unchanged.
+        """
+        return str(cls.original_path(ref)) if cls.is_digest(ref) else ref
+
+    @classmethod
+    def resolve_all(cls, refs: Optional[List[str]]) -> List[str]:
+        return [cls.resolve(ref) for ref in refs or []]
+
+    @staticmethod
+    def content_type(path) -> str:
+        with open(path, 'rb') as f:
+            image_type = detect_image_type(f.read(16))
+        return IMAGE_SIGNATURES[image_type][1] if image_type else 'application/octet-stream'
+
+    @classmethod
+    def adopt(cls, saved: SavedUpload) -> StoredImage:
+        """
+        Move a streamed upload into its content address, or drop it if already stored
+
+        Adopting existing content touches it, marking it as claimed by
+        another request in case the one that created it later discards it.
+        """
+        target = cls.original_path(saved.sha256)
+        with cls._locked():
+            created = not target.exists()
+            if created:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(saved.path, target)
+            else:
+                # Always move the mtime forward, even on filesystems with
+                # coarse timestamps, so the creator sees the claim
+                now, previous = time.time_ns(), target.stat().st_mtime_ns
+                os.utime(target, ns=(now, max(now, previous + 1_000_000_000)))
+            claimed_ns = target.stat().st_mtime_ns
+
+        if not created:
+            UploadService.discard(saved.path)
+
+        return StoredImage(
+            digest=saved.sha256,
+            path=str(target),
+            size=saved.size,
+            content_type=saved.content_type,
+            created=created,
+            claimed_ns=claimed_ns
+        )
+
+    @classmethod
+    async def save_upload(cls, upload: UploadFile) -> StoredImage:
+        """
+        Stream an upload into the store
+
+        The file is staged inside the store root so the final rename stays
+        on one filesystem. Raises UploadRejected like UploadService.save_image.
+        """
+        staging = cls.root / '.staging'
+        staging.mkdir(parents=True, exist_ok=True)
+        saved = await UploadService.save_image(upload, staging)
+        return await run_in_threadpool(cls.adopt, saved)
+
+    @classmethod
+    def discard(cls, stored: StoredImage) -> None:
+        """
+        Remove an image this request added, unless it may now be shared
+
+        Content that was already stored is left alone, and so is content
+        another upload has adopted since (its mtime moved) or an inspection
+        row references. Blocking: call from a worker thread.
+        """
+        if not stored.created:
+            return
+
+        from core.models import PropertyInspection
+
+        with cls._locked():
+            try:
+                if os.stat(stored.path).st_mtime_ns != stored.claimed_ns:
+                    return
+            except FileNotFoundError:
+                return
+            if PropertyInspection.objects.filter(images__icontains=stored.digest).exists():
+                return
+            UploadService.discard(stored.path)
+
+    @classmethod
+    async def generate_renditions(cls, digests: List[str], renditions: Optional[List[str]] = None) -> None:
+        """Create missing renditions in the preprocessing pool"""
+        if not PIL_AVAILABLE:
+            return
+
+        from services.image_preprocessor import ImagePreprocessor
+
+        loop = asyncio.get_running_loop()
+        pool = ImagePreprocessor.pool()
+        jobs = []
+        for digest in dict.fromkeys(digests):
+            original = cls.original_path(digest)
+            targets = [
+                (str(cls.rendition_path(digest, name)), IMAGE_RENDITIONS[name])
+                for name in renditions or IMAGE_RENDITIONS
+                if not cls.rendition_path(digest, name).exists()
+            ]
+            if targets and original.exists():
+                jobs.append(loop.run_in_executor(pool, render_renditions, str(original), targets))
+
+        await asyncio.gather(*jobs)
+
+    @classmethod
+    async def get_rendition(cls, digest: str, rendition: str) -> Optional[Path]:
+        """Path of a rendition, rendering it on demand if it is not there yet"""
+        path = cls.rendition_path(digest, rendition)
+        if not path.exists():
+            await cls.generate_renditions([digest], [rendition])
+        return path if path.exists() else None
+
+    @staticmethod
+    def urls(ref: str) -> Dict[str, Optional[str]]:
+        """Serving URLs for one images entry (none for legacy paths)"""
+        if not ImageStore.is_digest(ref):
+            return {"original": None, **{name: None for name in IMAGE_RENDITIONS}}
+        base = f"/api/inspections/images/{ref}"
+        return {"original": base, **{name: f"{base}?size={name}" for name in IMAGE_RENDITIONS}}
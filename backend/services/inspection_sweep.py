@@ -0,0 +1,283 @@
+"""
+Portfolio-wide inspection sweep
+Re-analyzes every property's latest photo set through a shared token-bucket
+limiter, checkpointing progress to a JSON file so an interrupted sweep resumes
+where it stopped
+"""
+import os
+import json
+import time
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from asgiref.sync import sync_to_async
+from django.db.models import JSONField, OuterRef, Subquery
+from django.utils import timezone
+from core.models import Property, PropertyInspection
+from services.rate_limiter import RateLimiter, OPENAI_RPM, OPENAI_TPM
+from services.vision_service import VisionService
+from services.image_store import ImageStore
+from tasks.inspection_jobs import apply_analysis_result
+
+SWEEP_CHECKPOINT = Path(os.getenv('INSPECTION_SWEEP_CHECKPOINT', 'cache/inspection_sweep.json'))
+
+# Properties analyzed at once; image calls inside each are paced by the limiter
+SWEEP_PROPERTY_CONCURRENCY = int(os.getenv('INSPECTION_SWEEP_CONCURRENCY', '8'))
+
+
+class SweepCheckpoint:
+    """
+    Resumable progress, persisted after every property
+
+    Properties are processed in id order but finish out of order, so the
+    checkpoint stores a watermark (every id at or below it is done) plus the
+    ids finished above it. The watermark only moves for runs that cover the
+    whole portfolio; runs limited to chosen properties just record their ids,
+    so they never mark unvisited lower ids as done. Failed properties are
+    listed separately and do
+    not count as done, so the next run of the same sweep retries them. A
+    checkpoint only resumes the sweep it belongs to; a new sweep id (by
+    default, a new quarter) starts from scratch.
+    """
+
+    def __init__(self, path: Path, sweep_id: str):
+        self.path = path
+        self.data = {
+            "sweep_id": sweep_id,
+            "started_at": datetime.now().isoformat(),
+            "watermark": 0,
+            "done_above_watermark": [],
+            "properties_completed": 0,
+            "properties_failed": 0,
+            "images_analyzed": 0,
+            "failed_property_ids": [],
+        }
+
+    @classmethod
+    def load(cls, path: Path, sweep_id: str, reset: bool = False) -> "SweepCheckpoint":
+        checkpoint = cls(path, sweep_id)
+        if not reset and path.exists():
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("sweep_id") == sweep_id:
+                checkpoint.data.update(saved)
+        return checkpoint
+
+    def is_done(self, property_id: int) -> bool:
+        if property_id in self.data["failed_property_ids"]:
+            return False
+        return property_id <= self.data["watermark"] or property_id in self.data["done_above_watermark"]
+
+    def mark_done(
+        self,
+        property_id: int,
+        pending_ids: List[int],
+        images: int,
+        failed: bool,
+        advance_watermark: bool = True
+    ) -> None:
+        self.data["images_analyzed"] += images
+        failed_ids = self.data["failed_property_ids"]
+        retried = property_id in failed_ids
+        if failed:
+            if not retried:
+                self.data["properties_failed"] += 1
+                failed_ids.append(property_id)
+        else:
+            self.data["properties_completed"] += 1
+            if retried:
+                self.data["properties_failed"] -= 1
+                failed_ids.remove(property_id)
+
+        done = set(self.data["done_above_watermark"])
+        done.add(property_id)
+        if advance_watermark:
+            # Advance the watermark up to the lowest id still outstanding
+            lowest_pending = min(pending_ids) if pending_ids else None
+            below = [pid for pid in done if lowest_pending is None or pid < lowest_pending]
+            if below:
+                self.data["watermark"] = max(self.data["watermark"], max(below))
+        self.data["done_above_watermark"] = sorted(pid for pid in done if pid > self.data["watermark"])
+        self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.data["updated_at"] = datetime.now().isoformat()
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def current_quarter() -> str:
+    now = datetime.now()
+    return f"{now.year}Q{(now.month - 1) // 3 + 1}"
+
+
+class InspectionSweep:
+    """Batch re-inspection of the portfolio under OpenAI RPM/TPM quotas"""
+
+    def __init__(
+        self,
+        checkpoint_path: Path = SWEEP_CHECKPOINT,
+        requests_per_minute: int = OPENAI_RPM,
+        tokens_per_minute: int = OPENAI_TPM,
+        property_concurrency: int = SWEEP_PROPERTY_CONCURRENCY,
+        property_ids: Optional[List[int]] = None,
+        limit: Optional[int] = None,
+        reset: bool = False,
+        report_every: float = 30.0,
+        sweep_id: Optional[str] = None
+    ):
+        self.checkpoint = SweepCheckpoint.load(Path(checkpoint_path), sweep_id or current_quarter(), reset=reset)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.property_concurrency = property_concurrency
+        self.property_ids = property_ids
+        self.limit = limit
+        self.report_every = report_every
+
+    def plan(self) -> List[Dict]:
+        """
+        Properties still to sweep with the photo set of their latest inspection
+
+        One query: the latest inspection's photos and type are correlated
+        subqueries on each property row.
+        """
+        latest = PropertyInspection.objects.filter(
+            property_id=OuterRef('pk')
+        ).exclude(images=[]).order_by('-inspection_date')
+
+        properties = Property.objects.filter(status='active').annotate(
+            latest_images=Subquery(latest.values('images')[:1], output_field=JSONField()),
+            latest_type=Subquery(latest.values('inspection_type')[:1]),
+        ).filter(latest_images__isnull=False).order_by('id')
+        if self.property_ids:
+            properties = properties.filter(id__in=self.property_ids)
+
+        plan = []
+        for property_id, images, inspection_type in properties.values_list('id', 'latest_images', 'latest_type'):
+            if self.checkpoint.is_done(property_id):
+                continue
+
+            plan.append({
+                "property_id": property_id,
+                "images": images,
+                "inspection_type": inspection_type,
+            })
+            if self.limit and len(plan) >= self.limit:
+                break
+
+        return plan
+
+    def estimate(self, plan: List[Dict]) -> Dict:
+        """Lower bound on sweep duration from the quotas alone"""
+        images = sum(len(item["images"]) for item in plan)
+        tokens_per_call = VisionService.estimated_tokens_per_call()
+        minutes = max(images / self.requests_per_minute, images * tokens_per_call / self.tokens_per_minute)
+        return {
+            "properties": len(plan),
+            "images": images,
+            "estimated_tokens_per_call": tokens_per_call,
+            "estimated_minutes": round(minutes, 1),
+            "limited_by": (
+                "tokens_per_minute"
+                if tokens_per_call / self.tokens_per_minute > 1 / self.requests_per_minute
+                else "requests_per_minute"
+            ),
+        }
+
+    def run(self) -> Dict:
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> Dict:
+        plan = await sync_to_async(self.plan)()
+        total_images = sum(len(item["images"]) for item in plan)
+        limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        semaphore = asyncio.Semaphore(self.property_concurrency)
+        pending_ids = [item["property_id"] for item in plan]
+        started = time.monotonic()
+        progress = {"images": 0, "properties": 0, "last_report": started}
+
+        print(f"🏘️ Inspection sweep {self.checkpoint.data['sweep_id']}: {len(plan)} properties, "
+              f"{total_images} images ({self.requests_per_minute} RPM / {self.tokens_per_minute} TPM)")
+
+        def report(force: bool = False):
+            now = time.monotonic()
+            if not force and now - progress["last_report"] < self.report_every:
+                return
+            progress["last_report"] = now
+            print(f"📈 {self._status(progress, len(plan), total_images, started, limiter)}")
+
+        async def on_image(index, result, consolidation):
+            progress["images"] += 1
+            report()
+
+        async def sweep_property(item: Dict):
+            async with semaphore:
+                if item["inspection_type"] == "roof":
+                    analyze = VisionService.analyze_roof_images_async
+                else:
+                    analyze = VisionService.analyze_multiple_images_async
+                try:
+                    result = await analyze(
+                        ImageStore.resolve_all(item["images"]), on_result=on_image, limiter=limiter
+                    )
+                    failed = not result.get("success") or not any(
+                        r.get("success") for r in result.get("individual_results", [])
+                    )
+                    if not failed:
+                        await sync_to_async(self._save_inspection)(item, result)
+                except Exception as e:
+                    print(f"❌ Property {item['property_id']} sweep failed: {e}")
+                    failed = True
+
+                pending_ids.remove(item["property_id"])
+                progress["properties"] += 1
+                await sync_to_async(self.checkpoint.mark_done)(
+                    item["property_id"], pending_ids, len(item["images"]), failed,
+                    advance_watermark=not self.property_ids
+                )
+
+        await asyncio.gather(*(sweep_property(item) for item in plan))
+        report(force=True)
+
+        elapsed = time.monotonic() - started
+        return {
+            "success": True,
+            "sweep_id": self.checkpoint.data["sweep_id"],
+            "properties_swept": progress["properties"],
+            "images_analyzed": progress["images"],
+            "elapsed_seconds": round(elapsed, 1),
+            "images_per_minute": round(progress["images"] / elapsed * 60, 1) if elapsed else 0,
+            "rate_limit_wait_seconds": round(limiter.waited_seconds, 1),
+            "checkpoint": self.checkpoint.data,
+        }
+
+    @staticmethod
+    def _status(progress: Dict, total_properties: int, total_images: int, started: float, limiter: RateLimiter) -> str:
+        elapsed = time.monotonic() - started
+        rate = progress["images"] / elapsed if elapsed else 0
+        remaining = total_images - progress["images"]
+        eta = f"{remaining / rate / 60:.1f} min" if rate else "unknown"
+        return (
+            f"{progress['properties']}/{total_properties} properties, "
+            f"{progress['images']}/{total_images} images, "
+            f"{rate * 60:.1f} images/min, ETA {eta}, "
+            f"rate-limit wait {limiter.waited_seconds:.0f}s"
+        )
+
+    def _save_inspection(self, item: Dict, result: Dict) -> None:
+        inspection = PropertyInspection(
+            property_id=item["property_id"],
+            inspection_date=timezone.now(),
+            inspection_type=item["inspection_type"],
+            notes=f"Portfolio sweep {self.checkpoint.data['sweep_id']}",
+            images=item["images"],
+            images_completed=len(item["images"]),
+            status='completed',
+            completed_at=timezone.now()
+        )
+        apply_analysis_result(inspection, result)
+        inspection.save()
@@ -0,0 +1,97 @@
+"""
+Incremental JSON parsing for streamed model output
+Pulls complete elements out of a named JSON array while the response is
+still arriving, so each finding can be shown as soon as it is written
+"""
+import json
+import re
+from typing import Any, List
+
+
+class JsonArrayStream:
+    """
+    Emit the elements of one JSON array (e.g. "damage_items") as they complete
+
+    feed() takes text deltas in any chunking and returns the elements that
+    closed within them. Anything before the array (prose, a ```json fence,
+    other keys) is skipped. Scanning is a single pass over each character:
+    string and escape state plus bracket depth decide where an element ends.
+    """
+
+    def __init__(self, key: str = "damage_items"):
+        self.key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self.text = ""
+        self.pos = 0
+        self.state = "seek"  # seek -> array -> done
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.item_start = None
+        self.items: List[Any] = []
+
+    def feed(self, delta: str) -> List[Any]:
+        self.text += delta
+        found = []
+
+        if self.state == "seek":
+            match = self.key_pattern.search(self.text, self.pos)
+            if not match:
+                # Keep enough tail to catch a key split across deltas
+                self.pos = max(self.pos, len(self.text) - 64)
+                return found
+            self.state = "array"
+            self.pos = match.end()
+
+        if self.state != "array":
+            return found
+
+        text = self.text
+        i = self.pos
+        while i < len(text):
+            ch = text[i]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+
+            elif self.depth == 0:
+                if ch == "]":
+                    self.state = "done"
+                    i += 1
+                    break
+                if ch in "{[":
+                    self.item_start = i
+                    self.depth = 1
+                elif ch == '"':
+                    self.in_string = True
+                # Only objects and arrays are emitted; scalars, commas and
+                # whitespace between elements are skipped
+
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        item = json.loads(text[self.item_start:i + 1])
+                        self.items.append(item)
+                        found.append(item)
+                    except json.JSONDecodeError:
+                        pass
+                    self.item_start = None
+
+            i += 1
+
+        self.pos = i
+        return found
+
+    @property
+    def done(self) -> bool:
+        return self.state == "done"
+
@@ -0,0 +1,268 @@
+"""
+Telemetry for external LLM calls
+Every Gemini, Perplexity, Claude and GPT-4o call records provider, model,
+call site, latency, token usage, estimated cost and outcome. Calls feed
+in-memory histograms served at /metrics and are flushed in batches to
+the LLMCallRecord table.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+LLM_TELEMETRY_ENABLED = os.getenv('LLM_TELEMETRY_ENABLED', 'true').lower() == 'true'
+LLM_TELEMETRY_FLUSH_SECONDS = float(os.getenv('LLM_TELEMETRY_FLUSH_SECONDS', '60'))
+# Records kept for the next flush; the oldest are dropped if the DB falls behind
+LLM_TELEMETRY_BUFFER = int(os.getenv('LLM_TELEMETRY_BUFFER', '10000'))
+
+# USD per million (prompt, completion) tokens, matched by model prefix
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'claude-3-5-sonnet': (3.00, 15.00),
+    'claude-3-5-haiku': (0.80, 4.00),
+    'gemini-2.0-flash': (0.10, 0.40),
+    'gemini-1.5-pro': (1.25, 5.00),
+    'sonar-pro': (3.00, 15.00),
+    'sonar': (1.00, 1.00),
+    'llama-3-sonar-small': (0.20, 0.20),
+}
+
+# Latency histogram bucket upper bounds, seconds
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+
+def estimate_cost(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> Optional[float]:
+    """Estimated USD cost of one call, or None for unknown models or missing usage"""
+    if prompt_tokens is None and completion_tokens is None:
+        return None
+    for prefix in sorted(MODEL_PRICING, key=len, reverse=True):
+        if model.startswith(prefix):
+            prompt_price, completion_price = MODEL_PRICING[prefix]
+            return ((prompt_tokens or 0) * prompt_price + (completion_tokens or 0) * completion_price) / 1_000_000
+    return None
+
+
+@dataclass
+class LLMCall:
+    provider: str
+    model: str
+    call_site: str
+    outcome: str = "success"
+    latency_ms: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    estimated_cost: Optional[float] = None
+    error: str = ""
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    def fail(self, error: str, outcome: str = "error") -> None:
+        """Mark a call that returned normally but did not succeed (e.g. HTTP 500)"""
+        self.outcome = outcome
+        self.error = str(error)[:1000]
+
+
+class _Series:
+    """Counters and latency histogram for one provider/model/call site/outcome"""
+
+    def __init__(self):
+        self.calls = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    def add(self, call: LLMCall) -> None:
+        seconds = call.latency_ms / 1000
+        self.calls += 1
+        self.latency_sum += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        self.prompt_tokens += call.prompt_tokens or 0
+        self.completion_tokens += call.completion_tokens or 0
+        self.cost += call.estimated_cost or 0.0
+
+
+class LLMTelemetry:
+    """Process-wide collector"""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str, str, str], _Series] = {}
+        self._pending: Deque[LLMCall] = deque(maxlen=LLM_TELEMETRY_BUFFER)
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.flushed = 0
+        self.dropped = 0
+
+    @contextmanager
+    def track(self, provider: str, model: str, call_site: str) -> Iterator[LLMCall]:
+        """
+        Time the enclosed API call and record it on exit
+
+        Exceptions are recorded (timeouts and cancellations separately) and
+        re-raised. Set token usage with call.usage() and mark non-exception
+        failures with call.fail().
+        """
+        call = LLMCall(provider=provider, model=model, call_site=call_site)
+        started = time.perf_counter()
+        try:
+            yield call
+        except (asyncio.CancelledError, GeneratorExit):
+            call.fail("cancelled", "cancelled")
+            raise
+        except (asyncio.TimeoutError, TimeoutError) as e:
+            call.fail(str(e) or "timed out", "timeout")
+            raise
+        except Exception as e:
+            call.fail(str(e))
+            raise
+        finally:
+            call.latency_ms = round((time.perf_counter() - started) * 1000)
+            self.record(call)
+
+    def record(self, call: LLMCall) -> None:
+        if not LLM_TELEMETRY_ENABLED:
+            return
+        if call.estimated_cost is None:
+            call.estimated_cost = estimate_cost(call.model, call.prompt_tokens, call.completion_tokens)
+
+        with self._lock:
+            key = (call.provider, call.model, call.call_site, call.outcome)
+            self._series.setdefault(key, _Series()).add(call)
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(call)
+
+        self._ensure_flusher()
+
+    # Export
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals per provider, model and call site, for the JSON view of /metrics"""
+        with self._lock:
+            items = list(self._series.items())
+
+        rows: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        for (provider, model, call_site, outcome), series in items:
+            row = rows.setdefault((provider, model, call_site), {
+                "provider": provider, "model": model, "call_site": call_site, "calls": 0, "outcomes": {},
+                "prompt_tokens": 0, "completion_tokens": 0, "estimated_cost": 0.0, "latency_sum": 0.0,
+            })
+            row["calls"] += series.calls
+            row["outcomes"][outcome] = row["outcomes"].get(outcome, 0) + series.calls
+            row["prompt_tokens"] += series.prompt_tokens
+            row["completion_tokens"] += series.completion_tokens
+            row["estimated_cost"] += series.cost
+            row["latency_sum"] += series.latency_sum
+
+        for row in rows.values():
+            row["avg_latency_ms"] = round(row.pop("latency_sum") / row["calls"] * 1000) if row["calls"] else 0
+            row["estimated_cost"] = round(row["estimated_cost"], 4)
+
+        return {
+            "calls": sorted(rows.values(), key=lambda row: row["estimated_cost"], reverse=True),
+            "pending": len(self._pending),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition of every series"""
+        with self._lock:
+            items = sorted(self._series.items())
+
+        lines = [
+            "# HELP llm_call_duration_seconds Latency of external LLM API calls",
+            "# TYPE llm_call_duration_seconds histogram",
+        ]
+        for (provider, model, call_site, outcome), series in items:
+            labels = f'provider="{provider}",model="{model}",call_site="{call_site}",outcome="{outcome}"'
+            for bound, count in zip(LATENCY_BUCKETS, series.buckets):
+                lines.append(f'llm_call_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'llm_call_duration_seconds_bucket{{{labels},le="+Inf"}} {series.calls}')
+            lines.append(f'llm_call_duration_seconds_sum{{{labels}}} {series.latency_sum:.3f}')
+            lines.append(f'llm_call_duration_seconds_count{{{labels}}} {series.calls}')
+
+        for name, kind, help_text, value in (
+            ("llm_prompt_tokens_total", "counter", "Prompt tokens sent", lambda s: s.prompt_tokens),
+            ("llm_completion_tokens_total", "counter", "Completion tokens received", lambda s: s.completion_tokens),
+            ("llm_estimated_cost_usd_total", "counter", "Estimated spend in USD", lambda s: f"{s.cost:.6f}"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (provider, model, call_site, outcome), series in items:
+                labels = f'provider="{provider}",model="{model}",call_site="{call_site}",outcome="{outcome}"'
+                lines.append(f"{name}{{{labels}}} {value(series)}")
+
+        return "\n".join(lines) + "\n"
+
+    # Persistence
+
+    def flush(self) -> int:
+        """Write pending records to LLMCallRecord; returns the number written"""
+        with self._lock:
+            batch: List[LLMCall] = list(self._pending)
+            self._pending.clear()
+        if not batch:
+            return 0
+
+        try:
+            from core.models import LLMCallRecord
+
+            LLMCallRecord.objects.bulk_create([
+                LLMCallRecord(
+                    provider=call.provider,
+                    model=call.model,
+                    call_site=call.call_site,
+                    outcome=call.outcome,
+                    latency_ms=call.latency_ms,
+                    prompt_tokens=call.prompt_tokens,
+                    completion_tokens=call.completion_tokens,
+                    estimated_cost=round(Decimal(str(call.estimated_cost)), 6) if call.estimated_cost is not None else None,
+                    error=call.error,
+                    created_at=call.created_at,
+                )
+                for call in batch
+            ], batch_size=500)
+        except Exception as e:
+            print(f"⚠️ LLM telemetry flush failed, keeping {len(batch)} records for the next try: {e}")
+            with self._lock:
+                self._pending.extendleft(reversed(batch))
+            return 0
+
+        self.flushed += len(batch)
+        return len(batch)
+
+    def _ensure_flusher(self) -> None:
+        """Start the periodic flush thread on first use (API, Celery worker or script)"""
+        if self._flusher is not None or LLM_TELEMETRY_FLUSH_SECONDS <= 0:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="llm-telemetry-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(LLM_TELEMETRY_FLUSH_SECONDS):
+            self.flush()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self.flush()
+
+
+llm_telemetry = LLMTelemetry()
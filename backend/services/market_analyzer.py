@@ -4,13 +4,32 @@ Anthropic Claude integration for competitive analysis and market insights
 import os
 from typing import Dict, List
 from anthropic import Anthropic
+from services.llm_telemetry import llm_telemetry
 
 client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
 
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+
 
 class MarketAnalyzer:
     """Analyze market data using Claude AI"""
     
+    @staticmethod
+    def _create_message(call_site: str, prompt: str, max_tokens: int):
+        """One Claude completion, recorded in LLM telemetry"""
+        with llm_telemetry.track('anthropic', CLAUDE_MODEL, call_site) as call:
+            response = client.messages.create(
+                model=CLAUDE_MODEL,
+                max_tokens=max_tokens,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                call.usage(usage.input_tokens, usage.output_tokens)
+            return response
+    
     @staticmethod
     def analyze_competitive_landscape(scraped_data: List[Dict]) -> Dict:
         """
@@ -58,13 +77,7 @@ class MarketAnalyzer:
         """
         
         try:
-            response = client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=4000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            response = MarketAnalyzer._create_message("market.competitive_landscape", prompt, max_tokens=4000)
             
             analysis_text = response.content[0].text
             
@@ -105,13 +118,7 @@ class MarketAnalyzer:
         """
         
         try:
-            response = client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=3000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            response = MarketAnalyzer._create_message("market.report", prompt, max_tokens=3000)
             
             return {
                 "success": True,
@@ -150,13 +157,7 @@ class MarketAnalyzer:
         """
         
         try:
-            response = client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=2000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            response = MarketAnalyzer._create_message("market.pricing_strategy", prompt, max_tokens=2000)
             
             return {
                 "success": True,
@@ -3,8 +3,10 @@ Perplexity AI service for comprehensive property research
 """
 import os
 import json
-import requests
 from typing import Dict, Any, Optional
+from services.http_clients import HTTPClients
+from services.research_cache import ResearchCache
+from services.llm_telemetry import llm_telemetry
 
 
 class PerplexityService:
@@ -19,51 +21,74 @@ class PerplexityService:
             "Content-Type": "application/json"
         }
 
-    def _make_request(self, messages: list, model: str = "sonar") -> Dict[str, Any]:
+    @staticmethod
+    def _payload(messages: list, model: str) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "messages": messages,
+            "max_tokens": 3500,
+            "temperature": 0.3,
+            "top_p": 0.9,
+            "return_citations": False,
+            "search_domain_filter": ["perplexity.ai"],
+            "return_images": False,
+            "return_related_questions": False,
+            "search_recency_filter": "month",
+            "top_k": 0,
+            "stream": False,
+            "presence_penalty": 0,
+            "frequency_penalty": 1
+        }
+
+    @staticmethod
+    def _parse_response(response, call) -> Dict[str, Any]:
+        if response.status_code == 200:
+            result = response.json()
+            usage = result.get("usage", {})
+            call.usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+            content = result["choices"][0]["message"]["content"]
+            return {
+                "success": True,
+                "content": content,
+                "usage": usage
+            }
+        call.fail(f"HTTP {response.status_code}")
+        return {
+            "success": False,
+            "error": f"API request failed: {response.status_code} - {response.text}"
+        }
+
+    def _make_request(self, messages: list, model: str = "sonar", call_site: str = "research.comprehensive") -> Dict[str, Any]:
         """Make request to Perplexity API"""
         try:
-            payload = {
-                "model": model,
-                "messages": messages,
-                "max_tokens": 3500,
-                "temperature": 0.3,
-                "top_p": 0.9,
-                "return_citations": False,
-                "search_domain_filter": ["perplexity.ai"],
-                "return_images": False,
-                "return_related_questions": False,
-                "search_recency_filter": "month",
-                "top_k": 0,
-                "stream": False,
-                "presence_penalty": 0,
-                "frequency_penalty": 1
+            with llm_telemetry.track('perplexity', model, call_site) as call:
+                response = HTTPClients.get_sync('perplexity').post(
+                    self.base_url, headers=self.headers, json=self._payload(messages, model)
+                )
+                return self._parse_response(response, call)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Request failed: {str(e)}"
             }
-            
-            response = requests.post(self.base_url, headers=self.headers, json=payload)
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                return {
-                    "success": True,
-                    "content": content,
-                    "usage": result.get("usage", {})
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"API request failed: {response.status_code} - {response.text}"
-                }
-                
+
+    async def _make_request_async(self, messages: list, model: str = "sonar", call_site: str = "research.comprehensive") -> Dict[str, Any]:
+        """Make request to Perplexity API without blocking the event loop"""
+        try:
+            with llm_telemetry.track('perplexity', model, call_site) as call:
+                response = await HTTPClients.get('perplexity').post(
+                    self.base_url, headers=self.headers, json=self._payload(messages, model)
+                )
+                return self._parse_response(response, call)
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Request failed: {str(e)}"
             }
 
-    def research_comprehensive_property(self, address: str) -> Dict[str, Any]:
-        """Conduct a comprehensive deep research analysis for any property address."""
-        prompt = f"""
+    @staticmethod
+    def _research_prompt(address: str) -> str:
+        return f"""
         Conduct a comprehensive deep research analysis for {address}. Return JSON with the following exact top-level keys:
         location, property_profile, education, risk_assessment, insurance, crime_data, amenities, market_data, demographics, investment_summary.
 
@@ -190,11 +215,26 @@ class PerplexityService:
         }}
 
         Use only real, current data sources where possible. Provide numerical values as numbers, not strings with symbols. If a value is unknown, set it to null instead of inventing data. Keep analysis concise and factual.
-        """
+        """.strip()
+
+    def research_comprehensive_property(self, address: str) -> Dict[str, Any]:
+        """Conduct a comprehensive deep research analysis for any property address."""
+        messages = [{"role": "user", "content": self._research_prompt(address)}]
+        return self._parse_research(self._make_request(messages))
+
+    async def research_comprehensive_property_async(self, address: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Async variant of research_comprehensive_property, served through the research cache"""
+        async def fetch(sections=None):
+            # One prompt covers every section, so a refresh always fetches them all
+            messages = [{"role": "user", "content": self._research_prompt(address)}]
+            return self._parse_research(await self._make_request_async(messages))
 
-        messages = [{"role": "user", "content": prompt.strip()}]
-        result = self._make_request(messages)
+        if use_cache and ResearchCache.enabled():
+            return await ResearchCache('perplexity').research(address, fetch)
+        return await fetch()
 
+    @staticmethod
+    def _parse_research(result: Dict[str, Any]) -> Dict[str, Any]:
         if not result["success"]:
             return {"error": result.get("error", "Unknown error")}
 
@@ -50,7 +50,7 @@ class PropertyAnalyzer:
             
             # Step 2: Get comprehensive property research from Gemini
             PropertyAnalyzer._update_progress(analysis_id, 50, "Researching property data...")
-            raw_data = gemini.research_comprehensive_property(address)
+            raw_data = await gemini.research_comprehensive_property_async(address)
             
             if "error" in raw_data:
                 raise Exception(f"Gemini research failed: {raw_data['error']}")
@@ -217,6 +217,8 @@ class PropertyAnalyzer:
             "insurance": insurance,
             "education": education,
             "investment_analysis": investment,
+            "section_errors": raw_data.get("_section_errors", {}),
+            "research_cache": raw_data.get("_research_cache"),
             "analyzed_at": datetime.now().isoformat(),
             "status": "completed",
         }
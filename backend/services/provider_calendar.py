@@ -0,0 +1,201 @@
+"""
+Provider calendar: working hours, daily capacity and time-slot allocation
+Bookings are kept per provider per day as sorted, non-overlapping intervals
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.utils import timezone
+from core.models import ProviderBooking, ServiceProvider
+
+
+class DaySchedule:
+    """
+    Bookings for one provider on one day
+
+    Starts and ends are parallel sorted lists. Locating the first booking
+    that can affect a candidate start time is a bisect (O(log n)); the gap
+    walk that follows is bounded by the provider's daily capacity.
+    """
+
+    def __init__(self, day_start: datetime, day_end: datetime, capacity: int):
+        self.day_start = day_start
+        self.day_end = day_end
+        self.capacity = capacity
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.starts) >= self.capacity
+
+    def has_room_for(self, jobs: int = 1) -> bool:
+        return len(self.starts) + jobs <= self.capacity
+
+    def unbook(self, start: datetime, end: datetime) -> None:
+        """Remove a booking recorded with book()"""
+        i = bisect_left(self.starts, start)
+        if i < len(self.starts) and self.starts[i] == start and self.ends[i] == end:
+            del self.starts[i]
+            del self.ends[i]
+
+    def book(self, start: datetime, end: datetime) -> None:
+        """Insert a booking, keeping the intervals sorted and disjoint"""
+        i = bisect_right(self.starts, start)
+        if (i > 0 and self.ends[i - 1] > start) or (i < len(self.starts) and self.starts[i] < end):
+            raise ValueError(f"Slot {start:%H:%M}-{end:%H:%M} overlaps an existing booking")
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+
+    def find_free_slot(
+        self,
+        duration: timedelta,
+        earliest: Optional[datetime] = None,
+        jobs: int = 1
+    ) -> Optional[datetime]:
+        """Earliest start at or after `earliest` with `duration` free inside working hours"""
+        if not self.has_room_for(jobs):
+            return None
+
+        t = max(earliest, self.day_start) if earliest else self.day_start
+        i = bisect_right(self.starts, t)
+        if i > 0 and self.ends[i - 1] > t:
+            t = self.ends[i - 1]
+
+        while t + duration <= self.day_end:
+            if i == len(self.starts) or self.starts[i] - t >= duration:
+                return t
+            t = max(t, self.ends[i])
+            i += 1
+
+        return None
+
+
+class ProviderCalendar:
+    """
+    Calendars for a set of providers over a scheduling horizon
+
+    Build one per dispatch pass and pass it to every assignment in the pass:
+    providers are added (and their bookings loaded) on first use, and
+    bookings made through DispatchService are recorded in place, so later
+    lookups in the pass need no further queries.
+    """
+
+    def __init__(self, providers: Iterable[ServiceProvider] = (), start: Optional[datetime] = None, days: int = 7):
+        self.start = start or timezone.now()
+        self.days = days
+        self.providers: Dict[int, ServiceProvider] = {}
+        self._schedules: Dict[Tuple[int, date], DaySchedule] = {}
+        self._journals: List[List[Tuple[int, datetime, datetime]]] = []
+        self.add_providers(providers)
+
+    def add_providers(self, providers: Iterable[ServiceProvider]) -> None:
+        """Add providers not yet in the calendar, loading their bookings with one query"""
+        new = {p.id: p for p in providers if p.id not in self.providers}
+        if new:
+            self.providers.update(new)
+            self._load_bookings(list(new))
+
+    def reload(self, provider_id: int) -> None:
+        """Re-read one provider's bookings, e.g. after losing a booking race"""
+        for key in [key for key in self._schedules if key[0] == provider_id]:
+            del self._schedules[key]
+        self._load_bookings([provider_id])
+
+    def _load_bookings(self, provider_ids: List[int]) -> None:
+        """Load every booking in the horizon for the given providers with a single query"""
+        first_day = timezone.localtime(self.start).date()
+        horizon_start = timezone.make_aware(datetime.combine(first_day, datetime.min.time()))
+        horizon_end = horizon_start + timedelta(days=self.days)
+
+        bookings = ProviderBooking.objects.filter(
+            provider_id__in=provider_ids,
+            start_time__gte=horizon_start,
+            start_time__lt=horizon_end
+        ).values_list('provider_id', 'start_time', 'end_time')
+
+        by_day = defaultdict(list)
+        for provider_id, start, end in bookings:
+            by_day[(provider_id, timezone.localtime(start).date())].append((start, end))
+
+        for (provider_id, day), intervals in by_day.items():
+            schedule = self.schedule_for(provider_id, day)
+            for start, end in sorted(intervals):
+                schedule.starts.append(start)
+                schedule.ends.append(end)
+
+    def schedule_for(self, provider_id: int, day: date) -> DaySchedule:
+        key = (provider_id, day)
+        if key not in self._schedules:
+            provider = self.providers[provider_id]
+            self._schedules[key] = DaySchedule(
+                day_start=timezone.make_aware(datetime.combine(day, provider.work_start)),
+                day_end=timezone.make_aware(datetime.combine(day, provider.work_end)),
+                capacity=provider.max_jobs_per_day
+            )
+        return self._schedules[key]
+
+    def earliest_slot(
+        self,
+        provider_id: int,
+        duration: timedelta,
+        earliest: Optional[datetime] = None,
+        jobs: int = 1
+    ) -> Optional[Tuple[datetime, datetime]]:
+        """Earliest (start, end) the provider can take `jobs` jobs lasting `duration` in total"""
+        earliest = earliest or self.start
+        first_day = timezone.localtime(earliest).date()
+
+        for offset in range(self.days):
+            schedule = self.schedule_for(provider_id, first_day + timedelta(days=offset))
+            start = schedule.find_free_slot(duration, earliest, jobs=jobs)
+            if start:
+                return start, start + duration
+
+        return None
+
+    def book(self, provider_id: int, start: datetime, end: datetime) -> None:
+        """Record a booking in the in-memory calendar (callers persist it)"""
+        self.schedule_for(provider_id, timezone.localtime(start).date()).book(start, end)
+        for journal in self._journals:
+            journal.append((provider_id, start, end))
+
+    @contextmanager
+    def tentative(self) -> Iterator[None]:
+        """
+        Wrap a transaction that books through this calendar
+
+        Bookings recorded inside the block are removed again if it raises,
+        i.e. when the transaction rolled back and they were never saved.
+        Put it outside the transaction.atomic() block it guards.
+        """
+        journal: List[Tuple[int, datetime, datetime]] = []
+        self._journals.append(journal)
+        try:
+            yield
+        except BaseException:
+            for provider_id, start, end in reversed(journal):
+                self.schedule_for(provider_id, timezone.localtime(start).date()).unbook(start, end)
+            raise
+        finally:
+            self._journals.remove(journal)
+
+    def free_slots(self, provider_id: int, day: date) -> List[Dict]:
+        """Free gaps in working hours for a provider's day"""
+        schedule = self.schedule_for(provider_id, day)
+        gaps = []
+        t = schedule.day_start
+        for start, end in zip(schedule.starts, schedule.ends):
+            if start > t:
+                gaps.append({"start": t.isoformat(), "end": start.isoformat()})
+            t = max(t, end)
+        if t < schedule.day_end:
+            gaps.append({"start": t.isoformat(), "end": schedule.day_end.isoformat()})
+
+        return gaps
@@ -0,0 +1,100 @@
+"""
+Token-bucket rate limiting for external API quotas
+Sized to provider requests-per-minute and tokens-per-minute limits so
+batch jobs run as fast as the quota allows without tripping 429s
+"""
+import os
+import time
+import asyncio
+from typing import Optional
+
+OPENAI_RPM = int(os.getenv('OPENAI_RPM', '500'))
+OPENAI_TPM = int(os.getenv('OPENAI_TPM', '30000'))
+
+# Providers enforce per-minute quotas over shorter windows, so bursts are
+# capped at this many seconds' worth of quota
+RATE_LIMIT_BURST_SECONDS = float(os.getenv('RATE_LIMIT_BURST_SECONDS', '10'))
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket
+
+    Holds up to `capacity` tokens (defaults to RATE_LIMIT_BURST_SECONDS
+    worth) and refills at rate_per_minute / 60 tokens per second. Requests
+    larger than the capacity wait for a full bucket and are then charged in
+    full, leaving the bucket in debt until the refill catches up, so the
+    long-run rate holds however large single requests get.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, self.rate * RATE_LIMIT_BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> float:
+        """Charge `amount` tokens, possibly below zero; returns the amount charged"""
+        self._refill()
+        self.tokens -= amount
+        return amount
+
+    def give_back(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits applied together
+
+    acquire() waits until both buckets can cover one request of the given
+    token estimate. Callers are served in arrival order, so a large request
+    is not starved by a stream of small ones.
+    """
+
+    def __init__(self, requests_per_minute: int = OPENAI_RPM, tokens_per_minute: int = OPENAI_TPM):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    async def acquire(self, tokens: int = 1) -> int:
+        """Wait for budget and reserve it; returns the tokens reserved, for settle()"""
+        async with self._lock:
+            while True:
+                delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    break
+                self.waited_seconds += delay
+                await asyncio.sleep(delay)
+
+            self.requests.take(1)
+            return int(self.tokens.take(tokens))
+
+    def settle(self, reserved: int, actual: Optional[int]) -> None:
+        """
+        Reconcile a reservation with the tokens the request really used
+
+        Unused tokens are returned (never more than were reserved) and any
+        overrun is charged, so the bucket tracks actual usage.
+        """
+        if actual is None:
+            return
+        if actual < reserved:
+            self.tokens.give_back(reserved - actual)
+        elif actual > reserved:
+            self.tokens.take(actual - reserved)
@@ -0,0 +1,282 @@
+"""
+Property research cache
+Gemini / Perplexity research results keyed by a normalized address, with a
+TTL per report section. Expired sections are still served for a grace
+period while a background refresh fetches them again (stale-while-revalidate),
+so a repeat analysis never waits on the research API.
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import redis
+
+_DAY = 24 * 60 * 60
+
+# Seconds a researched section stays fresh; prices move daily, schools and
+# flood zones hardly at all
+RESEARCH_SECTION_TTLS: Dict[str, int] = {
+    'location': int(os.getenv('RESEARCH_TTL_LOCATION', str(90 * _DAY))),
+    'property_profile': int(os.getenv('RESEARCH_TTL_PROPERTY_PROFILE', str(30 * _DAY))),
+    'education': int(os.getenv('RESEARCH_TTL_EDUCATION', str(30 * _DAY))),
+    'risk_assessment': int(os.getenv('RESEARCH_TTL_RISK_ASSESSMENT', str(30 * _DAY))),
+    'insurance': int(os.getenv('RESEARCH_TTL_INSURANCE', str(7 * _DAY))),
+    'crime_data': int(os.getenv('RESEARCH_TTL_CRIME_DATA', str(7 * _DAY))),
+    'amenities': int(os.getenv('RESEARCH_TTL_AMENITIES', str(14 * _DAY))),
+    'market_data': int(os.getenv('RESEARCH_TTL_MARKET_DATA', str(_DAY))),
+    'demographics': int(os.getenv('RESEARCH_TTL_DEMOGRAPHICS', str(30 * _DAY))),
+    'investment_summary': int(os.getenv('RESEARCH_TTL_INVESTMENT_SUMMARY', str(_DAY))),
+}
+# How long past its TTL a section may still be served while it is refreshed
+RESEARCH_STALE_SECONDS = int(os.getenv('RESEARCH_STALE_SECONDS', str(7 * _DAY)))
+RESEARCH_CACHE_ENABLED = os.getenv('RESEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv('RESEARCH_CACHE_MAX_ENTRIES', '2000'))
+# Bump when the research prompts change shape so old entries are ignored
+RESEARCH_CACHE_VERSION = os.getenv('RESEARCH_CACHE_VERSION', 'v1')
+
+_REDIS_PREFIX = "research_cache"
+
+# Redis for shared caching - fallback to in-memory if not available
+try:
+    redis_client = redis.Redis.from_url(
+        os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+        decode_responses=True,
+        socket_connect_timeout=1
+    )
+    redis_client.ping()
+    USE_REDIS = True
+except Exception:
+    redis_client = None
+    USE_REDIS = False
+
+_memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_memory_lock = Lock()
+
+# Background refreshes in flight in this process, by cache key
+_refreshing: Set[str] = set()
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+_STREET_SUFFIXES = {
+    'street': 'st', 'str': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'boulevard': 'blvd',
+    'drive': 'dr', 'lane': 'ln', 'court': 'ct', 'place': 'pl', 'parkway': 'pkwy', 'highway': 'hwy',
+    'circle': 'cir', 'terrace': 'ter', 'square': 'sq', 'trail': 'trl', 'expressway': 'expy',
+    'freeway': 'fwy', 'crossing': 'xing', 'heights': 'hts', 'point': 'pt', 'mount': 'mt',
+    'center': 'ctr', 'plaza': 'plz', 'turnpike': 'tpke', 'alley': 'aly',
+}
+_DIRECTIONALS = {
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+}
+_UNIT_DESIGNATORS = {'apartment', 'apt', 'unit', 'suite', 'ste', 'room', 'rm', '#'}
+_STATES = {
+    'alabama': 'al', 'alaska': 'ak', 'arizona': 'az', 'arkansas': 'ar', 'california': 'ca',
+    'colorado': 'co', 'connecticut': 'ct', 'delaware': 'de', 'district of columbia': 'dc',
+    'florida': 'fl', 'georgia': 'ga', 'hawaii': 'hi', 'idaho': 'id', 'illinois': 'il',
+    'indiana': 'in', 'iowa': 'ia', 'kansas': 'ks', 'kentucky': 'ky', 'louisiana': 'la',
+    'maine': 'me', 'maryland': 'md', 'massachusetts': 'ma', 'michigan': 'mi', 'minnesota': 'mn',
+    'mississippi': 'ms', 'missouri': 'mo', 'montana': 'mt', 'nebraska': 'ne', 'nevada': 'nv',
+    'new hampshire': 'nh', 'new jersey': 'nj', 'new mexico': 'nm', 'new york': 'ny',
+    'north carolina': 'nc', 'north dakota': 'nd', 'ohio': 'oh', 'oklahoma': 'ok', 'oregon': 'or',
+    'pennsylvania': 'pa', 'rhode island': 'ri', 'south carolina': 'sc', 'south dakota': 'sd',
+    'tennessee': 'tn', 'texas': 'tx', 'utah': 'ut', 'vermont': 'vt', 'virginia': 'va',
+    'washington': 'wa', 'west virginia': 'wv', 'wisconsin': 'wi', 'wyoming': 'wy',
+}
+_STATE_TAIL = re.compile(
+    r",\s*(" + "|".join(sorted(_STATES, key=len, reverse=True)) + r")(\s+\d{5}(?:-\d{4})?)?\s*$"
+)
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical form of a US street address for cache keys
+
+    "123 North Main Street, Apt. #4B, Austin, Texas 78701-1234, USA" and
+    "123 n main st unit 4b austin tx 78701" both become
+    "123 n main st unit 4b austin tx 78701".
+    """
+    text = re.sub(r"\s+", " ", (address or "").lower()).strip()
+    text = re.sub(r",?\s*(usa|u\.s\.a\.|us|united states( of america)?)\.?$", "", text)
+    text = _STATE_TAIL.sub(lambda m: f", {_STATES[m.group(1)]}{m.group(2) or ''}", text)
+    text = re.sub(r"\b(\d{5})-\d{4}\b", r"\1", text)
+
+    text = text.replace("#", " # ")
+    text = re.sub(r"(?<!\d)-|-(?!\d)", " ", text)
+    text = re.sub(r"[^\w\s#-]", " ", text)
+
+    tokens: List[str] = []
+    words = text.split()
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word in _UNIT_DESIGNATORS:
+            # "apt # 4b", "suite 200", "#4b" all become "unit <id>"
+            while i + 1 < len(words) and words[i + 1] in _UNIT_DESIGNATORS:
+                i += 1
+            if i + 1 < len(words):
+                tokens.extend(['unit', words[i + 1]])
+                i += 2
+                continue
+        elif word in _STREET_SUFFIXES:
+            word = _STREET_SUFFIXES[word]
+        elif word in _DIRECTIONALS:
+            word = _DIRECTIONALS[word]
+        tokens.append(word)
+        i += 1
+
+    return " ".join(tokens)
+
+
+class ResearchCache:
+    """Per-provider research cache with per-section freshness"""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+
+    @staticmethod
+    def enabled() -> bool:
+        return RESEARCH_CACHE_ENABLED
+
+    def key_for(self, address: str) -> str:
+        digest = hashlib.sha256(normalize_address(address).encode()).hexdigest()
+        return f"{self.provider}:{RESEARCH_CACHE_VERSION}:{digest}"
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            if USE_REDIS:
+                raw = redis_client.get(f"{_REDIS_PREFIX}:{key}")
+                return json.loads(raw) if raw else None
+            with _memory_lock:
+                entry = _memory.get(key)
+                if entry is not None:
+                    _memory.move_to_end(key)
+                return entry
+        except Exception as e:
+            print(f"⚠️ Research cache read failed: {e}")
+            return None
+
+    def _write(self, key: str, entry: Dict[str, Any]) -> None:
+        try:
+            if USE_REDIS:
+                expiry = max(RESEARCH_SECTION_TTLS.values()) + RESEARCH_STALE_SECONDS
+                redis_client.setex(f"{_REDIS_PREFIX}:{key}", expiry, json.dumps(entry))
+                return
+            with _memory_lock:
+                _memory[key] = entry
+                _memory.move_to_end(key)
+                while len(_memory) > RESEARCH_CACHE_MAX_ENTRIES:
+                    _memory.popitem(last=False)
+        except Exception as e:
+            print(f"⚠️ Research cache write failed: {e}")
+
+    def lookup(self, address: str) -> Dict[str, Any]:
+        """
+        Cached sections for an address
+
+        Returns {"data": {section: value}, "stale": [...], "missing": [...]}
+        where data holds every section that may still be served.
+        """
+        entry = self._read(self.key_for(address)) or {}
+        now = time.time()
+        data, stale, missing = {}, [], []
+
+        for section, ttl in RESEARCH_SECTION_TTLS.items():
+            cached = (entry.get("sections") or {}).get(section)
+            age = now - cached["fetched_at"] if cached else None
+            if age is None or age > ttl + RESEARCH_STALE_SECONDS:
+                missing.append(section)
+                continue
+            data[section] = cached["data"]
+            if age > ttl:
+                stale.append(section)
+
+        return {"data": data, "stale": stale, "missing": missing}
+
+    def store(self, address: str, research: Dict[str, Any]) -> List[str]:
+        """Merge freshly researched sections into the entry; returns the sections stored"""
+        if not isinstance(research, dict) or "error" in research:
+            return []
+
+        key = self.key_for(address)
+        entry = self._read(key) or {"address": normalize_address(address), "sections": {}}
+        now = time.time()
+        stored = []
+        for section in RESEARCH_SECTION_TTLS:
+            if isinstance(research.get(section), dict):
+                entry["sections"][section] = {"data": research[section], "fetched_at": now}
+                stored.append(section)
+
+        if stored:
+            self._write(key, entry)
+        return stored
+
+    async def research(
+        self,
+        address: str,
+        fetch: Callable[[Optional[List[str]]], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Research an address through the cache
+
+        fetch(sections) runs the uncached research; sections is the list
+        to refresh, which a provider that can only research everything at
+        once may ignore. Fresh results are returned as is. Stale ones are
+        returned at once and refreshed in the background. Missing sections
+        are fetched before returning. Every result carries a
+        "_research_cache" block describing what happened.
+        """
+        cached = self.lookup(address)
+
+        if not cached["missing"]:
+            if cached["stale"]:
+                self._refresh_in_background(address, cached["stale"], fetch)
+            status = "stale" if cached["stale"] else "hit"
+            print(f"💾 Research cache {status} for {normalize_address(address)}")
+            return {
+                **cached["data"],
+                "_research_cache": {"status": status, "refreshing": cached["stale"]},
+            }
+
+        result = await fetch(cached["missing"] + cached["stale"])
+        if "error" in result and not cached["data"]:
+            return result
+
+        stored = self.store(address, result)
+        merged = {**cached["data"], **{section: result[section] for section in stored}}
+        failed = result.get("_section_errors") or {
+            section: result["error"] for section in cached["missing"] if "error" in result
+        }
+        section_errors = {section: error for section, error in failed.items() if section not in merged}
+        if section_errors:
+            merged["_section_errors"] = section_errors
+        merged["_research_cache"] = {
+            "status": "partial" if cached["data"] else "miss",
+            "fetched": stored,
+            "served_from_cache": [section for section in cached["data"] if section not in stored],
+        }
+        return merged
+
+    def _refresh_in_background(self, address: str, sections: List[str], fetch) -> None:
+        key = self.key_for(address)
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+        async def refresh():
+            try:
+                result = await fetch(sections)
+                stored = self.store(address, result)
+                print(f"🔄 Refreshed {len(stored)} research sections for {normalize_address(address)}")
+            except Exception as e:
+                print(f"⚠️ Research refresh failed for {normalize_address(address)}: {e}")
+            finally:
+                _refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
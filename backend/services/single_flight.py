@@ -0,0 +1,136 @@
+"""
+Single-flight coalescing of duplicate background jobs
+The first request for a key starts the job; concurrent requests for the same
+key get that job's id back instead of starting their own, so they share its
+progress and result. Ownership is a lease held in-process and, when Redis is
+available, as a SET NX key shared by every worker.
+"""
+import os
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple
+import redis
+
+SINGLE_FLIGHT_LEASE_SECONDS = int(os.getenv('SINGLE_FLIGHT_LEASE_SECONDS', '600'))
+# SET NX / GET rounds before giving up on a lease that keeps changing hands
+SINGLE_FLIGHT_ACQUIRE_ATTEMPTS = 5
+# Keys hash onto this many locks, so callers for one key queue up without
+# holding up callers for others
+_KEY_LOCK_STRIPES = 64
+
+_REDIS_PREFIX = "single_flight"
+
+# Only delete the lease if it still belongs to the job releasing it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Redis for cross-worker locking - fallback to in-process only if not available
+try:
+    redis_client = redis.Redis.from_url(
+        os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+        decode_responses=True,
+        socket_connect_timeout=1
+    )
+    redis_client.ping()
+    USE_REDIS = True
+except Exception:
+    redis_client = None
+    USE_REDIS = False
+
+
+class SingleFlight:
+    """
+    Lease table mapping a job key to the id of the job running it
+
+    Leases expire after lease_seconds so a worker that dies mid-job does not
+    block the key forever; release() ends the lease as soon as the job ends.
+    acquire() and release() block on Redis, so call them from a worker
+    thread in async code.
+    """
+
+    def __init__(self, namespace: str, lease_seconds: int = SINGLE_FLIGHT_LEASE_SECONDS):
+        self.namespace = namespace
+        self.lease_seconds = lease_seconds
+        self._local: Dict[str, Tuple[str, float]] = {}
+        # Guards _local only; never held across Redis calls
+        self._lock = Lock()
+        self._key_locks = [Lock() for _ in range(_KEY_LOCK_STRIPES)]
+        self._release = redis_client.register_script(_RELEASE_SCRIPT) if USE_REDIS else None
+
+    def _redis_key(self, key: str) -> str:
+        return f"{_REDIS_PREFIX}:{self.namespace}:{key}"
+
+    def _local_owner(self, key: str) -> Optional[str]:
+        with self._lock:
+            owner = self._local.get(key)
+            return owner[0] if owner and owner[1] > time.time() else None
+
+    def acquire(self, key: str, job_id: str) -> str:
+        """
+        Claim key for job_id
+
+        Returns job_id when the caller now owns the key and should start the
+        job, or the id of the job already running it.
+        """
+        # Same-key callers in this process take turns, so the second one
+        # finds the first one's local lease instead of racing it in Redis
+        with self._key_locks[hash(key) % _KEY_LOCK_STRIPES]:
+            owner = self._local_owner(key)
+            if owner:
+                return owner
+
+            if USE_REDIS:
+                try:
+                    owner = self._acquire_redis(key, job_id)
+                    if owner != job_id:
+                        return owner
+                except Exception as e:
+                    print(f"⚠️ Single-flight lock unavailable, coalescing in-process only: {e}")
+
+            with self._lock:
+                self._local[key] = (job_id, time.time() + self.lease_seconds)
+            return job_id
+
+    def _acquire_redis(self, key: str, job_id: str) -> str:
+        """SET NX the lease, or return its holder; only ever takes a free key"""
+        redis_key = self._redis_key(key)
+        for _ in range(SINGLE_FLIGHT_ACQUIRE_ATTEMPTS):
+            if redis_client.set(redis_key, job_id, nx=True, ex=self.lease_seconds):
+                return job_id
+            current = redis_client.get(redis_key)
+            if current:
+                return current
+            # The other lease ended between SET and GET; try to take it again
+        raise RuntimeError(f"lease for {key} kept changing hands")
+
+    def current(self, key: str) -> Optional[str]:
+        """Id of the job holding key, if any"""
+        owner = self._local_owner(key)
+        if owner:
+            return owner
+        if USE_REDIS:
+            try:
+                return redis_client.get(self._redis_key(key))
+            except Exception:
+                pass
+        return None
+
+    def release(self, key: str, job_id: str) -> None:
+        with self._lock:
+            owner = self._local.get(key)
+            if owner and owner[0] == job_id:
+                del self._local[key]
+            # Drop expired leases left by jobs that never released
+            now = time.time()
+            for stale in [k for k, (_, expires) in self._local.items() if expires <= now]:
+                del self._local[stale]
+
+        if USE_REDIS:
+            try:
+                self._release(keys=[self._redis_key(key)], args=[job_id])
+            except Exception as e:
+                print(f"⚠️ Could not release single-flight lock {key}: {e}")
@@ -0,0 +1,147 @@
+"""
+Streaming upload handling for inspection images
+Files are copied to disk in fixed-size chunks, hashed as they arrive and
+rejected as soon as they break the size or type limits
+"""
+import os
+import uuid
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+INSPECTION_MAX_UPLOAD_MB = float(os.getenv('INSPECTION_MAX_UPLOAD_MB', '25'))
+
+# Detected from magic bytes, never from the client's filename or header
+IMAGE_SIGNATURES: Dict[str, Tuple[str, str]] = {
+    'jpeg': ('jpg', 'image/jpeg'),
+    'png': ('png', 'image/png'),
+    'webp': ('webp', 'image/webp'),
+    'heic': ('heic', 'image/heic'),
+}
+
+# HEIC is recognised but not allowed by default: Pillow cannot decode it for
+# quality screening or preprocessing, and GPT-4o rejects it as an input
+INSPECTION_ALLOWED_TYPES = [
+    t.strip() for t in os.getenv('INSPECTION_ALLOWED_TYPES', 'jpeg,png,webp').split(',') if t.strip()
+]
+
+
+class UploadRejected(Exception):
+    """Upload broke a limit; status_code is the HTTP status to return"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    sha256: str
+    size: int
+    image_type: str
+    content_type: str
+
+
+def detect_image_type(head: bytes) -> Optional[str]:
+    """Image type from the first bytes of a file"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'heic', b'heix', b'mif1', b'msf1', b'hevc'):
+        return 'heic'
+    return None
+
+
+class UploadService:
+    """Bounded-memory upload persistence"""
+
+    @staticmethod
+    async def save_image(
+        upload: UploadFile,
+        directory: Path,
+        max_bytes: Optional[int] = None,
+        allowed_types: Optional[list] = None
+    ) -> SavedUpload:
+        """
+        Stream an uploaded image into `directory`
+
+        At most one chunk per upload is held in memory. The file is written
+        under a temporary name and only renamed into place once it passes
+        every check; on rejection the partial file is removed.
+
+        Raises:
+            UploadRejected: 415 for a disallowed type, 413 when too large
+        """
+        max_bytes = max_bytes or int(INSPECTION_MAX_UPLOAD_MB * 1024 * 1024)
+        allowed_types = allowed_types or INSPECTION_ALLOWED_TYPES
+
+        digest = hashlib.sha256()
+        size = 0
+        image_type = None
+        tmp_path = directory / f".{uuid.uuid4()}.part"
+        handle = await run_in_threadpool(open, tmp_path, "wb")
+
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                if image_type is None:
+                    image_type = detect_image_type(chunk[:16])
+                    if image_type not in allowed_types:
+                        raise UploadRejected(
+                            415,
+                            f"{upload.filename}: unsupported image type "
+                            f"(allowed: {', '.join(allowed_types)})"
+                        )
+
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(
+                        413,
+                        f"{upload.filename}: exceeds the {max_bytes / 1024 / 1024:.0f} MB upload limit"
+                    )
+
+                digest.update(chunk)
+                await run_in_threadpool(handle.write, chunk)
+
+            if image_type is None:
+                raise UploadRejected(415, f"{upload.filename}: empty upload")
+
+            await run_in_threadpool(handle.close)
+            extension, content_type = IMAGE_SIGNATURES[image_type]
+            final_path = directory / f"{uuid.uuid4()}.{extension}"
+            await run_in_threadpool(os.replace, tmp_path, final_path)
+
+        except BaseException:
+            await run_in_threadpool(handle.close)
+            await run_in_threadpool(UploadService.discard, tmp_path)
+            raise
+
+        finally:
+            await upload.close()
+
+        return SavedUpload(
+            path=str(final_path),
+            sha256=digest.hexdigest(),
+            size=size,
+            image_type=image_type,
+            content_type=content_type
+        )
+
+    @staticmethod
+    def discard(path) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
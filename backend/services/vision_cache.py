@@ -0,0 +1,192 @@
+"""
+Content-addressed cache for GPT-4o image analyses
+Keyed by SHA-256 of the image bytes plus prompt version and model, so a
+re-uploaded photo is never sent to the vision API twice
+"""
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional
+import redis
+
+VISION_CACHE_DIR = Path(os.getenv('VISION_CACHE_DIR', 'cache/vision'))
+VISION_CACHE_MAX_MB = float(os.getenv('VISION_CACHE_MAX_MB', '256'))
+VISION_CACHE_MAX_ENTRIES = int(os.getenv('VISION_CACHE_MAX_ENTRIES', '50000'))
+
+_REDIS_PREFIX = "vision_cache"
+
+# Redis for shared caching - fallback to local disk if not available
+try:
+    redis_client = redis.Redis.from_url(
+        os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+        decode_responses=True,
+        socket_connect_timeout=1
+    )
+    redis_client.ping()
+    USE_REDIS = True
+except Exception:
+    redis_client = None
+    USE_REDIS = False
+
+
+class VisionCache:
+    """
+    LRU cache of analysis payloads
+
+    Redis keeps recency in a sorted set and evicts by entry count. The disk
+    fallback stores one JSON file per key, uses mtime as recency and evicts
+    the oldest files once the directory exceeds VISION_CACHE_MAX_MB.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._disk_bytes: Optional[int] = None
+
+    @staticmethod
+    def key_for(image_bytes: bytes, prompt_version: str, model: str) -> str:
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f"{prompt_version}:{model}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = self._redis_get(key) if USE_REDIS else self._disk_get(key)
+        except Exception as e:
+            print(f"⚠️ Vision cache read failed: {e}")
+            value = None
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if USE_REDIS:
+            try:
+                redis_client.hincrby(f"{_REDIS_PREFIX}:stats", "hits" if value is not None else "misses", 1)
+            except Exception:
+                pass
+
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            if USE_REDIS:
+                self._redis_set(key, value)
+            else:
+                self._disk_set(key, value)
+        except Exception as e:
+            print(f"⚠️ Vision cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        hits, misses = self.hits, self.misses
+        stats = {"backend": "redis" if USE_REDIS else "disk"}
+
+        try:
+            if USE_REDIS:
+                shared = redis_client.hgetall(f"{_REDIS_PREFIX}:stats")
+                hits, misses = int(shared.get("hits", 0)), int(shared.get("misses", 0))
+                stats["entries"] = redis_client.zcard(f"{_REDIS_PREFIX}:lru")
+                stats["max_entries"] = VISION_CACHE_MAX_ENTRIES
+            else:
+                files = list(VISION_CACHE_DIR.glob("*.json")) if VISION_CACHE_DIR.exists() else []
+                stats["entries"] = len(files)
+                stats["size_mb"] = round(sum(f.stat().st_size for f in files) / 1024 / 1024, 2)
+                stats["max_mb"] = VISION_CACHE_MAX_MB
+        except Exception as e:
+            stats["error"] = str(e)
+
+        total = hits + misses
+        stats.update({
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+        })
+        return stats
+
+    # Redis backend
+
+    def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = redis_client.get(f"{_REDIS_PREFIX}:{key}")
+        if raw is None:
+            return None
+        redis_client.zadd(f"{_REDIS_PREFIX}:lru", {key: time.time()})
+        return json.loads(raw)
+
+    def _redis_set(self, key: str, value: Dict[str, Any]) -> None:
+        pipe = redis_client.pipeline()
+        pipe.set(f"{_REDIS_PREFIX}:{key}", json.dumps(value))
+        pipe.zadd(f"{_REDIS_PREFIX}:lru", {key: time.time()})
+        pipe.zcard(f"{_REDIS_PREFIX}:lru")
+        size = pipe.execute()[-1]
+
+        overflow = size - VISION_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            evicted = redis_client.zpopmin(f"{_REDIS_PREFIX}:lru", overflow)
+            if evicted:
+                redis_client.delete(*[f"{_REDIS_PREFIX}:{k}" for k, _ in evicted])
+
+    # Disk backend
+
+    @staticmethod
+    def _path(key: str) -> Path:
+        return VISION_CACHE_DIR / (hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return value
+
+    def _disk_set(self, key: str, value: Dict[str, Any]) -> None:
+        VISION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        data = json.dumps(value).encode()
+
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(f.stat().st_size for f in VISION_CACHE_DIR.glob("*.json"))
+            else:
+                self._disk_bytes += len(data)
+
+            if self._disk_bytes > VISION_CACHE_MAX_MB * 1024 * 1024:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Drop least recently used files until the cache is back under 90% of the cap"""
+        target = VISION_CACHE_MAX_MB * 1024 * 1024 * 0.9
+        files = []
+        for f in VISION_CACHE_DIR.glob("*.json"):
+            try:
+                st = f.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, f))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, f in sorted(files):
+            if total <= target:
+                break
+            try:
+                f.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
+
+        self._disk_bytes = total
+
+
+vision_cache = VisionCache()
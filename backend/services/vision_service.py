@@ -3,18 +3,309 @@ OpenAI GPT-4V integration for property inspection analysis
 Automated damage detection using computer vision
 """
 import os
+import asyncio
+import inspect
+import time
+from functools import partial
 import base64
 import json
-from typing import Dict, List, Optional
-from openai import OpenAI
+import re
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from openai import OpenAI, AsyncOpenAI
 from pathlib import Path
+from services.vision_cache import vision_cache
+from services.image_preprocessor import ImagePreprocessor, PREPROCESS_SIGNATURE, estimate_vision_tokens
+from services.upload_service import detect_image_type
+from services.rate_limiter import RateLimiter
+from services.json_stream import JsonArrayStream
+from services.image_dedup import ImageDeduplicator, VISION_DEDUP_ENABLED
+from services.image_quality import ImageQualityScreen, IMAGE_QUALITY_MODE
+from services.llm_telemetry import llm_telemetry
 
 client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
+_async_client: Optional[Tuple[AsyncOpenAI, asyncio.AbstractEventLoop]] = None
+
+
+def async_client() -> AsyncOpenAI:
+    """
+    AsyncOpenAI client for the running event loop
+
+    Its pooled connections are bound to the loop that opened them, and Celery
+    tasks run each inspection in a fresh asyncio.run() loop, so a client
+    left over from a finished loop is replaced rather than reused.
+    """
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client[1] is not loop:
+        _async_client = (AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY')), loop)
+    return _async_client[0]
+
+# Concurrent GPT-4o calls per inspection and per-image time budget
+VISION_MAX_CONCURRENCY = int(os.getenv('VISION_MAX_CONCURRENCY', '5'))
+VISION_IMAGE_TIMEOUT = float(os.getenv('VISION_IMAGE_TIMEOUT', '90'))
+
+# Rate-limit estimate for one high-detail image after preprocessing
+VISION_IMAGE_TOKENS = int(os.getenv('VISION_IMAGE_TOKENS', '1105'))
+
+# Packing: several photos per GPT-4o request so the inspection prompt and
+# round trip are paid once per pack. Packs close at VISION_PACK_MAX_IMAGES
+# photos or VISION_PACK_IMAGE_TOKENS of estimated image input, whichever
+# comes first, so small photos pack denser than full-resolution ones.
+VISION_PACK_ENABLED = os.getenv('VISION_PACK_ENABLED', 'false').lower() == 'true'
+VISION_PACK_MAX_IMAGES = int(os.getenv('VISION_PACK_MAX_IMAGES', '6'))
+VISION_PACK_IMAGE_TOKENS = int(os.getenv('VISION_PACK_IMAGE_TOKENS', '3500'))
+VISION_PACK_OUTPUT_TOKENS = int(os.getenv('VISION_PACK_OUTPUT_TOKENS', '1500'))
+
+
+def pack_images(
+    token_estimates: List[int],
+    max_images: int = VISION_PACK_MAX_IMAGES,
+    max_tokens: int = VISION_PACK_IMAGE_TOKENS
+) -> List[List[int]]:
+    """Greedily group image indexes, in order, into packs within both limits"""
+    packs = []
+    current, current_tokens = [], 0
+    for index, tokens in enumerate(token_estimates):
+        if current and (len(current) >= max_images or current_tokens + tokens > max_tokens):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+class ConsolidatedAnalysis:
+    """
+    Incremental consolidation of per-image results
+
+    Results can be added in any order (e.g. as concurrent calls finish);
+    to_dict() always walks them in image order, so the output matches a
+    sequential run.
+    """
+    
+    def __init__(self, image_paths: List[str]):
+        self.image_paths = image_paths
+        self.results: List[Optional[Dict]] = [None] * len(image_paths)
+    
+    @property
+    def completed(self) -> int:
+        return sum(1 for r in self.results if r is not None)
+    
+    def add(self, index: int, result: Dict) -> None:
+        self.results[index] = result
+    
+    def to_dict(self) -> Dict:
+        results = [r for r in self.results if r is not None]
+        all_damage_items = []
+        priority_items = set()
+        lows, highs = [], []
+        
+        for result in results:
+            # Near-duplicate frames repeat their representative's findings
+            if result.get('duplicate_of'):
+                continue
+            if result.get('success') and 'analysis' in result:
+                analysis = result['analysis']
+                
+                if 'damage_items' in analysis:
+                    all_damage_items.extend(analysis['damage_items'])
+                
+                if 'priority_items' in analysis:
+                    priority_items.update(analysis['priority_items'])
+                
+                # Each photo shows different damage, so estimates add up
+                cost = _parse_cost_range(analysis.get('estimated_total_cost'))
+                if cost:
+                    lows.append(cost[0])
+                    highs.append(cost[1])
+        
+        # Calculate average severity
+        severities = [item.get('severity', 0) for item in all_damage_items]
+        avg_severity = sum(severities) / len(severities) if severities else 0
+        
+        # Determine overall condition
+        if avg_severity >= 8:
+            overall_condition = "critical"
+        elif avg_severity >= 6:
+            overall_condition = "poor"
+        elif avg_severity >= 4:
+            overall_condition = "fair"
+        elif avg_severity >= 2:
+            overall_condition = "good"
+        else:
+            overall_condition = "excellent"
+        
+        return {
+            "success": True,
+            "total_images_analyzed": len(self.image_paths),
+            "images_deduplicated": sum(1 for r in results if r.get('duplicate_of')),
+            "images_rejected": sum(1 for r in results if r.get('skipped')),
+            "images_pack_retried": sum(1 for r in results if r.get('pack_retried')),
+            "individual_results": results,
+            "consolidated_analysis": {
+                "all_damage_items": all_damage_items,
+                "priority_items": list(priority_items),
+                "overall_condition": overall_condition,
+                "average_severity": round(avg_severity, 2),
+                "total_damage_items": len(all_damage_items),
+                "estimated_cost_range": {"low": sum(lows), "high": sum(highs)} if lows else None
+            }
+        }
+
+
+ROOF_URGENCY_ORDER = ['monitor', 'routine', 'urgent', 'immediate']
+
+
+def _normalize_text(text) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", str(text or "").lower()))
+
+
+def _parse_score(value) -> Optional[float]:
+    match = re.search(r"\d+(?:\.\d+)?", str(value)) if value is not None else None
+    return float(match.group()) if match else None
+
+
+def _parse_cost_range(value) -> Optional[Tuple[float, float]]:
+    """(low, high) USD from strings like "$2,500 - $4k" or "3000" """
+    if isinstance(value, (int, float)):
+        return float(value), float(value)
+    amounts = [
+        float(number.replace(',', '')) * (1000 if suffix.lower() == 'k' else 1)
+        for number, suffix in re.findall(r"(\d[\d,]*(?:\.\d+)?)\s*([kK]?)", str(value or ""))
+    ]
+    if not amounts:
+        return None
+    return min(amounts[:2]), max(amounts[:2])
+
+
+class ConsolidatedRoofAnalysis:
+    """
+    Incremental merge of per-image roof reports into one roof assessment
+    
+    Every photo shows the same roof, so the merge is worst-case:
+    - condition_score is the minimum across images (1=failing, 10=excellent)
+    - issues are deduplicated on normalized issue text + location, keeping
+      the highest severity and most urgent repair urgency seen
+    - the repair cost range runs from the largest single-image low estimate
+      (the roof needs at least the worst view's work) to the sum of the high
+      estimates (if every photo shows distinct damage)
+    Age and remaining lifespan come from the worst-scoring report.
+    """
+    
+    def __init__(self, image_paths: List[str]):
+        self.image_paths = image_paths
+        self.results: List[Optional[Dict]] = [None] * len(image_paths)
+    
+    @property
+    def completed(self) -> int:
+        return sum(1 for r in self.results if r is not None)
+    
+    def add(self, index: int, result: Dict) -> None:
+        result.setdefault("image_path", self.image_paths[index])
+        self.results[index] = result
+    
+    def to_dict(self) -> Dict:
+        results = [r for r in self.results if r is not None]
+        reports = [
+            (index, r["roof_analysis"]) for index, r in enumerate(self.results)
+            if r is not None and r.get("success") and isinstance(r.get("roof_analysis"), dict)
+            and not r.get("duplicate_of")
+        ]
+        
+        if not reports:
+            errors = [r.get("error") for r in results if r.get("error")]
+            return {
+                "success": False,
+                "error": errors[0] if errors else "No roof images analyzed",
+                "total_images_analyzed": len(self.image_paths),
+                "individual_results": results
+            }
+        
+        scored = [(_parse_score(report.get("condition_score")), report) for _, report in reports]
+        scored = [(score, report) for score, report in scored if score is not None]
+        worst_score, worst_report = min(scored, key=lambda item: item[0]) if scored else (None, reports[0][1])
+        
+        issues: Dict[Tuple[str, str], Dict] = {}
+        recommendations: Dict[str, str] = {}
+        roof_types: Dict[str, int] = {}
+        lows, highs = [], []
+        
+        for index, report in reports:
+            roof_type = report.get("roof_type")
+            if roof_type:
+                roof_types[roof_type] = roof_types.get(roof_type, 0) + 1
+            
+            for issue in report.get("issues_found") or []:
+                if not isinstance(issue, dict):
+                    continue
+                key = (_normalize_text(issue.get("issue")), _normalize_text(issue.get("location")))
+                merged = issues.get(key)
+                if merged is None:
+                    merged = issues[key] = dict(issue, images=[])
+                
+                severity = _parse_score(issue.get("severity"))
+                if severity is not None and severity > (_parse_score(merged.get("severity")) or 0):
+                    merged["severity"] = issue.get("severity")
+                
+                urgency = str(issue.get("repair_urgency", "")).lower()
+                current = str(merged.get("repair_urgency", "")).lower()
+                if urgency in ROOF_URGENCY_ORDER and (
+                    current not in ROOF_URGENCY_ORDER
+                    or ROOF_URGENCY_ORDER.index(urgency) > ROOF_URGENCY_ORDER.index(current)
+                ):
+                    merged["repair_urgency"] = urgency
+                
+                merged["images"].append(index)
+            
+            for recommendation in report.get("repair_recommendations") or []:
+                recommendations.setdefault(_normalize_text(recommendation), recommendation)
+            
+            cost = _parse_cost_range(report.get("estimated_repair_cost"))
+            if cost:
+                lows.append(cost[0])
+                highs.append(cost[1])
+        
+        merged_issues = sorted(issues.values(), key=lambda i: _parse_score(i.get("severity")) or 0, reverse=True)
+        cost_range = {"low": max(lows), "high": sum(highs)} if lows else None
+        
+        roof_analysis = {
+            "roof_type": max(roof_types, key=roof_types.get) if roof_types else None,
+            "estimated_age": worst_report.get("estimated_age"),
+            "condition_score": int(worst_score) if worst_score is not None else None,
+            "issues_found": merged_issues,
+            "estimated_remaining_lifespan": worst_report.get("estimated_remaining_lifespan"),
+            "repair_recommendations": [r for r in recommendations.values() if r],
+            "estimated_repair_cost": (
+                f"${cost_range['low']:,.0f} - ${cost_range['high']:,.0f}" if cost_range else None
+            ),
+            "estimated_repair_cost_range": cost_range,
+            "images_analyzed": len(reports),
+            "images_deduplicated": sum(1 for r in results if r.get("duplicate_of")),
+            "images_rejected": sum(1 for r in results if r.get("skipped")),
+            "images_failed": sum(1 for r in results if not r.get("success"))
+        }
+        
+        return {
+            "success": True,
+            "roof_analysis": roof_analysis,
+            "model": VisionService.MODEL,
+            "total_images_analyzed": len(self.image_paths),
+            "individual_results": results
+        }
+
 
 class VisionService:
     """Property inspection analysis using GPT-4 Vision"""
     
+    MODEL = "gpt-4o"
+    
+    # Bump when a prompt changes so cached analyses are not reused
+    PROMPT_VERSION = "inspection-v1"
+    ROOF_PROMPT_VERSION = "roof-v2"
+    
     INSPECTION_PROMPT = """
     Analyze this property image for damage and maintenance issues. Focus on:
     
@@ -45,12 +336,164 @@ class VisionService:
     }
     """
     
+    PACKED_INSPECTION_PROMPT = """
+    You are given {count} property images, each preceded by its label
+    ("Image 1", "Image 2", ...). Treat every image as a separate inspection
+    photo and apply the instructions below to each one independently; do not
+    carry findings from one image into another.
+    
+    Respond with one JSON object of the form
+    {{"images": [{{"image": <label number>, ...report for that image...}}]}}
+    containing exactly one report per image, in label order, where each
+    report has the structure described below.
+    """
+    
+    ROOF_PROMPT = """
+    Perform a detailed roof inspection analysis on this image. Focus specifically on:
+    
+    1. Missing or damaged shingles
+    2. Structural integrity
+    3. Wear patterns and aging
+    4. Water damage indicators
+    5. Flashing condition
+    6. Gutter condition
+    7. Overall roof lifespan estimation
+    
+    Provide JSON response:
+    {
+        "roof_type": "shingle/tile/metal/flat/other",
+        "estimated_age": "years",
+        "condition_score": 1-10 (1=failing, 10=excellent),
+        "issues_found": [
+            {
+                "issue": "description",
+                "severity": 1-10,
+                "location": "area of roof",
+                "repair_urgency": "immediate/urgent/routine/monitor"
+            }
+        ],
+        "estimated_remaining_lifespan": "years",
+        "repair_recommendations": ["list of recommendations"],
+        "estimated_repair_cost": "USD estimate"
+    }
+    """
+    
     @staticmethod
     def encode_image(image_path: str) -> str:
         """Encode image to base64"""
         with open(image_path, "rb") as image_file:
             return base64.b64encode(image_file.read()).decode('utf-8')
     
+    @classmethod
+    def _load_image(cls, image_path: str, prompt_version: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Read an image and compute its analysis cache key
+        
+        The key covers the original bytes, prompt version, model and
+        preprocessing settings. Remote URLs are neither read nor cached.
+        """
+        if image_path.startswith('http'):
+            return None, None
+        
+        with open(image_path, "rb") as image_file:
+            image_bytes = image_file.read()
+        
+        return image_bytes, vision_cache.key_for(
+            image_bytes, f"{prompt_version}:{PREPROCESS_SIGNATURE}", cls.MODEL
+        )
+    
+    @staticmethod
+    def _image_content(image_path: str, image_bytes: Optional[bytes]) -> Dict:
+        """Build the image part of a vision message from (preprocessed) bytes"""
+        if image_bytes is None:
+            return {"type": "image_url", "image_url": {"url": image_path}}
+        
+        image_type = detect_image_type(image_bytes[:16]) or 'jpeg'
+        base64_image = base64.b64encode(image_bytes).decode('utf-8')
+        return {
+            "type": "image_url",
+            "image_url": {"url": f"data:image/{image_type};base64,{base64_image}"}
+        }
+    
+    @staticmethod
+    def _parse_analysis(content: str) -> Dict:
+        """Extract the JSON inspection report from a model response"""
+        if "```json" in content:
+            json_str = content.split("```json")[1].split("```")[0].strip()
+            return json.loads(json_str)
+        elif "```" in content:
+            json_str = content.split("```")[1].split("```")[0].strip()
+            return json.loads(json_str)
+        
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            # Fallback if not JSON
+            return {
+                "damage_items": [],
+                "overall_condition": "unknown",
+                "priority_items": [],
+                "summary": content,
+                "raw_response": content
+            }
+    
+    @staticmethod
+    def _parse_roof_analysis(content: str) -> Dict:
+        """Extract the JSON roof report from a model response"""
+        if "```json" in content:
+            json_str = content.split("```json")[1].split("```")[0].strip()
+            return json.loads(json_str)
+        
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            return {"raw_response": content}
+    
+    @classmethod
+    def _parse_packed_analysis(cls, content: str, count: int) -> Dict[int, Dict]:
+        """
+        Per-image reports from a packed response, keyed by 1-based label
+        
+        Reports without a usable label are matched by position when the
+        response has exactly one report per image. Images missing from the
+        response are simply absent from the result.
+        """
+        parsed = cls._parse_analysis(content)
+        reports = parsed.get("images") if isinstance(parsed, dict) else parsed
+        if not isinstance(reports, list):
+            return {}
+        
+        by_label = {}
+        for position, report in enumerate(reports, 1):
+            if not isinstance(report, dict):
+                continue
+            report = dict(report)
+            label = report.pop("image", None)
+            try:
+                label = int(label)
+            except (TypeError, ValueError):
+                label = position if len(reports) == count else None
+            if label and 1 <= label <= count and label not in by_label:
+                by_label[label] = report
+        return by_label
+    
+    @classmethod
+    def _messages(cls, prompt: str, image_content: Union[Dict, List[Dict]]) -> List[Dict]:
+        """One user message: the prompt, then one image or several labelled ones"""
+        content = [{"type": "text", "text": prompt}]
+        if isinstance(image_content, dict):
+            content.append(image_content)
+        else:
+            for label, part in enumerate(image_content, 1):
+                content.extend([{"type": "text", "text": f"Image {label}:"}, part])
+        
+        return [
+            {
+                "role": "user",
+                "content": content,
+            }
+        ]
+    
     @classmethod
     def analyze_property_image(cls, image_path: str) -> Dict:
         """
@@ -63,61 +506,144 @@ class VisionService:
             Dictionary with analysis results
         """
         try:
-            # Encode image
-            if image_path.startswith('http'):
-                image_content = {"type": "image_url", "image_url": {"url": image_path}}
-            else:
-                base64_image = cls.encode_image(image_path)
-                image_content = {
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
+            # Reuse a previous analysis of identical bytes
+            image_bytes, cache_key = cls._load_image(image_path, cls.PROMPT_VERSION)
+            cached = vision_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return {
+                    "success": True,
+                    "analysis": cached,
+                    "model": cls.MODEL,
+                    "image_path": image_path,
+                    "cached": True
                 }
             
-            # Call GPT-4V
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": cls.INSPECTION_PROMPT},
-                            image_content
-                        ],
-                    }
-                ],
-                max_tokens=2000,
-            )
+            # Shrink and encode image, then call GPT-4V
+            if image_bytes is not None:
+                image_bytes = ImagePreprocessor.preprocess(image_bytes)
+            image_content = cls._image_content(image_path, image_bytes)
+            
+            with llm_telemetry.track('openai', cls.MODEL, 'inspection.image') as call:
+                response = client.chat.completions.create(
+                    model=cls.MODEL,
+                    messages=cls._messages(cls.INSPECTION_PROMPT, image_content),
+                    max_tokens=2000,
+                )
+                cls._record_usage(call, response.usage)
             
             # Parse response
-            content = response.choices[0].message.content
+            analysis = cls._parse_analysis(response.choices[0].message.content)
+            if cache_key:
+                vision_cache.set(cache_key, analysis)
             
-            # Try to extract JSON from response
-            if "```json" in content:
-                json_str = content.split("```json")[1].split("```")[0].strip()
-                analysis = json.loads(json_str)
-            elif "```" in content:
-                json_str = content.split("```")[1].split("```")[0].strip()
-                analysis = json.loads(json_str)
-            else:
-                try:
-                    analysis = json.loads(content)
-                except json.JSONDecodeError:
-                    # Fallback if not JSON
-                    analysis = {
-                        "damage_items": [],
-                        "overall_condition": "unknown",
-                        "priority_items": [],
-                        "summary": content,
-                        "raw_response": content
-                    }
+            return {
+                "success": True,
+                "analysis": analysis,
+                "model": cls.MODEL,
+                "image_path": image_path
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "image_path": image_path
+            }
+    
+    @classmethod
+    def estimated_tokens_per_call(cls, prompt: Optional[str] = None, max_tokens: int = 2000, images: int = 1) -> int:
+        """
+        Tokens one vision call counts against the TPM quota: prompt text,
+        the images and the full max_tokens completion allowance
+        """
+        return len(prompt or cls.INSPECTION_PROMPT) // 4 + images * VISION_IMAGE_TOKENS + max_tokens
+    
+    @staticmethod
+    def _record_usage(call, usage) -> None:
+        if usage is not None:
+            call.usage(getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None))
+    
+    @classmethod
+    async def _complete_async(
+        cls,
+        prompt: str,
+        image_content: Union[Dict, List[Dict]],
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        limiter: Optional[RateLimiter] = None,
+        call_site: str = 'inspection.image'
+    ) -> str:
+        """
+        One vision completion: waits for rate-limit budget first, then
+        bounds the API call itself by `timeout` seconds
+        """
+        images = 1 if isinstance(image_content, dict) else len(image_content)
+        estimated = cls.estimated_tokens_per_call(prompt, max_tokens, images)
+        reserved = await limiter.acquire(estimated) if limiter else 0
+        
+        with llm_telemetry.track('openai', cls.MODEL, call_site) as call:
+            response = await asyncio.wait_for(
+                async_client().chat.completions.create(
+                    model=cls.MODEL,
+                    messages=cls._messages(prompt, image_content),
+                    max_tokens=max_tokens,
+                ),
+                timeout or VISION_IMAGE_TIMEOUT
+            )
+            cls._record_usage(call, response.usage)
+        
+        if limiter:
+            limiter.settle(reserved, getattr(response.usage, 'total_tokens', None))
+        return response.choices[0].message.content
+    
+    @classmethod
+    async def analyze_property_image_async(
+        cls,
+        image_path: str,
+        timeout: Optional[float] = None,
+        limiter: Optional[RateLimiter] = None
+    ) -> Dict:
+        """
+        Analyze a single property image using GPT-4V without blocking the event loop
+        
+        Cache hits return without touching the rate limiter.
+        """
+        try:
+            image_bytes, cache_key = await asyncio.to_thread(cls._load_image, image_path, cls.PROMPT_VERSION)
+            cached = await asyncio.to_thread(vision_cache.get, cache_key) if cache_key else None
+            if cached is not None:
+                return {
+                    "success": True,
+                    "analysis": cached,
+                    "model": cls.MODEL,
+                    "image_path": image_path,
+                    "cached": True
+                }
+            
+            if image_bytes is not None:
+                image_bytes = await ImagePreprocessor.preprocess_async(image_bytes)
+            image_content = cls._image_content(image_path, image_bytes)
+            
+            content = await cls._complete_async(cls.INSPECTION_PROMPT, image_content, 2000, timeout, limiter)
+            analysis = cls._parse_analysis(content)
+            if cache_key:
+                await asyncio.to_thread(vision_cache.set, cache_key, analysis)
             
             return {
                 "success": True,
                 "analysis": analysis,
-                "model": "gpt-4o",
+                "model": cls.MODEL,
                 "image_path": image_path
             }
             
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "error": f"Analysis timed out after {timeout or VISION_IMAGE_TIMEOUT:.0f}s",
+                "image_path": image_path
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -125,6 +651,206 @@ class VisionService:
                 "image_path": image_path
             }
     
+    @classmethod
+    async def analyze_property_images_packed_async(
+        cls,
+        image_paths: List[str],
+        timeout: Optional[float] = None,
+        limiter: Optional[RateLimiter] = None
+    ) -> List[Dict]:
+        """
+        Analyze several property images in a single GPT-4o request
+        
+        Cached images are answered from the cache and left out of the
+        request; the rest are sent as labelled image parts under one copy of
+        the inspection prompt and the per-image reports are mapped back by
+        label. Each image gets the same result shape (and cache entry) as
+        analyze_property_image_async. Images the response leaves out are
+        retried on their own; a failed request fails every image in it.
+        """
+        if len(image_paths) == 1:
+            return [await cls.analyze_property_image_async(image_paths[0], timeout, limiter)]
+        
+        results: List[Optional[Dict]] = [None] * len(image_paths)
+        pending = []
+        for index, image_path in enumerate(image_paths):
+            image_bytes, cache_key = await asyncio.to_thread(cls._load_image, image_path, cls.PROMPT_VERSION)
+            cached = await asyncio.to_thread(vision_cache.get, cache_key) if cache_key else None
+            if cached is not None:
+                results[index] = {
+                    "success": True,
+                    "analysis": cached,
+                    "model": cls.MODEL,
+                    "image_path": image_path,
+                    "cached": True
+                }
+            else:
+                pending.append((index, image_bytes, cache_key))
+        
+        if len(pending) == 1:
+            index = pending[0][0]
+            results[index] = await cls.analyze_property_image_async(image_paths[index], timeout, limiter)
+        
+        elif pending:
+            try:
+                image_contents = []
+                for index, image_bytes, _ in pending:
+                    if image_bytes is not None:
+                        image_bytes = await ImagePreprocessor.preprocess_async(image_bytes)
+                    image_contents.append(cls._image_content(image_paths[index], image_bytes))
+                
+                # The per-image schema is the inspection prompt's own
+                prompt = cls.PACKED_INSPECTION_PROMPT.format(count=len(pending)) + cls.INSPECTION_PROMPT
+                content = await cls._complete_async(
+                    prompt, image_contents, VISION_PACK_OUTPUT_TOKENS * len(pending), timeout, limiter,
+                    call_site='inspection.packed'
+                )
+                reports = cls._parse_packed_analysis(content, len(pending))
+                
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                reports = None
+                error = f"Analysis timed out after {timeout or VISION_IMAGE_TIMEOUT:.0f}s"
+            except Exception as e:
+                reports = None
+                error = str(e)
+            
+            missing = []
+            for label, (index, _, cache_key) in enumerate(pending, 1):
+                if reports is None:
+                    results[index] = {"success": False, "error": error, "image_path": image_paths[index]}
+                elif label in reports:
+                    if cache_key:
+                        await asyncio.to_thread(vision_cache.set, cache_key, reports[label])
+                    results[index] = {
+                        "success": True,
+                        "analysis": reports[label],
+                        "model": cls.MODEL,
+                        "image_path": image_paths[index],
+                        "packed_with": len(pending)
+                    }
+                else:
+                    missing.append(index)
+            
+            if missing:
+                # Images the packed reply skipped are retried singly
+                retried = await asyncio.gather(*(
+                    cls.analyze_property_image_async(image_paths[index], timeout, limiter) for index in missing
+                ))
+                for index, result in zip(missing, retried):
+                    results[index] = dict(result, pack_retried=True)
+        
+        return results
+    
+    @classmethod
+    async def stream_property_image(
+        cls,
+        image_path: str,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Analyze a single image, yielding findings while the model writes them
+        
+        Yields {"event": ..., "data": ...} dicts:
+            damage_item - one complete entry of the damage_items array
+            complete    - the same result analyze_property_image returns,
+                          plus time to first finding and total time (ms)
+        A cache hit replays the cached items followed by complete.
+        """
+        started = time.monotonic()
+        first_item_ms = None
+        
+        try:
+            image_bytes, cache_key = await asyncio.to_thread(cls._load_image, image_path, cls.PROMPT_VERSION)
+            cached = await asyncio.to_thread(vision_cache.get, cache_key) if cache_key else None
+            if cached is not None:
+                for item in cached.get("damage_items", []):
+                    yield {"event": "damage_item", "data": item}
+                yield {"event": "complete", "data": {
+                    "success": True,
+                    "analysis": cached,
+                    "model": cls.MODEL,
+                    "image_path": image_path,
+                    "cached": True,
+                    "first_item_ms": 0,
+                    "total_ms": round((time.monotonic() - started) * 1000)
+                }}
+                return
+            
+            if image_bytes is not None:
+                image_bytes = await ImagePreprocessor.preprocess_async(image_bytes)
+            image_content = cls._image_content(image_path, image_bytes)
+            
+            with llm_telemetry.track('openai', cls.MODEL, 'inspection.stream') as call:
+                stream = await asyncio.wait_for(
+                    async_client().chat.completions.create(
+                        model=cls.MODEL,
+                        messages=cls._messages(cls.INSPECTION_PROMPT, image_content),
+                        max_tokens=2000,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                    ),
+                    timeout or VISION_IMAGE_TIMEOUT
+                )
+            
+                parser = JsonArrayStream("damage_items")
+                deadline = started + (timeout or VISION_IMAGE_TIMEOUT)
+                chunks = stream.__aiter__()
+                try:
+                    while True:
+                        # Bound every read so a stalled stream still times out
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                        except StopAsyncIteration:
+                            break
+                        if chunk.usage:
+                            cls._record_usage(call, chunk.usage)
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        for item in parser.feed(delta):
+                            if first_item_ms is None:
+                                first_item_ms = round((time.monotonic() - started) * 1000)
+                            yield {"event": "damage_item", "data": item}
+                finally:
+                    # Also runs when the SSE client disconnects (GeneratorExit),
+                    # so the upstream completion stops generating tokens
+                    await stream.close()
+            
+            analysis = cls._parse_analysis(parser.text)
+            if cache_key:
+                await asyncio.to_thread(vision_cache.set, cache_key, analysis)
+            
+            yield {"event": "complete", "data": {
+                "success": True,
+                "analysis": analysis,
+                "model": cls.MODEL,
+                "image_path": image_path,
+                "first_item_ms": first_item_ms,
+                "total_ms": round((time.monotonic() - started) * 1000)
+            }}
+            
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            yield {"event": "complete", "data": {
+                "success": False,
+                "error": f"Analysis timed out after {timeout or VISION_IMAGE_TIMEOUT:.0f}s",
+                "image_path": image_path
+            }}
+        except Exception as e:
+            yield {"event": "complete", "data": {
+                "success": False,
+                "error": str(e),
+                "image_path": image_path
+            }}
+    
     @classmethod
     def analyze_multiple_images(cls, image_paths: List[str]) -> Dict:
         """
@@ -136,52 +862,151 @@ class VisionService:
         Returns:
             Consolidated analysis from all images
         """
-        results = []
-        all_damage_items = []
-        priority_items = set()
-        total_cost = 0
+        consolidation = ConsolidatedAnalysis(image_paths)
         
-        for image_path in image_paths:
-            result = cls.analyze_property_image(image_path)
-            results.append(result)
-            
-            if result.get('success') and 'analysis' in result:
-                analysis = result['analysis']
-                
-                if 'damage_items' in analysis:
-                    all_damage_items.extend(analysis['damage_items'])
-                
-                if 'priority_items' in analysis:
-                    priority_items.update(analysis['priority_items'])
+        for index, image_path in enumerate(image_paths):
+            consolidation.add(index, cls.analyze_property_image(image_path))
         
-        # Calculate average severity
-        severities = [item.get('severity', 0) for item in all_damage_items]
-        avg_severity = sum(severities) / len(severities) if severities else 0
+        return consolidation.to_dict()
+    
+    @classmethod
+    async def analyze_multiple_images_async(
+        cls,
+        image_paths: List[str],
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        on_result: Optional[Callable[[int, Dict, ConsolidatedAnalysis], Optional[Awaitable]]] = None,
+        limiter: Optional[RateLimiter] = None,
+        dedup: Optional[bool] = None,
+        pack: Optional[bool] = None,
+        quality_reports: Optional[List[Dict]] = None
+    ) -> Dict:
+        """
+        Analyze multiple property images concurrently
         
-        # Determine overall condition
-        if avg_severity >= 8:
-            overall_condition = "critical"
-        elif avg_severity >= 6:
-            overall_condition = "poor"
-        elif avg_severity >= 4:
-            overall_condition = "fair"
-        elif avg_severity >= 2:
-            overall_condition = "good"
+        Up to max_concurrency GPT-4o calls run at once, each bounded by
+        timeout seconds, optionally paced by a shared RateLimiter. Unless
+        dedup is off (VISION_DEDUP_ENABLED), near-identical frames share one
+        call. With pack (VISION_PACK_ENABLED), several images go into each
+        call, sized by pack_images. Results are consolidated as they arrive and
+        on_result(index, result, consolidation) is called after each one
+        (and awaited if it is a coroutine function). Pass quality_reports
+        when the images were already screened (e.g. at upload) to skip the
+        screen here.
+        If the caller is cancelled, in-flight calls are cancelled too.
+        
+        Returns the same structure as analyze_multiple_images.
+        """
+        return await cls._fan_out(
+            partial(cls.analyze_property_image_async, timeout=timeout, limiter=limiter),
+            ConsolidatedAnalysis(image_paths),
+            max_concurrency,
+            on_result,
+            dedup=VISION_DEDUP_ENABLED if dedup is None else dedup,
+            analyze_pack=(
+                partial(cls.analyze_property_images_packed_async, timeout=timeout, limiter=limiter)
+                if (VISION_PACK_ENABLED if pack is None else pack) else None
+            ),
+            quality_reports=quality_reports
+        )
+    
+    @staticmethod
+    def attach_duplicate(result: Dict, image_path: str, representative_path: str) -> Dict:
+        """Per-image result for a near-duplicate frame: the representative's findings"""
+        return dict(result, image_path=image_path, duplicate_of=representative_path)
+    
+    @classmethod
+    async def _fan_out(
+        cls,
+        analyze,
+        consolidation,
+        max_concurrency,
+        on_result,
+        dedup: bool = False,
+        analyze_pack=None,
+        quality_reports: Optional[List[Dict]] = None
+    ) -> Dict:
+        """
+        Run `analyze` over the consolidation's images with bounded concurrency
+        
+        Photos first go through the local quality screen (unless
+        quality_reports from an earlier screen are given): unusable ones are
+        answered with retake feedback instead of a vision call (or just
+        flagged, per IMAGE_QUALITY_MODE). With dedup, near-identical frames
+        are then clustered and only each cluster's representative is
+        analyzed; the other frames get its result. With `analyze_pack`, the
+        representatives are grouped by pack_images and each group is one
+        call; max_concurrency then bounds packs rather than images.
+        """
+        image_paths = consolidation.image_paths
+        if quality_reports is not None and len(quality_reports) == len(image_paths):
+            reports = quality_reports
         else:
-            overall_condition = "excellent"
+            reports = await ImageQualityScreen.screen_async(image_paths)
         
-        return {
-            "success": True,
-            "total_images_analyzed": len(image_paths),
-            "individual_results": results,
-            "consolidated_analysis": {
-                "all_damage_items": all_damage_items,
-                "priority_items": list(priority_items),
-                "overall_condition": overall_condition,
-                "average_severity": round(avg_severity, 2),
-                "total_damage_items": len(all_damage_items)
-            }
-        }
+        async def deliver(index: int, result: Dict):
+            consolidation.add(index, result)
+            if on_result:
+                outcome = on_result(index, result, consolidation)
+                if inspect.isawaitable(outcome):
+                    await outcome
+        
+        # Unusable photos are answered locally with retake feedback
+        candidates = []
+        for index, report in enumerate(reports):
+            if not report["usable"] and IMAGE_QUALITY_MODE == 'skip':
+                await deliver(index, ImageQualityScreen.rejected_result(report))
+            else:
+                candidates.append(index)
+        
+        if dedup:
+            clusters = [
+                [candidates[i] for i in cluster]
+                for cluster in await ImageDeduplicator.cluster_async([image_paths[i] for i in candidates])
+            ]
+        else:
+            clusters = [[i] for i in candidates]
+        
+        if analyze_pack and len(clusters) > 1:
+            token_estimates = await asyncio.gather(*(
+                asyncio.to_thread(estimate_vision_tokens, image_paths[cluster[0]]) for cluster in clusters
+            ))
+            units = [
+                [clusters[i] for i in pack]
+                for pack in pack_images([tokens or VISION_IMAGE_TOKENS for tokens in token_estimates])
+            ]
+        else:
+            units = [[cluster] for cluster in clusters]
+        semaphore = asyncio.Semaphore(max_concurrency or VISION_MAX_CONCURRENCY)
+        
+        async def run(unit: List[List[int]]):
+            async with semaphore:
+                if len(unit) == 1:
+                    return unit, [await analyze(image_paths[unit[0][0]])]
+                return unit, await analyze_pack([image_paths[cluster[0]] for cluster in unit])
+        
+        tasks = [asyncio.create_task(run(unit)) for unit in units]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                unit, unit_results = await finished
+                for cluster, result in zip(unit, unit_results):
+                    representative = cluster[0]
+                    for index in cluster:
+                        if index != representative:
+                            result_for_index = cls.attach_duplicate(
+                                result, image_paths[index], image_paths[representative]
+                            )
+                        else:
+                            result_for_index = result
+                        if reports[index]["issues"]:
+                            result_for_index = dict(result_for_index, quality=reports[index])
+                        await deliver(index, result_for_index)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        
+        return consolidation.to_dict()
     
     @classmethod
     def analyze_roof_condition(cls, image_path: str) -> Dict:
@@ -189,76 +1014,38 @@ class VisionService:
         Specialized roof condition analysis
         Based on research: GPT-4V can identify missing shingles and structural damage
         """
-        roof_prompt = """
-        Perform a detailed roof inspection analysis on this image. Focus specifically on:
-        
-        1. Missing or damaged shingles
-        2. Structural integrity
-        3. Wear patterns and aging
-        4. Water damage indicators
-        5. Flashing condition
-        6. Gutter condition
-        7. Overall roof lifespan estimation
-        
-        Provide JSON response:
-        {
-            "roof_type": "shingle/tile/metal/flat/other",
-            "estimated_age": "years",
-            "condition_score": 1-10,
-            "issues_found": [
-                {
-                    "issue": "description",
-                    "severity": 1-10,
-                    "location": "area of roof",
-                    "repair_urgency": "immediate/urgent/routine/monitor"
-                }
-            ],
-            "estimated_remaining_lifespan": "years",
-            "repair_recommendations": ["list of recommendations"],
-            "estimated_repair_cost": "USD estimate"
-        }
-        """
-        
         try:
-            if image_path.startswith('http'):
-                image_content = {"type": "image_url", "image_url": {"url": image_path}}
-            else:
-                base64_image = cls.encode_image(image_path)
-                image_content = {
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
+            image_bytes, cache_key = cls._load_image(image_path, cls.ROOF_PROMPT_VERSION)
+            cached = vision_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return {
+                    "success": True,
+                    "roof_analysis": cached,
+                    "model": cls.MODEL,
+                    "cached": True
                 }
             
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": roof_prompt},
-                            image_content
-                        ],
-                    }
-                ],
-                max_tokens=1500,
-            )
+            if image_bytes is not None:
+                image_bytes = ImagePreprocessor.preprocess(image_bytes)
+            image_content = cls._image_content(image_path, image_bytes)
             
-            content = response.choices[0].message.content
+            with llm_telemetry.track('openai', cls.MODEL, 'inspection.roof') as call:
+                response = client.chat.completions.create(
+                    model=cls.MODEL,
+                    messages=cls._messages(cls.ROOF_PROMPT, image_content),
+                    max_tokens=1500,
+                )
+                cls._record_usage(call, response.usage)
             
             # Extract JSON
-            if "```json" in content:
-                json_str = content.split("```json")[1].split("```")[0].strip()
-                analysis = json.loads(json_str)
-            else:
-                try:
-                    analysis = json.loads(content)
-                except:
-                    analysis = {"raw_response": content}
+            analysis = cls._parse_roof_analysis(response.choices[0].message.content)
+            if cache_key:
+                vision_cache.set(cache_key, analysis)
             
             return {
                 "success": True,
                 "roof_analysis": analysis,
-                "model": "gpt-4o"
+                "model": cls.MODEL
             }
             
         except Exception as e:
@@ -266,4 +1053,83 @@ class VisionService:
                 "success": False,
                 "error": str(e)
             }
-
+    
+    @classmethod
+    async def analyze_roof_condition_async(
+        cls,
+        image_path: str,
+        timeout: Optional[float] = None,
+        limiter: Optional[RateLimiter] = None
+    ) -> Dict:
+        """
+        Specialized roof condition analysis without blocking the event loop
+        """
+        try:
+            image_bytes, cache_key = await asyncio.to_thread(cls._load_image, image_path, cls.ROOF_PROMPT_VERSION)
+            cached = await asyncio.to_thread(vision_cache.get, cache_key) if cache_key else None
+            if cached is not None:
+                return {
+                    "success": True,
+                    "roof_analysis": cached,
+                    "model": cls.MODEL,
+                    "image_path": image_path,
+                    "cached": True
+                }
+            
+            if image_bytes is not None:
+                image_bytes = await ImagePreprocessor.preprocess_async(image_bytes)
+            image_content = cls._image_content(image_path, image_bytes)
+            
+            content = await cls._complete_async(cls.ROOF_PROMPT, image_content, 1500, timeout, limiter, call_site='inspection.roof')
+            analysis = cls._parse_roof_analysis(content)
+            if cache_key:
+                await asyncio.to_thread(vision_cache.set, cache_key, analysis)
+            
+            return {
+                "success": True,
+                "roof_analysis": analysis,
+                "model": cls.MODEL,
+                "image_path": image_path
+            }
+            
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "error": f"Analysis timed out after {timeout or VISION_IMAGE_TIMEOUT:.0f}s",
+                "image_path": image_path
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "image_path": image_path
+            }
+    
+    @classmethod
+    async def analyze_roof_images_async(
+        cls,
+        image_paths: List[str],
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        on_result: Optional[Callable[[int, Dict, ConsolidatedRoofAnalysis], Optional[Awaitable]]] = None,
+        limiter: Optional[RateLimiter] = None,
+        dedup: Optional[bool] = None,
+        quality_reports: Optional[List[Dict]] = None
+    ) -> Dict:
+        """
+        Roof analysis across every image, fanned out concurrently
+        
+        Per-image reports are merged by ConsolidatedRoofAnalysis into a
+        single "roof_analysis"; the per-image reports are kept under
+        "individual_results".
+        """
+        return await cls._fan_out(
+            partial(cls.analyze_roof_condition_async, timeout=timeout, limiter=limiter),
+            ConsolidatedRoofAnalysis(image_paths),
+            max_concurrency,
+            on_result,
+            dedup=VISION_DEDUP_ENABLED if dedup is None else dedup,
+            quality_reports=quality_reports
+        )
@@ -0,0 +1,304 @@
+"""
+Visit consolidation for pending maintenance requests
+Clusters same-category requests at the same or neighbouring properties with
+compatible time windows and books each cluster as a single provider visit
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from core.models import MaintenanceRequest
+from services.dispatch_service import DispatchService
+from services.provider_calendar import ProviderCalendar
+
+
+TRAVEL_SPEED_MPH = 30
+
+
+class VisitConsolidator:
+    """Turn several truck rolls into one visit"""
+
+    # Properties within this distance count as neighbours
+    CLUSTER_RADIUS_MILES = 0.5
+
+    # A visit must fit inside one working day
+    MAX_VISIT_HOURS = 8
+
+    @classmethod
+    def consolidate_pending(cls, dry_run: bool = False) -> Dict:
+        """
+        Cluster pending, unassigned requests and book each multi-request
+        cluster as one visit
+
+        Single requests are left pending for the normal auto-assign path.
+        With dry_run, clusters and estimated savings are reported without
+        booking anything.
+        """
+        requests = list(
+            MaintenanceRequest.objects.filter(status='pending', service_provider__isnull=True)
+            .select_related('property')
+            .order_by('requested_at')
+        )
+
+        clusters = cls.build_clusters(requests)
+        calendar = ProviderCalendar(days=DispatchService.SCHEDULING_HORIZON_DAYS)
+        visits = []
+        unbooked = []
+        totals = {"trips_before": 0, "trips_after": 0, "miles_before": 0.0, "miles_after": 0.0}
+
+        for cluster in clusters:
+            if dry_run:
+                lead = min(cluster, key=lambda r: cls._window(r)[1])
+                slot = DispatchService.find_best_slot(
+                    lead,
+                    duration=cls._visit_duration(cluster),
+                    jobs=len(cluster),
+                    calendar=calendar
+                )
+                visits.append(cls._describe_visit(cluster, slot["provider"] if slot else None))
+                continue
+
+            visit = cls._book_visit(cluster, calendar)
+            if visit:
+                visits.append(visit)
+            elif len(cluster) > 1:
+                unbooked.append([r.id for r in cluster])
+
+        for visit in visits:
+            savings = visit["savings"]
+            totals["trips_before"] += savings["trips_before"]
+            totals["trips_after"] += savings["trips_after"]
+            totals["miles_before"] += savings.get("miles_before") or 0
+            totals["miles_after"] += savings.get("miles_after") or 0
+
+        miles_saved = totals["miles_before"] - totals["miles_after"]
+        clustered = sum(len(v["request_ids"]) for v in visits) + sum(len(ids) for ids in unbooked)
+
+        return {
+            "success": True,
+            "dry_run": dry_run,
+            "pending_requests": len(requests),
+            "requests_consolidated": clustered,
+            "visits": visits,
+            "unbooked_clusters": unbooked,
+            "savings": {
+                "trips_saved": totals["trips_before"] - totals["trips_after"],
+                "miles_saved": round(miles_saved, 2),
+                "travel_hours_saved": round(miles_saved / TRAVEL_SPEED_MPH, 2),
+            }
+        }
+
+    @classmethod
+    def build_clusters(cls, requests: List[MaintenanceRequest]) -> List[List[MaintenanceRequest]]:
+        """Clusters of two or more requests sharing category, neighbourhood and time window"""
+        by_category = defaultdict(list)
+        for req in requests:
+            by_category[DispatchService.categorize_request(req.description)].append(req)
+
+        clusters = []
+        for category, items in by_category.items():
+            for group in cls._spatial_groups(items):
+                clusters.extend(c for c in cls._window_groups(category, group) if len(c) > 1)
+
+        return clusters
+
+    @classmethod
+    def _spatial_groups(cls, requests: List[MaintenanceRequest]) -> List[List[MaintenanceRequest]]:
+        """
+        Single-link clustering of properties within CLUSTER_RADIUS_MILES
+
+        Properties are bucketed into a grid of radius-sized cells so each
+        one is only compared against its own and adjacent cells. Requests at
+        properties without coordinates only cluster with the same property.
+        """
+        by_property = defaultdict(list)
+        for req in requests:
+            by_property[req.property_id].append(req)
+
+        parent = {pid: pid for pid in by_property}
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        cell_deg = cls.CLUSTER_RADIUS_MILES / 69.0
+        grid = defaultdict(list)
+        coords = {}
+        for pid, reqs in by_property.items():
+            prop = reqs[0].property
+            if prop.latitude is None or prop.longitude is None:
+                continue
+            lat, lng = float(prop.latitude), float(prop.longitude)
+            coords[pid] = (lat, lng)
+            cell = (int(lat // cell_deg), int(lng // (cell_deg / max(math.cos(math.radians(lat)), 0.01))))
+
+            for d_lat in (-1, 0, 1):
+                for d_lng in (-1, 0, 1):
+                    for other in grid.get((cell[0] + d_lat, cell[1] + d_lng), ()):
+                        o_lat, o_lng = coords[other]
+                        if DispatchService.calculate_distance(lat, lng, o_lat, o_lng) <= cls.CLUSTER_RADIUS_MILES:
+                            parent[find(pid)] = find(other)
+            grid[cell].append(pid)
+
+        groups = defaultdict(list)
+        for pid, reqs in by_property.items():
+            groups[find(pid)].extend(reqs)
+
+        return list(groups.values())
+
+    @classmethod
+    def _window_groups(cls, category: str, requests: List[MaintenanceRequest]) -> List[List[MaintenanceRequest]]:
+        """
+        Split a neighbourhood group into visits whose time windows overlap
+
+        A request's window runs from when it was raised to its priority SLA
+        deadline. Requests are taken in deadline order and join the current
+        visit while the shared window stays non-empty and the visit still
+        fits in a working day.
+        """
+        job_hours = DispatchService.JOB_DURATION_HOURS.get(category, 2)
+        max_jobs = max(1, int(cls.MAX_VISIT_HOURS // job_hours))
+
+        windowed = sorted(
+            ((cls._window(req), req) for req in requests),
+            key=lambda item: item[0][1]
+        )
+
+        visits = []
+        current: List[MaintenanceRequest] = []
+        earliest_close = None
+        for (opens, closes), req in windowed:
+            # Sorted by deadline, so the shared window is [latest open, first close]
+            if current and opens <= earliest_close and len(current) < max_jobs:
+                current.append(req)
+                continue
+
+            if current:
+                visits.append(current)
+            current = [req]
+            earliest_close = closes
+
+        if current:
+            visits.append(current)
+
+        return visits
+
+    @staticmethod
+    def _visit_duration(cluster: List[MaintenanceRequest]) -> timedelta:
+        return sum(
+            (DispatchService.job_duration(DispatchService.categorize_request(r.description)) for r in cluster),
+            timedelta()
+        )
+
+    @staticmethod
+    def _window(request: MaintenanceRequest) -> Tuple[datetime, datetime]:
+        priority = request.priority
+        if not priority or priority == 'medium':
+            priority = DispatchService.assess_priority(request.description)
+        sla = timedelta(hours=DispatchService.PRIORITY_SLA_HOURS.get(priority, 72))
+        return request.requested_at, request.requested_at + sla
+
+    @classmethod
+    def _book_visit(cls, cluster: List[MaintenanceRequest], calendar: Optional[ProviderCalendar] = None) -> Optional[Dict]:
+        """
+        Book the whole cluster back to back with one provider
+
+        The requests are re-read under a row lock first; any that were
+        assigned or cancelled since clustering are removed from `cluster`,
+        and the visit is not booked if fewer than two still qualify.
+        """
+        calendar = calendar or ProviderCalendar(days=DispatchService.SCHEDULING_HORIZON_DAYS)
+        with calendar.tentative(), transaction.atomic():
+            still_pending = set(
+                MaintenanceRequest.objects.select_for_update()
+                .filter(id__in=[r.id for r in cluster], status='pending', service_provider__isnull=True)
+                .values_list('id', flat=True)
+            )
+            cluster[:] = [r for r in cluster if r.id in still_pending]
+            if len(cluster) < 2:
+                return None
+
+            lead = min(cluster, key=lambda r: cls._window(r)[1])
+            booked = DispatchService.book_best_slot(lead, visit_requests=cluster, calendar=calendar)
+            if not booked:
+                return None
+
+            provider = booked["provider"]
+            assigned_at = datetime.now()
+            for req in cluster:
+                if not req.priority or req.priority == 'medium':
+                    req.priority = DispatchService.assess_priority(req.description)
+                req.service_provider = provider
+                req.status = 'assigned'
+                req.assigned_at = assigned_at
+                req.save()
+
+            provider.total_jobs += len(cluster)
+            provider.save()
+
+        visit = cls._describe_visit(cluster, provider)
+        visit["scheduled_start"] = booked["bookings"][0].start_time.isoformat()
+        visit["scheduled_end"] = booked["bookings"][-1].end_time.isoformat()
+        visit["meets_sla"] = booked["bookings"][0].start_time <= min(cls._window(r)[1] for r in cluster)
+        return visit
+
+    @classmethod
+    def _describe_visit(cls, cluster: List[MaintenanceRequest], provider=None) -> Dict:
+        category = DispatchService.categorize_request(cluster[0].description)
+        property_ids = list(dict.fromkeys(r.property_id for r in cluster))
+
+        return {
+            "category": category,
+            "request_ids": [r.id for r in cluster],
+            "property_ids": property_ids,
+            "provider": {
+                "id": provider.id,
+                "name": provider.company_name,
+                "type": provider.provider_type,
+            } if provider else None,
+            "savings": cls._estimate_savings(cluster, provider),
+        }
+
+    @staticmethod
+    def _estimate_savings(cluster: List[MaintenanceRequest], provider=None) -> Dict:
+        """
+        Separate round trips from the provider's base per request versus one
+        nearest-neighbour loop through the cluster's properties
+        """
+        savings = {"trips_before": len(cluster), "trips_after": 1}
+
+        if not provider or provider.latitude is None or provider.longitude is None:
+            return savings
+
+        base = (float(provider.latitude), float(provider.longitude))
+        points = {}
+        for req in cluster:
+            prop = req.property
+            if prop.latitude is None or prop.longitude is None:
+                return savings
+            points[req.property_id] = (float(prop.latitude), float(prop.longitude))
+
+        def miles(a, b):
+            return DispatchService.calculate_distance(a[0], a[1], b[0], b[1])
+
+        before = sum(2 * miles(base, points[req.property_id]) for req in cluster)
+
+        after = 0.0
+        here = base
+        remaining = dict(points)
+        while remaining:
+            pid = min(remaining, key=lambda p: miles(here, remaining[p]))
+            after += miles(here, remaining[pid])
+            here = remaining.pop(pid)
+        after += miles(here, base)
+
+        savings.update({
+            "miles_before": round(before, 2),
+            "miles_after": round(after, 2),
+            "travel_hours_saved": round((before - after) / TRAVEL_SPEED_MPH, 2),
+        })
+        return savings
@@ -66,6 +66,13 @@ DATABASES = {
     }
 }
 
+# Local SQLite database (benchmarks and simulations)
+if os.getenv('SQLITE_PATH'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH'),
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -93,11 +100,16 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_IMPORTS = ['tasks']
 
 CELERY_BEAT_SCHEDULE = {
     'weekly-property-market-scrape': {
         'task': 'tasks.scrape_scheduler.scrape_property_market',
         'schedule': 60 * 60 * 24 * 7,
     },
+    'quarterly-inspection-sweep': {
+        'task': 'tasks.inspection_jobs.run_inspection_sweep',
+        'schedule': 60 * 60 * 24 * 91,
+    },
 }
 
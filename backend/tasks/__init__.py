@@ -1 +1,2 @@
 from .scrape_scheduler import scrape_competitors, generate_market_report, update_pricing_strategy, scrape_property_market
+from .inspection_jobs import run_inspection, run_inspection_sweep
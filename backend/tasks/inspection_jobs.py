@@ -0,0 +1,134 @@
+"""
+Celery tasks for property inspection analysis
+"""
+import asyncio
+from decimal import Decimal
+from typing import Dict, List, Optional
+from celery import shared_task
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from services.vision_service import VisionService
+from services.image_store import ImageStore
+from core.models import PropertyInspection
+
+
+def apply_analysis_result(inspection: PropertyInspection, analysis_result: Dict) -> None:
+    """Copy headline fields from an analysis onto the inspection"""
+    inspection.ai_report = analysis_result
+    cost_range = None
+
+    # Extract overall condition if available
+    if 'consolidated_analysis' in analysis_result:
+        consolidated = analysis_result['consolidated_analysis']
+        inspection.overall_condition = consolidated.get('overall_condition')
+        inspection.severity_score = int(consolidated.get('average_severity', 0))
+        inspection.damage_count = consolidated.get('total_damage_items', 0)
+        cost_range = consolidated.get('estimated_cost_range')
+    elif 'roof_analysis' in analysis_result:
+        roof_analysis = analysis_result['roof_analysis']
+        # condition_score runs 1=failing to 10=excellent, severity the other way
+        condition_score = roof_analysis.get('condition_score')
+        if isinstance(condition_score, (int, float)) and 1 <= condition_score <= 10:
+            inspection.severity_score = 11 - int(condition_score)
+        inspection.damage_count = len(roof_analysis.get('issues_found') or [])
+        cost_range = roof_analysis.get('estimated_repair_cost_range')
+
+    # Summary columns let history lists skip loading ai_report
+    inspection.total_estimated_cost = round(Decimal(str(cost_range['high'])), 2) if cost_range else None
+
+
+async def _analyze(inspection: PropertyInspection, quality_reports: Optional[List[Dict]] = None) -> Dict:
+    """Run the analysis, recording per-image progress as results arrive"""
+    inspection_id = inspection.id
+
+    @sync_to_async
+    def record_progress(completed: int):
+        PropertyInspection.objects.filter(id=inspection_id).update(images_completed=completed)
+
+    def on_result(index, result, consolidation):
+        return record_progress(consolidation.completed)
+
+    image_paths = ImageStore.resolve_all(inspection.images)
+
+    if inspection.inspection_type == "roof":
+        # Specialized roof analysis across every image
+        return await VisionService.analyze_roof_images_async(
+            image_paths, on_result=on_result, quality_reports=quality_reports
+        )
+
+    # General property inspection, images analyzed concurrently
+    return await VisionService.analyze_multiple_images_async(
+        image_paths, on_result=on_result, quality_reports=quality_reports
+    )
+
+
+@shared_task
+def run_inspection(inspection_id: int, quality_reports: Optional[List[Dict]] = None):
+    """
+    Analyze a pending inspection's images
+
+    Moves the inspection through processing to completed (or failed),
+    updating images_completed as each image finishes. quality_reports
+    from the upload's screen, when given, spare screening the images again.
+    """
+    try:
+        inspection = PropertyInspection.objects.get(id=inspection_id)
+    except PropertyInspection.DoesNotExist:
+        print(f"⚠️ Inspection {inspection_id} no longer exists")
+        return
+
+    if inspection.status not in ('pending', 'processing'):
+        return
+
+    print(f"🔍 Analyzing inspection {inspection_id} ({len(inspection.images)} images)...")
+    inspection.status = 'processing'
+    inspection.images_completed = 0
+    inspection.save(update_fields=['status', 'images_completed'])
+
+    try:
+        analysis_result = asyncio.run(_analyze(inspection, quality_reports))
+
+        inspection.refresh_from_db(fields=['images_completed'])
+        apply_analysis_result(inspection, analysis_result)
+        errors = [r.get('error') for r in analysis_result.get('individual_results', []) if not r.get('success')]
+        if not analysis_result.get('success'):
+            inspection.status = 'failed'
+            inspection.error = analysis_result.get('error', '')
+        elif errors and len(errors) == len(analysis_result['individual_results']):
+            # Every image failed; the consolidated report would be empty
+            inspection.status = 'failed'
+            inspection.error = errors[0] or 'All image analyses failed'
+        else:
+            inspection.status = 'completed'
+            inspection.error = '; '.join(e for e in errors if e)
+
+    except Exception as e:
+        print(f"❌ Inspection {inspection_id} failed: {e}")
+        inspection.status = 'failed'
+        inspection.error = str(e)
+
+    inspection.completed_at = timezone.now()
+    inspection.save()
+    print(f"✅ Inspection {inspection_id} {inspection.status}")
+
+
+def enqueue_inspection(inspection_id: int, quality_reports: Optional[List[Dict]] = None) -> None:
+    """Hand an inspection to the Celery workers, or run it here if no broker is reachable"""
+    try:
+        run_inspection.apply_async((inspection_id, quality_reports), retry=False)
+    except Exception as e:
+        print(f"⚠️ Celery unavailable ({e}), analyzing inspection {inspection_id} in-process")
+        run_inspection(inspection_id, quality_reports)
+
+
+@shared_task
+def run_inspection_sweep(property_ids=None, limit=None, reset=False):
+    """
+    Quarterly portfolio sweep; resumes from the checkpoint if a previous
+    run was interrupted
+    """
+    from services.inspection_sweep import InspectionSweep
+
+    result = InspectionSweep(property_ids=property_ids, limit=limit, reset=reset).run()
+    result.pop("checkpoint", None)
+    return result
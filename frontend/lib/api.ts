@@ -68,8 +68,8 @@ export const inspectionsApi = {
     });
   },
   
-  getPropertyInspections: (propertyId: number, limit?: number) => 
-    api.get(`/api/inspections/property/${propertyId}`, { params: { limit } }),
+  getPropertyInspections: (propertyId: number, limit?: number, view: 'summary' | 'full' = 'summary') => 
+    api.get(`/api/inspections/property/${propertyId}`, { params: { limit, view } }),
   
   getInspectionDetail: (inspectionId: number) => 
     api.get(`/api/inspections/${inspectionId}`),